@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark HealthDatabase operations with and without the connection pool.
+
+The "before" numbers reproduce the original access pattern: a fresh
+sqlite3.connect() per operation with the default rollback journal. The
+"after" numbers use HealthDatabase with its pooled WAL connections.
+
+    python -m benchmarks.connection_pool --ops 2000
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+from health_guardian_agent.database import HealthDatabase
+
+SAMPLE_VITALS = {"blood_pressure": "128/82", "heart_rate": 72, "temperature": 98.4}
+
+
+def _unpooled_store(db_path: str, patient_id: str) -> None:
+    with sqlite3.connect(db_path) as conn:
+        with sqlite3.connect(db_path) as inner:
+            inner.execute("INSERT OR IGNORE INTO patients (patient_id) VALUES (?)", (patient_id,))
+            inner.commit()
+        conn.execute("""
+            INSERT INTO health_data (patient_id, data_type, data_json)
+            VALUES (?, ?, ?)
+        """, (patient_id, "vital_signs", json.dumps(SAMPLE_VITALS)))
+        conn.commit()
+
+
+def _unpooled_read(db_path: str, patient_id: str) -> None:
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("""
+            SELECT data_json, recorded_at
+            FROM health_data
+            WHERE patient_id = ? AND data_type = ?
+            ORDER BY recorded_at DESC
+            LIMIT 1
+        """, (patient_id, "vital_signs")).fetchall()
+
+
+def _rate(ops: int, fn) -> float:
+    start = time.perf_counter()
+    for i in range(ops):
+        fn(f"PAT{i % 50:03d}")
+    return ops / (time.perf_counter() - start)
+
+
+def run(ops: int) -> dict:
+    """Run the before/after comparison and return ops/sec for each mode."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        HealthDatabase(before_path, mmap_size=0).close()
+        with sqlite3.connect(before_path) as conn:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        results["before"] = {
+            "write_ops_per_sec": _rate(ops, lambda pid: _unpooled_store(before_path, pid)),
+            "read_ops_per_sec": _rate(ops, lambda pid: _unpooled_read(before_path, pid)),
+        }
+
+        db = HealthDatabase(os.path.join(tmp, "after.db"))
+        results["after"] = {
+            "write_ops_per_sec": _rate(ops, lambda pid: db.store_patient_data(pid, "vital_signs", SAMPLE_VITALS)),
+            "read_ops_per_sec": _rate(ops, lambda pid: db.get_patient_data(pid, "vital_signs")),
+        }
+        db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000, help="operations per measurement")
+    args = parser.parse_args()
+
+    results = run(args.ops)
+    for mode in ("before", "after"):
+        print(f"{mode:>6}: {results[mode]['write_ops_per_sec']:10.0f} writes/s "
+              f"{results[mode]['read_ops_per_sec']:10.0f} reads/s")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Benchmark conversation message throughput in sync vs batched durability mode.
+
+Several producer threads store messages concurrently, mimicking many active
+chats. Batched mode group-commits through the background writer.
+
+    python -m benchmarks.conversation_writes --messages 5000 --producers 8
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from health_guardian_agent.database import HealthDatabase
+
+
+def _measure(db_path: str, durability: str, messages: int, producers: int) -> float:
+    database = HealthDatabase(db_path, conversation_durability=durability)
+    per_producer = messages // producers
+
+    def produce(index: int) -> None:
+        for i in range(per_producer):
+            database.store_conversation_message(f"PAT{index:03d}", f"session_{index}", "user", f"message {i}")
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    database.flush_conversations()
+    elapsed = time.perf_counter() - start
+    database.close()
+    return per_producer * producers / elapsed
+
+
+def run(messages: int, producers: int) -> dict:
+    """Return messages/sec for each durability mode."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for durability in ("sync", "batched"):
+            db_path = os.path.join(tmp, f"{durability}.db")
+            results[durability] = {"messages_per_sec": _measure(db_path, durability, messages, producers)}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000, help="total messages to store")
+    parser.add_argument("--producers", type=int, default=8, help="concurrent producer threads")
+    args = parser.parse_args()
+
+    results = run(args.messages, args.producers)
+    for mode, result in results.items():
+        print(f"{mode:>8}: {result['messages_per_sec']:10.0f} messages/s")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
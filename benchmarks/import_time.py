@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Cold import-time benchmark.
+
+Imports each target in a fresh interpreter under `python -X importtime`,
+from an empty working directory, and reports the cumulative import time
+(best of --runs) plus whether the import created a database file. Exits
+non-zero if the package import exceeds --budget-ms.
+
+    python -m benchmarks.import_time --runs 5 --budget-ms 50
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TARGETS = [
+    "health_guardian_agent",
+    "health_guardian_agent.database",
+    "health_guardian_agent.tools",
+    "health_guardian_agent.agent",
+]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def cold_import(module: str, cwd: str) -> Optional[int]:
+    """Cumulative microseconds to import `module` in a fresh interpreter."""
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and not match.group(3) and match.group(4) == module:
+            return int(match.group(2))
+    return None
+
+
+def measure(runs: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for module in TARGETS:
+        with tempfile.TemporaryDirectory() as cwd:
+            times = [cold_import(module, cwd) for _ in range(runs)]
+            results[module] = {
+                "best_ms": min(times) / 1000,
+                "creates_db_file": any(name.startswith("sessions.db") for name in os.listdir(cwd)),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="cold import budget for the package")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    for module, stats in results.items():
+        print(f"{module:35s} {stats['best_ms']:10.1f} ms  creates db file: {stats['creates_db_file']}")
+    print(json.dumps(results))
+    if results["health_guardian_agent"]["best_ms"] > args.budget_ms:
+        print(f"Package import exceeds the {args.budget_ms} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
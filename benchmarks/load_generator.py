@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-session load generator.
+
+Drives N patient sessions at once through the same Runner +
+PersistentSessionService + SQLite stack the agent is served with. Patients
+are preloaded with synthetic history, then every session plays a scripted
+conversation: identify the patient, record vitals, run the full analysis
+pipeline and search earlier records.
+
+Model calls go to a pluggable backend. "scripted" answers after
+--latency-ms with the tool calls and transfers the script needs, so the
+whole tree runs without a network; "live" keeps the configured Gemini
+models; "record" calls them and stores every response in --recordings,
+and "replay" answers from those recordings after --latency-ms, offline.
+Reports turns per second, turn latency percentiles per step,
+SQLite write lock contention and retry, result cache and search cache
+counters.
+
+    python -m benchmarks.load_generator --sessions 200 --latency-ms 50
+    python -m benchmarks.load_generator --sessions 20 --backend record --recordings run.jsonl
+    python -m benchmarks.load_generator --sessions 20 --backend replay --recordings run.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types
+
+from benchmarks.synthetic import SyntheticPatient, generate_patients, populate
+
+APP_NAME = "health_guardian_load"
+PIPELINE_AGENT = "health_analysis_pipeline"
+# Synthetic history preloaded per patient; generate_patients must see the same values to repeat the population
+HISTORY, MESSAGES = 3, 4
+
+# A scripted turn: (step name, user message, tool call the root agent answers it with)
+Turn = Tuple[str, str, Optional[Tuple[str, Dict[str, Any]]]]
+
+_PATIENT_ID = re.compile(r"\bPAT\d+\b")
+
+
+def conversation(patient: SyntheticPatient, rng: random.Random) -> List[Turn]:
+    """The scripted turns for one patient; every message names the patient."""
+    systolic, diastolic, heart_rate = rng.randint(110, 160), rng.randint(70, 100), rng.randint(55, 100)
+    patient_id = patient.patient_id
+    return [
+        ("identify", f"Hi, I'm {patient.name} ({patient_id}), my phone number is {patient.phone}.",
+         ("find_patient_by_name_or_phone", {"name": patient.name, "phone": patient.phone})),
+        ("store_vitals", f"{patient_id}: my blood pressure today was {systolic}/{diastolic} "
+                         f"and my heart rate {heart_rate}.",
+         ("store_health_data", {"patient_id": patient_id, "data_type": "vital_signs",
+                                "data": {"blood_pressure": f"{systolic}/{diastolic}", "heart_rate": heart_rate}})),
+        ("analyze", f"Please run my full health analysis for {patient_id}.",
+         ("transfer_to_agent", {"agent_name": PIPELINE_AGENT})),
+        ("search", f"{patient_id}: what did we discuss about my blood pressure before?",
+         ("search_patient_records", {"patient_id": patient_id, "query": "blood pressure"})),
+    ]
+
+
+class ScriptedLlm(BaseLlm):
+    """Offline stand-in model that follows the load script.
+
+    The root agent answers a scripted user message with that turn's tool
+    call, looked up by the message text. Stage agents call their first tool
+    found in `stage_calls` for the patient named in the conversation. After
+    a tool response, or when nothing is scripted, the model answers in text.
+    Every call waits `latency` seconds first.
+    """
+
+    agent_name: str
+    script: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+    latency: float = 0.0
+    stage_calls: Dict[str, Callable[[str, str], Dict[str, Any]]] = {
+        "fetch_health_data": lambda patient_id, agent: {"patient_id": patient_id},
+        "cached_google_search": lambda patient_id, agent: {"query": f"{agent} clinical guidelines"},
+    }
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        call = self._next_call(llm_request)
+        if call is None:
+            part = types.Part(text=f"{self.agent_name} finished the requested step.")
+        else:
+            part = types.Part(function_call=types.FunctionCall(name=call[0], args=call[1]))
+        yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    def _next_call(self, llm_request: LlmRequest) -> Optional[Tuple[str, Dict[str, Any]]]:
+        contents = llm_request.contents
+        if not contents or any(part.function_response for part in contents[-1].parts or ()):
+            return None
+        texts = [part.text for content in reversed(contents) for part in content.parts or () if part.text]
+        if texts and texts[0].strip() in self.script:
+            call = self.script[texts[0].strip()]
+            return call if call[0] in llm_request.tools_dict else None
+        patient_id = next((match.group() for text in texts for match in [_PATIENT_ID.search(text)] if match), None)
+        if patient_id is None:
+            return None
+        for tool_name, args in self.stage_calls.items():
+            if tool_name in llm_request.tools_dict:
+                return tool_name, args(patient_id, self.agent_name)
+        return None
+
+
+def use_model_backend(agent: BaseAgent, make_model: Callable[[LlmAgent], BaseLlm]) -> None:
+    """Replace the model of every LLM agent in the tree."""
+    if isinstance(agent, LlmAgent):
+        agent.model = make_model(agent)
+    for sub_agent in agent.sub_agents:
+        use_model_backend(sub_agent, make_model)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def run_session(runner, session_service, patient: SyntheticPatient, turns: List[Turn],
+                      latencies: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    """Play one patient's conversation, timing each turn end to end.
+
+    Sessions are driven as a server would: the session starts empty, the
+    patient is identified by the tools, and the session service stores
+    every turn as the Runner appends it.
+    """
+    patient_id = patient.patient_id
+    session_id = f"load_{patient_id}"
+    await session_service.create_session(app_name=APP_NAME, user_id=patient_id, session_id=session_id)
+    for step, text, _ in turns:
+        start = time.perf_counter()
+        try:
+            async for _ in runner.run_async(
+                user_id=patient_id,
+                session_id=session_id,
+                new_message=types.Content(role="user", parts=[types.Part.from_text(text=text)]),
+            ):
+                pass
+        except Exception as e:
+            errors[f"{step}:{type(e).__name__}"] = errors.get(f"{step}:{type(e).__name__}", 0) + 1
+            continue
+        latencies.setdefault(step, []).append(time.perf_counter() - start)
+
+
+async def run(agent, database, sessions: int, concurrency: int, ramp_seconds: float,
+              seed: int) -> Dict[str, Any]:
+    """Drive `sessions` conversations, at most `concurrency` at a time."""
+    from google.adk.runners import Runner
+
+    from health_guardian_agent.session_store import PersistentSessionService
+
+    rng = random.Random(seed)
+    patients = list(generate_patients(sessions, seed=seed, history=HISTORY, messages=MESSAGES))
+    scripts = [conversation(patient, rng) for patient in patients]
+    for model in _scripted_models(agent):
+        model.script.update({text: call for turns in scripts for _, text, call in turns if call})
+
+    session_service = PersistentSessionService(database)
+    runner = Runner(agent=agent, app_name=APP_NAME, session_service=session_service)
+    latencies: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    gate = asyncio.Semaphore(concurrency)
+
+    async def start(index: int, patient: SyntheticPatient, turns: List[Turn]) -> None:
+        if ramp_seconds:
+            await asyncio.sleep(ramp_seconds * index / sessions)
+        async with gate:
+            await run_session(runner, session_service, patient, turns, latencies, errors)
+
+    database.pool.reset_stats()
+    began = time.perf_counter()
+    await asyncio.gather(*(start(i, patient, turns) for i, (patient, turns) in enumerate(zip(patients, scripts))))
+    database.flush_conversations()
+    elapsed = time.perf_counter() - began
+
+    turns_done = sum(len(values) for values in latencies.values())
+    return {
+        "sessions": sessions,
+        "concurrency": concurrency,
+        "turns": turns_done,
+        "errors": errors,
+        "seconds": elapsed,
+        "turns_per_sec": turns_done / elapsed if elapsed else 0.0,
+        "latency": {"all": _percentiles([v for values in latencies.values() for v in values]),
+                    **{step: _percentiles(values) for step, values in latencies.items()}} if turns_done else {},
+        "db": database.pool.stats(),
+    }
+
+
+def _scripted_models(agent: BaseAgent) -> List[ScriptedLlm]:
+    models = [agent.model] if isinstance(agent, LlmAgent) and isinstance(agent.model, ScriptedLlm) else []
+    for sub_agent in agent.sub_agents:
+        models += _scripted_models(sub_agent)
+    return models
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100, help="patient sessions to run")
+    parser.add_argument("--concurrency", type=int, help="sessions in flight at once (default: all)")
+    parser.add_argument("--ramp-seconds", type=float, default=0.0, help="spread session starts over this long")
+    parser.add_argument("--backend", choices=["scripted", "live", "record", "replay"], default="scripted",
+                        help="model backend")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="scripted or replayed model latency per call")
+    parser.add_argument("--recordings", default="model_recordings.jsonl", help="record/replay store")
+    parser.add_argument("--db", help="database file (default: a temporary one)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["HEALTH_GUARDIAN_DB"] = args.db or os.path.join(tempfile.mkdtemp(), "load.db")
+    from health_guardian_agent.config import config
+
+    if args.backend == "scripted":
+        config.search_backend = "local"
+    elif args.backend in ("record", "replay"):
+        config.model_backend = args.backend
+        config.model_recordings_path = args.recordings
+        config.replay_latency_ms = args.latency_ms
+    from health_guardian_agent.agent import root_agent
+    from health_guardian_agent.database import db
+    from health_guardian_agent.result_cache import result_cache
+    from health_guardian_agent.retry import retry_controller
+    from health_guardian_agent.search_cache import search_cache
+
+    if args.backend == "scripted":
+        use_model_backend(root_agent, lambda agent: ScriptedLlm(
+            model=f"scripted/{agent.name}", agent_name=agent.name, latency=args.latency_ms / 1000))
+
+    existing = db.connection().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+    load = None
+    if existing < args.sessions:
+        load = populate(db, args.sessions - existing, seed=args.seed, history=HISTORY, messages=MESSAGES,
+                        start_id=existing + 1)
+    try:
+        results = asyncio.run(run(root_agent, db.get(), args.sessions, args.concurrency or args.sessions,
+                                  args.ramp_seconds, args.seed))
+    finally:
+        db.close()
+    results.update({
+        "backend": args.backend,
+        "load": load,
+        "retry": retry_controller.stats(),
+        "result_cache": result_cache.stats(),
+        "search_cache": search_cache.stats(),
+    })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
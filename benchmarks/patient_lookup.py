@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Patient lookup benchmark.
+
+Loads a synthetic population (1M patients by default, without readings or
+conversations), then times HealthDatabase.find_patients for lookups typed
+differently from how the patient was stored: reformatted phone numbers,
+reordered and recased names, and misspelled names. Reports p50/p99 latency
+and how often the right patient ranked first, next to the old exact
+`name = ? OR phone = ?` query.
+
+    python -m benchmarks.patient_lookup --scale 1M --db lookup.db
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.synthetic import SCALES, generate_patients, populate
+
+
+def _misspell(name: str, rng: random.Random) -> str:
+    """Swap one vowel after the first letter of a word, keeping how it sounds."""
+    positions = [i for i, ch in enumerate(name) if ch in "aeiou" and i and name[i - 1] != " "]
+    if not positions:
+        return name
+    i = rng.choice(positions)
+    return name[:i] + rng.choice([v for v in "aeiouy" if v != name[i]]) + name[i + 1:]
+
+
+def _variants(name: str, phone: str, rng: random.Random) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+    first, last = name.split(" ", 1)
+    digits = "".join(ch for ch in phone if ch.isdigit())[-10:]
+    return {
+        "phone_reformatted": (None, f"{digits[:3]}.{digits[3:6]}.{digits[6:]}"),
+        "name_reordered_and_phone": (f"{last.upper()}, {first}", digits),
+        "misspelled_name_and_phone": (_misspell(name, rng), f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"),
+        "name_only": (name.lower(), None),
+        "misspelled_name_only": (_misspell(name, rng), None),
+    }
+
+
+def _sample(count: int, lookups: int, seed: int) -> List[Tuple[str, str, str]]:
+    wanted = set(random.Random(seed + 1).sample(range(count), min(lookups, count)))
+    return [(p.patient_id, p.name, p.phone)
+            for index, p in enumerate(generate_patients(count, seed=seed, history=0, messages=0))
+            if index in wanted]
+
+
+def _time(fn: Callable[[], Any]) -> Tuple[float, Any]:
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(database, count: int, lookups: int, seed: int) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    conn = database.connection()
+    # The schema no longer keeps the raw name/phone indexes; give the old query back the ones it ran with
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_name ON patients (name, phone, patient_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_patients_phone ON patients (phone, name, patient_id)")
+    latencies: Dict[str, List[float]] = {}
+    first: Dict[str, int] = {}
+    for patient_id, name, phone in _sample(count, lookups, seed):
+        for variant, (query_name, query_phone) in _variants(name, phone, rng).items():
+            elapsed, candidates = _time(lambda: database.find_patients(query_name, query_phone))
+            latencies.setdefault(variant, []).append(elapsed)
+            first[variant] = first.get(variant, 0) + bool(candidates and candidates[0]["patient_id"] == patient_id)
+
+            elapsed, rows = _time(lambda: conn.execute(
+                "SELECT patient_id FROM patients WHERE name = ? OR phone = ?", (query_name, query_phone)
+            ).fetchall())
+            latencies.setdefault(f"exact_or.{variant}", []).append(elapsed)
+            first[f"exact_or.{variant}"] = first.get(f"exact_or.{variant}", 0) + bool(
+                rows and rows[0][0] == patient_id)
+
+    results = {}
+    for name, values in latencies.items():
+        ordered = sorted(values)
+        results[name] = {
+            "lookups": len(values),
+            "p50_ms": statistics.median(ordered) * 1000,
+            "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+            "ranked_first": first[name] / len(values),
+        }
+    return results
+
+
+def main():
+    from health_guardian_agent.database import HealthDatabase
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1M", help="number of patients")
+    parser.add_argument("--db", help="database file; reused if it already holds the population")
+    parser.add_argument("--lookups", type=int, default=1000, help="patients to look up")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    count = SCALES[args.scale]
+    path = args.db or os.path.join(tempfile.mkdtemp(), "lookup.db")
+    database = HealthDatabase(path)
+    try:
+        load = None
+        existing = database.connection().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        if existing < count:
+            load = populate(database, count - existing, seed=args.seed, history=0, messages=0, batch_size=10000,
+                            start_id=existing + 1)
+        print(json.dumps({"patients": count, "load": load, "results": run(database, count, args.lookups, args.seed)},
+                         indent=2))
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
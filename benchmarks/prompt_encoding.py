@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Prompt encoding benchmark.
+
+Compares the estimated input tokens of the old pretty-printed health data
+(json.dumps(indent=2)) with the compact encoding, on synthetic patients in
+two shapes: structured readings as stored by the tools, and report-extracted
+readings with spelled-out units and empty fields. Also compares a full
+pretty-printed history with the token-budgeted compact history.
+
+    python -m benchmarks.prompt_encoding --patients 500 --history 12
+"""
+
+import argparse
+import json
+import statistics
+from typing import Any, Dict, List
+
+from benchmarks.synthetic import generate_patients
+from health_guardian_agent.prompt_encoding import encode_health_data, estimate_tokens
+
+# Spelled-out units as they come back from reading scanned reports
+EXTRACTED_UNITS = {
+    "heart_rate": "{} beats per minute",
+    "temperature": "{} degrees Fahrenheit",
+    "oxygen_saturation": "{} percent",
+    "weight_kg": "{} kilograms",
+    "glucose": "{} milligrams per deciliter",
+    "cholesterol": "{} milligrams per deciliter",
+    "ldl": "{} milligrams per deciliter",
+    "hemoglobin": "{} grams per deciliter",
+    "creatinine": "{} milligrams per deciliter",
+}
+EXTRACTED_EMPTY = {"vital_signs": ["respiratory_rate", "notes"], "lab_results": ["hdl", "triglycerides", "notes"]}
+
+
+def as_extracted(data_type: str, data: Any) -> Any:
+    """Rewrite a structured reading the way a report extraction tends to produce it."""
+    if isinstance(data, list):
+        return [item.replace("mg", " milligrams").replace("twice daily", "twice a day") for item in data]
+    extracted: Dict[str, Any] = {}
+    for key, value in data.items():
+        extracted[key] = EXTRACTED_UNITS[key].format(value) if key in EXTRACTED_UNITS else value
+        if key == "blood_pressure":
+            extracted[key] = f"{value} mm Hg"
+    for key in EXTRACTED_EMPTY.get(data_type, ()):
+        extracted[key] = None if key != "notes" else ""
+    return extracted
+
+
+def measure(patients: int, history: int, budget: int, seed: int) -> Dict[str, Dict[str, float]]:
+    samples: Dict[str, List[int]] = {}
+
+    def add(name: str, text: str) -> None:
+        samples.setdefault(name, []).append(estimate_tokens(text))
+
+    for patient in generate_patients(patients, seed=seed, history=history):
+        for shape in ("structured", "extracted"):
+            records = [
+                {"data_type": data_type,
+                 "data": as_extracted(data_type, data) if shape == "extracted" else data,
+                 "recorded_at": recorded_at}
+                for data_type, data, recorded_at in reversed(patient.records)
+            ]
+            latest: Dict[str, Any] = {}
+            for record in records:
+                latest.setdefault(record["data_type"], record["data"])
+
+            add(f"{shape}.latest.pretty", json.dumps({"patient_id": patient.patient_id, **latest}, indent=2))
+            add(f"{shape}.latest.compact", encode_health_data(patient.patient_id, latest))
+            add(f"{shape}.history.pretty", json.dumps(
+                {"patient_id": patient.patient_id, **latest, "history": records}, indent=2))
+            add(f"{shape}.history.compact", encode_health_data(patient.patient_id, latest, records))
+            add(f"{shape}.history.budgeted", encode_health_data(patient.patient_id, latest, records, budget))
+
+    results = {name: {"mean_tokens": statistics.mean(values), "max_tokens": max(values)}
+               for name, values in samples.items()}
+    for shape in ("structured", "extracted"):
+        for view in ("latest", "history"):
+            pretty = results[f"{shape}.{view}.pretty"]["mean_tokens"]
+            compact = results[f"{shape}.{view}.compact"]["mean_tokens"]
+            results[f"{shape}.{view}.compact"]["reduction_pct"] = 100 * (1 - compact / pretty)
+        pretty = results[f"{shape}.history.pretty"]["mean_tokens"]
+        budgeted = results[f"{shape}.history.budgeted"]["mean_tokens"]
+        results[f"{shape}.history.budgeted"]["reduction_pct"] = 100 * (1 - budgeted / pretty)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--history", type=int, default=12, help="readings per category per patient")
+    parser.add_argument("--budget", type=int, default=600, help="token budget for the budgeted history")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = measure(args.patients, args.history, args.budget, args.seed)
+    for name, stats in results.items():
+        reduction = f"  {stats['reduction_pct']:5.1f}% fewer" if "reduction_pct" in stats else ""
+        print(f"{name:30s} mean {stats['mean_tokens']:8.1f}  max {stats['max_tokens']:6d}{reduction}")
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Storage benchmark suite.
+
+Populates a database with a synthetic patient population, then times every
+HealthDatabase, tools.py and PersistentSessionService operation and writes
+throughput, p50/p99 latency and the database file size as JSON. Pass an
+earlier results file with --baseline to flag p99 regressions between releases.
+
+    python -m benchmarks.storage_suite --scale 1k --output results.json
+    python -m benchmarks.storage_suite --scale 1k --baseline results.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from benchmarks.synthetic import SCALES, populate
+
+
+def _summarize(latencies: List[float]) -> Dict[str, float]:
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return {
+        "ops": len(latencies),
+        "ops_per_sec": len(latencies) / total if total else 0.0,
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000,
+    }
+
+
+def _time_sync(fn: Callable[[int], Any], iterations: int) -> Dict[str, float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    return _summarize(latencies)
+
+
+async def _time_async(fn: Callable[[int], Awaitable[Any]], iterations: int) -> Dict[str, float]:
+    latencies = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        await fn(i)
+        latencies.append(time.perf_counter() - start)
+    return _summarize(latencies)
+
+
+def run_suite(patients: int, iterations: int, seed: int = 0) -> Dict[str, Any]:
+    """Time every storage operation against the global database."""
+    from health_guardian_agent import tools
+    from health_guardian_agent.database import db
+    from health_guardian_agent.session_store import PersistentSessionService
+
+    rng = random.Random(seed)
+    width = max(3, len(str(patients)))
+    pids = [f"PAT{rng.randint(1, patients):0{width}d}" for _ in range(iterations)]
+    names = [db.get_patient_info(pid).get("name") for pid in pids[:50]]
+    vitals = {"blood_pressure": "131/84", "heart_rate": 74, "temperature": 98.5}
+
+    results: Dict[str, Dict[str, float]] = {}
+    sync_ops = {
+        "db.get_patient_info": lambda i: db.get_patient_info(pids[i]),
+        "db.get_patient_data": lambda i: db.get_patient_data(pids[i]),
+        "db.get_patient_data[vital_signs]": lambda i: db.get_patient_data(pids[i], "vital_signs"),
+        "db.get_patient_data_history": lambda i: db.get_patient_data_history(pids[i]),
+        "db.get_observations[glucose]": lambda i: db.get_observations(pids[i], ["glucose"]),
+        "db.get_latest_assessment": lambda i: db.get_latest_assessment(pids[i], "risk_assessment"),
+        "db.get_conversation_history": lambda i: db.get_conversation_history(pids[i], f"session_{pids[i]}"),
+        "db.get_conversation_page": lambda i: db.get_conversation_page(pids[i], f"session_{pids[i]}", 21),
+        "db.store_patient_data": lambda i: db.store_patient_data(pids[i], "vital_signs", vitals),
+        "db.store_patient_info": lambda i: db.store_patient_info(pids[i], phone=f"555{i:07d}"),
+        "db.store_assessment": lambda i: db.store_assessment(pids[i], "risk_assessment", "Low risk. " * 50),
+        "db.store_conversation_message": lambda i: db.store_conversation_message(
+            pids[i], f"session_{pids[i]}", "user", "How am I doing?"),
+        "db.allocate_patient_id": lambda i: db.allocate_patient_id(),
+    }
+    # Cold reads: measure the storage path, not the read cache.
+    for name, fn in sync_ops.items():
+        db.cache.clear()
+        results[name] = _time_sync(fn, iterations)
+    db.flush_conversations()
+
+    async def async_ops() -> None:
+        service = PersistentSessionService(db)
+        sessions = {}
+
+        async def get_session(i):
+            sessions[i] = await service.get_session(
+                app_name="bench", user_id=pids[i], session_id=f"session_{pids[i]}")
+
+        async def save_session(i):
+            session = sessions[i]
+            session.state["care_plan"] = f"plan revision {i}"
+            await service.save_session(session)
+
+        ops = {
+            "tools.fetch_health_data": lambda i: tools.fetch_health_data(pids[i]),
+            "tools.analyze_health_trends": lambda i: tools.analyze_health_trends(pids[i]),
+            "tools.find_patient_by_name_or_phone": lambda i: tools.find_patient_by_name_or_phone(
+                name=names[i % len(names)]),
+            "tools.generate_patient_id": lambda i: tools.generate_patient_id(),
+            "tools.store_health_data": lambda i: tools.store_health_data(pids[i], "vital_signs", vitals),
+            "session.create_session": lambda i: service.create_session(
+                app_name="bench", user_id=pids[i], session_id=f"new_{i}"),
+            "session.get_session": get_session,
+            "session.save_session": save_session,
+            "session.load_history": lambda i: service.load_history(pids[i], f"session_{pids[i]}"),
+        }
+        for name, fn in ops.items():
+            db.cache.clear()
+            results[name] = await _time_async(fn, iterations)
+
+    asyncio.run(async_ops())
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Return a line per operation whose p99 grew by more than `threshold` x."""
+    regressions = []
+    for name, current in results["operations"].items():
+        previous = baseline.get("operations", {}).get(name)
+        if previous and previous["p99_ms"] > 0 and current["p99_ms"] > previous["p99_ms"] * threshold:
+            regressions.append(f"{name}: p99 {previous['p99_ms']:.3f}ms -> {current['p99_ms']:.3f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k", help="number of synthetic patients")
+    parser.add_argument("--iterations", type=int, default=500, help="timed calls per operation")
+    parser.add_argument("--db", help="database file to use (default: a temporary file)")
+    parser.add_argument("--skip-populate", action="store_true", help="reuse an already populated --db")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare p99 latencies against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p99 ratio that counts as a regression")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tmp = None
+    db_path = args.db
+    if not db_path:
+        tmp = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmp.name, "bench.db")
+    # The package-level database, used by tools.py, must point at the bench file.
+    os.environ["HEALTH_GUARDIAN_DB"] = db_path
+    from health_guardian_agent.database import db
+
+    patients = SCALES[args.scale]
+    populate_stats = None if args.skip_populate else populate(db, patients, seed=args.seed)
+    operations = run_suite(patients, args.iterations, seed=args.seed)
+    db.close()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "scale": args.scale,
+            "patients": patients,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+        },
+        "populate": populate_stats,
+        "db_file_bytes": os.path.getsize(db_path),
+        "operations": operations,
+    }
+    if tmp:
+        tmp.cleanup()
+
+    for name, stats in operations.items():
+        print(f"{name:40s} {stats['ops_per_sec']:10.0f} ops/s  p50 {stats['p50_ms']:7.3f}ms  "
+              f"p99 {stats['p99_ms']:7.3f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
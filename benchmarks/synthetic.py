@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Synthetic patient population generator for storage benchmarks.
+
+Generates patients with realistic vital_signs, lab_results, medications and
+conditions histories plus conversation logs, and bulk-loads them into a
+HealthDatabase file.
+
+    python -m benchmarks.synthetic --scale 1k --db synthetic.db
+"""
+
+import argparse
+import datetime
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000}
+# Minimum zero-padded digits in patient IDs, as in HealthConfiguration.patient_id_width
+PATIENT_ID_WIDTH = 3
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "William", "Barbara", "Maria", "Wei", "Aisha", "Carlos",
+               "Priya", "Olga", "Kenji", "Fatima", "Sudarshan", "Grace", "Ahmed", "Lucia"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Rodriguez", "Martinez", "Nguyen", "Patel", "Kim", "Chen", "Okafor", "Silva",
+              "Ivanova", "Tanaka", "Haddad", "Sharma", "Müller", "O'Brien"]
+
+CONDITIONS = ["Type 2 diabetes", "Hypertension", "Hyperlipidemia", "Asthma", "COPD",
+              "Chronic kidney disease stage 3", "Atrial fibrillation", "Hypothyroidism",
+              "Heart failure", "Osteoarthritis", "Depression", "Obesity"]
+MEDICATIONS = ["Metformin 500mg twice daily", "Lisinopril 10mg daily", "Atorvastatin 20mg daily",
+               "Amlodipine 5mg daily", "Levothyroxine 50mcg daily", "Albuterol inhaler as needed",
+               "Apixaban 5mg twice daily", "Furosemide 40mg daily", "Sertraline 50mg daily",
+               "Insulin glargine 20 units nightly", "Losartan 50mg daily", "Aspirin 81mg daily"]
+
+USER_MESSAGES = ["My blood pressure was high this morning, should I worry?",
+                 "I forgot to take my metformin yesterday.",
+                 "Can you explain my latest lab results?",
+                 "I've been feeling dizzy after standing up.",
+                 "What foods should I avoid with my condition?",
+                 "Here are my readings from this week."]
+AGENT_MESSAGES = ["Thanks for sharing. A single elevated reading is common; let's look at the trend.",
+                  "If you miss a dose, take the next one as scheduled and don't double up.",
+                  "Your glucose is slightly above target. Here is what that means for you.",
+                  "Dizziness on standing can be related to blood pressure medication. Please tell your doctor.",
+                  "A diet lower in sodium and refined carbohydrates will help. Here are some ideas.",
+                  "I've stored your readings. Your heart rate looks stable."]
+
+
+@dataclass
+class SyntheticPatient:
+    patient_id: str
+    name: str
+    phone: str
+    # (data_type, data, recorded_at) oldest first
+    records: List[Tuple[str, Any, str]] = field(default_factory=list)
+    # (session_id, message_type, content)
+    messages: List[Tuple[str, str, str]] = field(default_factory=list)
+
+
+def _vital_signs(rng: random.Random, baseline: Dict[str, float]) -> Dict[str, Any]:
+    systolic = int(rng.gauss(baseline["systolic"], 8))
+    diastolic = int(rng.gauss(baseline["diastolic"], 6))
+    return {
+        "blood_pressure": f"{systolic}/{diastolic}",
+        "heart_rate": int(rng.gauss(baseline["heart_rate"], 6)),
+        "temperature": round(rng.gauss(98.4, 0.4), 1),
+        "oxygen_saturation": min(100, int(rng.gauss(97, 1.5))),
+        "weight_kg": round(rng.gauss(baseline["weight"], 1.0), 1),
+    }
+
+
+def _lab_results(rng: random.Random, baseline: Dict[str, float]) -> Dict[str, Any]:
+    return {
+        "glucose": int(rng.gauss(baseline["glucose"], 15)),
+        "hba1c": round(rng.gauss(baseline["glucose"] / 20.0, 0.3), 1),
+        "cholesterol": int(rng.gauss(195, 25)),
+        "ldl": int(rng.gauss(115, 20)),
+        "hemoglobin": round(rng.gauss(13.8, 1.1), 1),
+        "creatinine": round(max(0.4, rng.gauss(1.0, 0.25)), 2),
+    }
+
+
+def generate_patients(count: int, seed: int = 0, history: int = 3, messages: int = 4,
+                      start_id: int = 1) -> Iterator[SyntheticPatient]:
+    """Yield `count` synthetic patients, each with `history` readings per category.
+
+    Each patient is generated from its own index, so PAT042 is the same
+    patient whether it comes from a full run or one resumed at `start_id`.
+    """
+    epoch = datetime.datetime(2023, 1, 1)
+    for index in range(start_id, start_id + count):
+        rng = random.Random(f"{seed}:{index}")
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = f"+1 ({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}"
+        patient = SyntheticPatient(patient_id=f"PAT{index:0{PATIENT_ID_WIDTH}d}", name=name, phone=phone)
+
+        baseline = {
+            "systolic": rng.uniform(112, 150),
+            "diastolic": rng.uniform(70, 95),
+            "heart_rate": rng.uniform(60, 90),
+            "weight": rng.uniform(55, 110),
+            "glucose": rng.uniform(85, 170),
+        }
+        conditions = rng.sample(CONDITIONS, rng.randint(1, 3))
+        medications = rng.sample(MEDICATIONS, rng.randint(1, 4))
+        when = epoch + datetime.timedelta(days=rng.randint(0, 365))
+        for _ in range(history):
+            when += datetime.timedelta(days=rng.randint(7, 60), minutes=rng.randint(0, 1440))
+            stamp = when.strftime("%Y-%m-%d %H:%M:%S")
+            patient.records.append(("vital_signs", _vital_signs(rng, baseline), stamp))
+            patient.records.append(("lab_results", _lab_results(rng, baseline), stamp))
+        stamp = when.strftime("%Y-%m-%d %H:%M:%S")
+        patient.records.append(("medications", medications, stamp))
+        patient.records.append(("conditions", conditions, stamp))
+
+        session_id = f"session_{patient.patient_id}"
+        for turn in range(messages // 2):
+            choice = rng.randrange(len(USER_MESSAGES))
+            patient.messages.append((session_id, "user", USER_MESSAGES[choice]))
+            patient.messages.append((session_id, "agent", AGENT_MESSAGES[choice]))
+        yield patient
+
+
+def populate(database, count: int, seed: int = 0, history: int = 3, messages: int = 4,
+             batch_size: int = 1000, start_id: int = 1) -> Dict[str, float]:
+    """Bulk-load synthetic patients `start_id` onwards into `database` and return load statistics.
+
+    Health data goes through the same batched write path as file ingestion,
+    so latest readings and observations are indexed exactly as in production.
+    """
+    start = time.perf_counter()
+    rows = 0
+    batch: List[SyntheticPatient] = []
+
+    def flush() -> int:
+        inserted = database.store_patient_data_batch(
+            [(p.patient_id, data_type, json.dumps(data), recorded_at)
+             for p in batch for data_type, data, recorded_at in p.records],
+            {p.patient_id: (p.name, p.phone) for p in batch},
+        )
+        for p in batch:
+            for session_id, message_type, content in p.messages:
+                database.store_conversation_message(p.patient_id, session_id, message_type, content)
+        # Bound the write-behind queue to one batch of messages
+        database.flush_conversations()
+        return len(batch) + inserted + sum(len(p.messages) for p in batch)
+
+    for patient in generate_patients(count, seed=seed, history=history, messages=messages, start_id=start_id):
+        batch.append(patient)
+        if len(batch) >= batch_size:
+            rows += flush()
+            batch = []
+    if batch:
+        rows += flush()
+
+    with database.transaction() as conn:
+        conn.execute("UPDATE id_sequences SET value = MAX(value, ?) WHERE name = 'PAT'", (start_id + count - 1,))
+    database.cache.clear()
+
+    elapsed = time.perf_counter() - start
+    return {"patients": count, "rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed}
+
+
+def main():
+    from health_guardian_agent.database import HealthDatabase
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="1k", help="number of patients")
+    parser.add_argument("--db", default="synthetic.db", help="database file to populate")
+    parser.add_argument("--history", type=int, default=3, help="readings per category per patient")
+    parser.add_argument("--messages", type=int, default=4, help="conversation messages per patient")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    database = HealthDatabase(args.db)
+    stats = populate(database, SCALES[args.scale], seed=args.seed, history=args.history, messages=args.messages)
+    database.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
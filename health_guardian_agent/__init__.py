@@ -12,6 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from .agent import root_agent
+# The agent tree, credentials and database are built on first access to
+# root_agent, so importing the package stays cheap and side-effect free.
+__all__ = ["root_agent"]
 
-__all__ = ["root_agent"]
\ No newline at end of file
+
+def __getattr__(name):
+    if name == "root_agent":
+        from .agent import root_agent
+
+        return root_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -17,35 +17,68 @@ import datetime
 from google.adk.agents import Agent
 from google.adk.tools import FunctionTool
 
-from .config import config
+from .config import config, ensure_environment
+from .model_replay import resolve_model
+from .pipeline import PipelineScheduler
 from .sub_agents import (
     robust_health_education_specialist,
     robust_health_risk_analyzer,
     robust_treatment_planner,
     robust_vital_signs_monitor,
 )
-from .tools import fetch_health_data, find_patient_by_name_or_phone, generate_patient_id, save_health_report_to_file, store_health_data, store_patient_info
+from .tools import fetch_earlier_conversation, fetch_health_data, find_patient_by_name_or_phone, generate_patient_id, save_health_report_to_file, search_patient_records, store_health_data, store_patient_info
+from .tracing import tracer
+
+ensure_environment()
 
 # --- AGENT DEFINITIONS ---
 
+# Education and the care plan both build on the risk assessment but not on each
+# other, so they run side by side once it is ready.
+health_analysis_pipeline = PipelineScheduler(
+    name="health_analysis_pipeline",
+    description="Runs the full health analysis: monitors health data, assesses risks, creates educational content and develops a care plan.",
+    sub_agents=[
+        robust_vital_signs_monitor,
+        robust_health_risk_analyzer,
+        robust_health_education_specialist,
+        robust_treatment_planner,
+    ],
+    stage_inputs={
+        "robust_health_risk_analyzer": ["health_data_summary"],
+        "robust_health_education_specialist": ["health_data_summary", "risk_assessment"],
+        "robust_treatment_planner": ["health_data_summary", "risk_assessment"],
+    },
+    stage_outputs={
+        "robust_vital_signs_monitor": ["health_data_summary"],
+        "robust_health_risk_analyzer": ["risk_assessment"],
+        "robust_health_education_specialist": ["education_content"],
+        "robust_treatment_planner": ["care_plan"],
+    },
+    mode=config.pipeline_mode,
+)
+
 interactive_health_guardian_agent = Agent(
     name="interactive_health_guardian_agent",
-    model=config.worker_model,
+    model=resolve_model(config.worker_model),
     description="The primary health management assistant. It collaborates with patients to create personalized health plans.",
     instruction=f"""
     You are a health guardian assistant. Your primary function is to help patients manage their chronic conditions and improve their health outcomes.
 
-    First, check if there's a patient_id stored in the session state. If there is, use that patient ID for all operations. If not, ask the user for their name and phone number. Use the find_patient_by_name_or_phone tool to search for an existing patient. If found, use that patient ID and store it in session state. If not found, use the generate_patient_id tool to create a unique patient ID (format: PAT followed by 3 digits, like PAT001), store it in the session state, and inform them of their new patient ID. Then store their name and phone information using the store_patient_info tool. Use this patient ID for all subsequent operations.
+    First, check if there's a patient_id stored in the session state. If there is, use that patient ID for all operations. If not, ask the user for their name and phone number. Use the find_patient_by_name_or_phone tool to search for an existing patient. If several candidates score alike, confirm with the user which one they are. If found, use that patient ID and store it in session state. If not found but candidates are returned, ask the user whether they are one of them and use that candidate's patient ID only after they confirm. If not found and the user is none of the candidates, use the generate_patient_id tool to create a unique patient ID (format: PAT followed by a zero-padded number, like PAT001), store it in the session state, and inform them of their new patient ID. Then store their name and phone information using the store_patient_info tool. Use this patient ID for all subsequent operations.
 
     If health data is not available for the patient, ask them to share images of their medical reports, lab results, or doctor's notes. You can analyze these images directly to extract health information. Once you have the information, use the `store_health_data` tool to store it in the appropriate categories (vital_signs, lab_results, medications, conditions). If they provide text information instead, also use the `store_health_data` tool.
 
+    Only the most recent part of the conversation is loaded. If the patient refers to something said earlier that you cannot see, use the `fetch_earlier_conversation` tool to load older turns. To recall what was discussed or recommended in earlier sessions (symptoms, past risk assessments, care plans), use the `search_patient_records` tool with a few keywords.
+
     Your workflow is as follows:
-    1.  **Monitor:** You will analyze the patient's health data. To do this, use the `robust_vital_signs_monitor` tool with the patient's ID.
-    2.  **Assess:** You will evaluate health risks and potential complications. Use the `robust_health_risk_analyzer` tool.
-    3.  **Educate:** You will create personalized educational content. Use the `robust_health_education_specialist` tool.
-    4.  **Plan:** You will develop a comprehensive care plan. Use the `robust_treatment_planner` tool.
-    5.  **Review:** Present the complete health report to the patient and allow for feedback and refinements.
-    6.  **Export:** When the patient approves the final version, ask for a filename and save the health report as a markdown file. If agreed, use the `save_health_report_to_file` tool.
+    1.  **Analyze:** Hand off to the `health_analysis_pipeline` agent with the patient's ID. It runs every analysis stage for you:
+        *   **Monitor:** analyzes the patient's health data (`health_data_summary`).
+        *   **Assess:** evaluates health risks and potential complications (`risk_assessment`).
+        *   **Educate:** creates personalized educational content (`education_content`).
+        *   **Plan:** develops a comprehensive care plan (`care_plan`).
+    2.  **Review:** Present the complete health report to the patient and allow for feedback and refinements.
+    3.  **Export:** When the patient approves the final version, ask for a filename and save the health report as a markdown file. If agreed, use the `save_health_report_to_file` tool.
 
     Always prioritize patient safety and remind them that you are not a substitute for professional medical advice.
     If symptoms suggest an emergency, advise seeking immediate medical attention.
@@ -54,21 +87,21 @@ interactive_health_guardian_agent = Agent(
 
     Current date: {datetime.datetime.now().strftime("%Y-%m-%d")}
     """,
-    sub_agents=[
-        robust_vital_signs_monitor,
-        robust_health_risk_analyzer,
-        robust_health_education_specialist,
-        robust_treatment_planner,
-    ],
+    sub_agents=[health_analysis_pipeline],
     tools=[
         FunctionTool(find_patient_by_name_or_phone),
         FunctionTool(generate_patient_id),
         FunctionTool(save_health_report_to_file),
         FunctionTool(fetch_health_data),
+        FunctionTool(fetch_earlier_conversation),
+        FunctionTool(search_patient_records),
         FunctionTool(store_health_data),
         FunctionTool(store_patient_info),
     ],
     output_key="health_report",
 )
 
+# Trace every agent, model call and tool in the tree
+tracer.instrument(interactive_health_guardian_agent)
+
 root_agent = interactive_health_guardian_agent
\ No newline at end of file
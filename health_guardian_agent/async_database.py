@@ -0,0 +1,108 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from .database import SEARCH_SOURCES, HealthDatabase, LazyHealthDatabase, db
+
+T = TypeVar("T")
+
+
+class AsyncHealthDatabase:
+    """Awaitable facade over HealthDatabase that keeps SQLite off the event loop.
+
+    Calls are dispatched to a small dedicated thread pool. Each worker thread
+    gets its own pooled connection, so the event loop only ever awaits a
+    future and keeps serving other conversations while the disk is busy.
+    """
+
+    def __init__(self, database: HealthDatabase, max_workers: int = 4):
+        self.database = database
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="health-db"
+        )
+
+    async def open(self) -> HealthDatabase:
+        """Return the real database, opening a lazy one (and migrating it) on the executor."""
+        if isinstance(self.database, LazyHealthDatabase):
+            if not self.database.is_open:
+                await self.run(self.database.get)
+            return self.database.get()
+        return self.database
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run a blocking storage call on the executor and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(fn, *args, **kwargs)
+        )
+
+    async def store_patient_info(self, patient_id: str, name: str = None, phone: str = None) -> bool:
+        return await self.run(self.database.store_patient_info, patient_id, name, phone)
+
+    async def get_patient_info(self, patient_id: str) -> Dict[str, Any]:
+        return await self.run(self.database.get_patient_info, patient_id)
+
+    async def store_patient_data(self, patient_id: str, data_type: str, data: Dict[str, Any]) -> bool:
+        return await self.run(self.database.store_patient_data, patient_id, data_type, data)
+
+    async def get_patient_data(self, patient_id: str, data_type: Optional[str] = None) -> Dict[str, Any]:
+        return await self.run(self.database.get_patient_data, patient_id, data_type)
+
+    async def get_patient_data_history(self, patient_id: str, data_type: Optional[str] = None,
+                                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return await self.run(self.database.get_patient_data_history, patient_id, data_type, limit)
+
+    async def store_assessment(self, patient_id: str, assessment_type: str, content: str,
+                               input_hash: Optional[str] = None) -> bool:
+        return await self.run(self.database.store_assessment, patient_id, assessment_type, content, input_hash)
+
+    async def get_latest_assessment(self, patient_id: str, assessment_type: str) -> Optional[str]:
+        return await self.run(self.database.get_latest_assessment, patient_id, assessment_type)
+
+    async def get_cached_assessment(self, patient_id: str, assessment_type: str, input_hash: str) -> Optional[str]:
+        return await self.run(self.database.get_cached_assessment, patient_id, assessment_type, input_hash)
+
+    async def get_search_result(self, query_key: str, max_age_seconds: float) -> Optional[Any]:
+        return await self.run(self.database.get_search_result, query_key, max_age_seconds)
+
+    async def store_search_result(self, query_key: str, query: str, results: Any, max_entries: int) -> bool:
+        return await self.run(self.database.store_search_result, query_key, query, results, max_entries)
+
+    async def search_records(self, query: str, patient_id: Optional[str] = None,
+                             sources: Tuple[str, ...] = SEARCH_SOURCES, limit: int = 10) -> List[Dict[str, Any]]:
+        return await self.run(self.database.search_records, query, patient_id, sources, limit)
+
+    async def get_conversation_history(self, patient_id: str, session_id: str) -> List[tuple]:
+        return await self.run(self.database.get_conversation_history, patient_id, session_id)
+
+    async def get_conversation_page(self, patient_id: str, session_id: str, limit: int,
+                                    before: Optional[Tuple[str, int]] = None) -> List[tuple]:
+        return await self.run(self.database.get_conversation_page, patient_id, session_id, limit, before)
+
+    async def store_conversation_message(self, patient_id: str, session_id: str, message_type: str, content: str) -> bool:
+        return await self.run(
+            self.database.store_conversation_message, patient_id, session_id, message_type, content
+        )
+
+    def close(self) -> None:
+        """Wait for in-flight calls and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+
+# Global async facade over the shared database
+async_db = AsyncHealthDatabase(db)
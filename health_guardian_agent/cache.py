@@ -0,0 +1,159 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Set, Tuple
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe, size-bounded LRU cache whose entries also expire.
+
+    Entries can carry tags (e.g. ("patient", "PAT001")) so writers can drop
+    every cached view of a patient at once. A read-through load that overlaps
+    an invalidation of one of its tags is not stored, so a slow reader can
+    never re-cache stale data.
+    Cached values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any, Tuple[Hashable, ...]]]" = OrderedDict()
+        self._tagged: Dict[Hashable, Set[Hashable]] = {}
+        # Invalidation counters, kept only for tags with a load in flight
+        self._inflight: Dict[Hashable, int] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value, or `default` on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, tags: Iterable[Hashable] = ()) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._store(key, value, tuple(tags))
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], tags: Iterable[Hashable] = ()) -> Any:
+        """Return the cached value for `key`, calling `loader` on a miss.
+
+        Exceptions from `loader` propagate and nothing is cached.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return self.load(key, loader, tags)
+
+    def load(self, key: Hashable, loader: Callable[[], Any], tags: Iterable[Hashable] = ()) -> Any:
+        """Call `loader` and cache its result unless a tag was invalidated meanwhile."""
+        tags = tuple(tags)
+        with self._lock:
+            for tag in tags:
+                self._inflight[tag] = self._inflight.get(tag, 0) + 1
+            snapshot = self._snapshot(tags)
+        loaded = False
+        try:
+            value = loader()
+            loaded = True
+        finally:
+            with self._lock:
+                if loaded and snapshot == self._snapshot(tags):
+                    self._store(key, value, tags)
+                for tag in tags:
+                    remaining = self._inflight[tag] - 1
+                    if remaining:
+                        self._inflight[tag] = remaining
+                    else:
+                        del self._inflight[tag]
+                        self._generations.pop(tag, None)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry."""
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tag(self, tag: Hashable) -> None:
+        """Drop every entry carrying `tag` and fence out in-flight loads."""
+        with self._lock:
+            if tag in self._inflight:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            for key in list(self._tagged.get(tag, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._tagged.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "size": len(self._entries),
+            }
+
+    def _snapshot(self, tags: Tuple[Hashable, ...]) -> Tuple[int, ...]:
+        return (self._epoch,) + tuple(self._generations.get(tag, 0) for tag in tags)
+
+    def _store(self, key: Hashable, value: Any, tags: Tuple[Hashable, ...]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._remove(key)
+        self._entries[key] = (self._clock() + self.ttl_seconds, value, tags)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
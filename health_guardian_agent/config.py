@@ -13,27 +13,42 @@
 # limitations under the License.
 
 import os
+import threading
 from dataclasses import dataclass
 
-import google.auth
-from dotenv import load_dotenv
+_environment_lock = threading.Lock()
+_environment_ready = False
 
-# Load environment variables from .env file
-load_dotenv()
 
-# To use AI Studio credentials:
-# 1. Create a .env file in the /app directory with:
-#    GOOGLE_GENAI_USE_VERTEXAI=FALSE
-#    GOOGLE_API_KEY=PASTE_YOUR_ACTUAL_API_KEY_HERE
-# 2. This will override the default Vertex AI configuration
-try:
-    _, project_id = google.auth.default()
-    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-    os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
-    os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
-except Exception:
-    # Fall back to AI Studio if default credentials are not available
-    os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "False")
+def ensure_environment() -> None:
+    """Load .env and probe Google credentials, once, on first use.
+
+    To use AI Studio credentials:
+    1. Create a .env file in the /app directory with:
+       GOOGLE_GENAI_USE_VERTEXAI=FALSE
+       GOOGLE_API_KEY=PASTE_YOUR_ACTUAL_API_KEY_HERE
+    2. This will override the default Vertex AI configuration
+    """
+    global _environment_ready
+    if _environment_ready:
+        return
+    with _environment_lock:
+        if _environment_ready:
+            return
+        import google.auth
+        from dotenv import load_dotenv
+
+        # Load environment variables from .env file
+        load_dotenv()
+        try:
+            _, project_id = google.auth.default()
+            os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
+            os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
+            os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+        except Exception:
+            # Fall back to AI Studio if default credentials are not available
+            os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "False")
+        _environment_ready = True
 
 
 @dataclass
@@ -44,11 +59,56 @@ class HealthConfiguration:
         critic_model (str): Model for evaluation and validation tasks.
         worker_model (str): Model for generation and analysis tasks.
         max_analysis_iterations (int): Maximum analysis iterations allowed.
+        patient_id_width (int): Minimum zero-padded digits in generated patient IDs.
+        history_window_messages (int): Most recent messages loaded into a session.
+        history_token_budget (int): Approximate token cap for loaded history.
+        pipeline_mode (str): "parallel" to overlap independent analysis stages,
+            or "sequential" to run them one at a time in a fixed order.
+        result_cache_enabled (bool): Reuse stored sub-agent results when their inputs are unchanged.
+        health_data_history_token_budget (int): Token budget for older readings included by
+            fetch_health_data; 0 sends only the latest reading per category.
+        search_backend (str): "gemini" for grounded Google Search, which costs an extra
+            generate_content call per cache miss, or "local" for the offline stand-in.
+        search_cache_ttl_seconds (float): How long cached search results stay fresh.
+        search_cache_max_entries (int): Cached searches kept before least recently used are evicted.
+        trace_path (str): JSONL file that agent, model and tool spans are appended to; empty keeps
+            only the in-memory metrics.
+        stage_validation_retries (int): Extra attempts a robust stage gets when its output fails validation.
+        stage_transport_retries (int): Extra attempts a robust stage gets after transient model errors.
+        retry_base_delay_seconds (float): Backoff ceiling after the first transient error; doubles per retry.
+        retry_max_delay_seconds (float): Largest backoff ceiling.
+        request_deadline_seconds (float): Wall-clock budget for all stages of one request.
+        request_model_call_budget (int): Model calls allowed across all stages of one request.
+        model_backend (str): "live" to call the configured models, "record" to also store every
+            response in model_recordings_path, or "replay" to answer from those recordings offline.
+        model_recordings_path (str): JSONL file that recorded model and search responses are kept in.
+        replay_latency_ms (float): Synthetic latency added to every replayed response.
+        replay_latency_jitter_ms (float): Extra random latency, up to this much, per replayed response.
     """
 
     critic_model: str = "gemini-2.5-pro"
     worker_model: str = "gemini-2.5-flash"
     max_analysis_iterations: int = 5
+    patient_id_width: int = 3
+    history_window_messages: int = 20
+    history_token_budget: int = 2000
+    pipeline_mode: str = "parallel"
+    result_cache_enabled: bool = True
+    health_data_history_token_budget: int = 0
+    search_backend: str = "gemini"
+    search_cache_ttl_seconds: float = 7 * 24 * 3600
+    search_cache_max_entries: int = 10000
+    trace_path: str = ""
+    stage_validation_retries: int = 1
+    stage_transport_retries: int = 3
+    retry_base_delay_seconds: float = 0.5
+    retry_max_delay_seconds: float = 8.0
+    request_deadline_seconds: float = 180.0
+    request_model_call_budget: int = 24
+    model_backend: str = "live"
+    model_recordings_path: str = "model_recordings.jsonl"
+    replay_latency_ms: float = 0.0
+    replay_latency_jitter_ms: float = 0.0
 
 
 config = HealthConfiguration()
\ No newline at end of file
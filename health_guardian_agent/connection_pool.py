@@ -0,0 +1,159 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+# BEGIN IMMEDIATE slower than this is counted as having waited for another writer
+LOCK_WAIT_THRESHOLD_SECONDS = 0.001
+
+
+class ConnectionPool:
+    """Long-lived SQLite connections, one per thread, shared by all modules.
+
+    Every thread (and therefore every asyncio task running on that thread)
+    reuses the same connection for its lifetime, so connection setup and
+    PRAGMA negotiation happen once instead of once per query. Connections are
+    opened in autocommit mode; writes go through `transaction()`, which takes
+    the write lock up front with BEGIN IMMEDIATE so WAL readers are never
+    upgraded into a busy writer mid-transaction. Time spent waiting for the
+    write lock is counted and reported by `stats()`.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        timeout: float = 30.0,
+        cached_statements: int = 256,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size_kib: int = 16 * 1024,
+    ):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self.reset_stats()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new connection and apply the tuned PRAGMAs."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        local = self._local
+        conn = getattr(local, "conn", None)
+        # A forked child must never reuse its parent's connection.
+        if conn is None or local.pid != os.getpid():
+            conn = self._connect()
+            local.conn = conn
+            local.pid = os.getpid()
+            local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a write transaction, committing on success.
+
+        Nested calls on the same thread join the outermost transaction.
+        """
+        conn = self.connection()
+        local = self._local
+        if local.depth:
+            local.depth += 1
+            try:
+                yield conn
+            finally:
+                local.depth -= 1
+            return
+
+        started = time.perf_counter()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+        except sqlite3.OperationalError:
+            self._count_begin(time.perf_counter() - started, busy=True)
+            raise
+        self._count_begin(time.perf_counter() - started)
+        local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            local.depth = 0
+
+    def _count_begin(self, waited: float, busy: bool = False) -> None:
+        with self._lock:
+            counters = self._counters
+            counters["transactions"] += 1
+            counters["busy_errors"] += busy
+            if waited > LOCK_WAIT_THRESHOLD_SECONDS:
+                counters["lock_waits"] += 1
+                counters["lock_wait_seconds"] += waited
+                counters["max_lock_wait_seconds"] = max(counters["max_lock_wait_seconds"], waited)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return write transaction and write lock contention counters.
+
+        `lock_waits` counts transactions whose BEGIN IMMEDIATE waited longer
+        than LOCK_WAIT_THRESHOLD_SECONDS for another writer; `busy_errors`
+        counts those that gave up after `timeout` with "database is locked".
+        """
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        stats["lock_wait_rate"] = stats["lock_waits"] / stats["transactions"] if stats["transactions"] else 0.0
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._counters: Dict[str, Any] = {
+                "transactions": 0, "lock_waits": 0, "busy_errors": 0,
+                "lock_wait_seconds": 0.0, "max_lock_wait_seconds": 0.0,
+            }
+
+    def close(self) -> None:
+        """Close every connection handed out by this pool."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
@@ -12,171 +12,449 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+import itertools
+import os
+import re
 import sqlite3
 import json
-from typing import Dict, Any, Optional, List
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Iterator, Optional, List, Tuple
 from pathlib import Path
 
+from .cache import TTLCache
+from .connection_pool import ConnectionPool
+from .migrations import migrate
+from .observations import index_observations
+from .patient_matching import name_key, name_phonetic, patient_keys, phone_key, rank_candidates
+from .write_behind import DURABILITY_BATCHED, DURABILITY_SYNC, ConversationWriter
+
+# Cache tags used to drop cached reads when the underlying rows change
+LOOKUP_CACHE_TAG = "patient_lookup"
+
+# Search cache hits buffered in memory before their last_used/hits updates are written
+SEARCH_TOUCH_BATCH = 256
+
+
+# Record kinds covered by full-text search
+SEARCH_SOURCES = ("conversations", "assessments")
+
+_SEARCH_TERM = re.compile(r"[^\W_]+")
+
+
+# Lookup keys follow name and phone; a None leaves the stored value in place
+_UPSERT_PATIENT_SQL = """
+    INSERT INTO patients (patient_id, name, phone, phone_key, name_key, name_phonetic)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(patient_id) DO UPDATE SET
+        name = COALESCE(EXCLUDED.name, patients.name),
+        phone = COALESCE(EXCLUDED.phone, patients.phone),
+        phone_key = COALESCE(EXCLUDED.phone_key, patients.phone_key),
+        name_key = COALESCE(EXCLUDED.name_key, patients.name_key),
+        name_phonetic = COALESCE(EXCLUDED.name_phonetic, patients.name_phonetic),
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def patient_cache_tag(patient_id: str) -> tuple:
+    """Tag shared by every cached read about one patient."""
+    return ("patient", patient_id)
+
+
+def fts_query(text: str, column: str) -> str:
+    """Turn free text into an FTS5 query matching any of its words in `column`.
+
+    Words are quoted, so FTS5 operators and punctuation in user text are
+    treated literally; results are ranked by how well they match overall.
+    """
+    terms = dict.fromkeys(term.lower() for term in _SEARCH_TERM.findall(text))
+    if not terms:
+        return ""
+    quoted = " OR ".join(f'"{term}"' for term in terms)
+    return f"{column} : ({quoted})"
+
 
 class HealthDatabase:
     """Simple SQLite database for storing patient health data."""
 
-    def __init__(self, db_path: str = "sessions.db"):
+    def __init__(self, db_path: str = "sessions.db", conversation_durability: str = DURABILITY_BATCHED,
+                 cache_max_entries: int = 1024, cache_ttl_seconds: float = 300.0, **pool_options: Any):
+        if conversation_durability not in (DURABILITY_SYNC, DURABILITY_BATCHED):
+            raise ValueError(f"Unknown conversation durability mode: {conversation_durability}")
         self.db_path = db_path
+        self.conversation_durability = conversation_durability
+        self.pool = ConnectionPool(db_path, **pool_options)
+        self.conversation_writer = ConversationWriter(self.pool)
+        self.cache = TTLCache(max_entries=cache_max_entries, ttl_seconds=cache_ttl_seconds)
+        # Search cache hits kept off the read path: query_key -> (last_used, new hits)
+        self._search_lock = threading.Lock()
+        self._search_touches: Dict[str, Tuple[float, int]] = {}
         self._init_db()
 
-    def _init_db(self):
-        """Initialize the database with required tables."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS patients (
-                    patient_id TEXT PRIMARY KEY,
-                    name TEXT,
-                    phone TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
+    def connection(self) -> sqlite3.Connection:
+        """Return the pooled connection for the calling thread."""
+        return self.pool.connection()
 
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS health_data (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id TEXT,
-                    data_type TEXT,  -- 'vital_signs', 'lab_results', 'medications', 'conditions'
-                    data_json TEXT,
-                    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
-                )
-            """)
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of writes in a single committed transaction."""
+        with self.pool.transaction() as conn:
+            yield conn
 
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS assessments (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id TEXT,
-                    assessment_type TEXT,  -- 'risk_assessment', 'education_content', 'care_plan'
-                    content TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
-                )
-            """)
+    def flush_conversations(self) -> bool:
+        """Wait until every queued conversation message is committed.
+
+        Returns False if queued messages were dropped since the last flush.
+        """
+        return self.conversation_writer.flush()
+
+    def close(self) -> None:
+        """Flush queued writes and close all pooled connections."""
+        self.conversation_writer.close()
+        try:
+            with self.transaction() as conn:
+                self._write_search_touches(conn)
+        except Exception as e:
+            print(f"Error writing search cache usage: {e}")
+        self.pool.close()
+
+    def _init_db(self):
+        """Initialize the database, applying any pending schema migrations."""
+        migrate(self.connection())
 
     def store_patient_info(self, patient_id: str, name: str = None, phone: str = None) -> bool:
         """Store or update patient basic information."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                if name or phone:
-                    # Update existing patient or insert new
-                    conn.execute("""
-                        INSERT INTO patients (patient_id, name, phone)
-                        VALUES (?, ?, ?)
-                        ON CONFLICT(patient_id) DO UPDATE SET
-                            name = COALESCE(EXCLUDED.name, patients.name),
-                            phone = COALESCE(EXCLUDED.phone, patients.phone),
-                            updated_at = CURRENT_TIMESTAMP
-                    """, (patient_id, name, phone))
-                else:
-                    # Just ensure patient exists
-                    conn.execute("""
-                        INSERT OR IGNORE INTO patients (patient_id)
-                        VALUES (?)
-                    """, (patient_id,))
-
-                conn.commit()
-                return True
+            with self.transaction() as conn:
+                self._upsert_patient(conn, patient_id, name, phone)
+            self.invalidate_patient(patient_id, lookups=bool(name or phone))
+            return True
         except Exception as e:
             print(f"Error storing patient info: {e}")
             return False
 
+    def invalidate_patient(self, patient_id: str, lookups: bool = False) -> None:
+        """Drop cached reads for a patient, and name/phone lookups if asked."""
+        self.cache.invalidate_tag(patient_cache_tag(patient_id))
+        if lookups:
+            self.cache.invalidate_tag(LOOKUP_CACHE_TAG)
+
+    def _upsert_patient(self, conn: sqlite3.Connection, patient_id: str, name: str = None, phone: str = None) -> None:
+        """Insert or update a patient row using the caller's transaction."""
+        if name or phone:
+            # Update existing patient or insert new
+            conn.execute(_UPSERT_PATIENT_SQL, (patient_id, name, phone, *patient_keys(name, phone)))
+        else:
+            # Just ensure patient exists
+            conn.execute("""
+                INSERT OR IGNORE INTO patients (patient_id)
+                VALUES (?)
+            """, (patient_id,))
+
+    def _refresh_latest(self, conn: sqlite3.Connection, health_data_id: int) -> None:
+        """Promote a health_data row into latest_health_data if it is the newest."""
+        conn.execute("""
+            INSERT INTO latest_health_data (patient_id, data_type, health_data_id, data_json, recorded_at)
+            SELECT patient_id, data_type, id, data_json, recorded_at
+            FROM health_data
+            WHERE id = ?
+            ON CONFLICT(patient_id, data_type) DO UPDATE SET
+                health_data_id = EXCLUDED.health_data_id,
+                data_json = EXCLUDED.data_json,
+                recorded_at = EXCLUDED.recorded_at
+            WHERE (EXCLUDED.recorded_at, EXCLUDED.health_data_id)
+                >= (latest_health_data.recorded_at, latest_health_data.health_data_id)
+        """, (health_data_id,))
+
+    def allocate_patient_id(self, prefix: str = "PAT", width: int = 3) -> Optional[str]:
+        """Atomically reserve the next patient ID, e.g. PAT001.
+
+        The sequence is bumped with a single UPDATE ... RETURNING under the
+        write lock and the patient row is created in the same transaction,
+        so concurrent callers never receive the same ID. Numbers wider than
+        `width` digits simply grow (PAT999 is followed by PAT1000).
+        """
+        try:
+            with self.transaction() as conn:
+                while True:
+                    (value,) = conn.execute("""
+                        INSERT INTO id_sequences (name, value) VALUES (?, 1)
+                        ON CONFLICT(name) DO UPDATE SET value = value + 1
+                        RETURNING value
+                    """, (prefix,)).fetchone()
+                    patient_id = f"{prefix}{value:0{width}d}"
+                    # Skip numbers already taken by IDs created outside the allocator.
+                    inserted = conn.execute("""
+                        INSERT OR IGNORE INTO patients (patient_id)
+                        VALUES (?)
+                    """, (patient_id,)).rowcount
+                    if inserted:
+                        break
+            self.invalidate_patient(patient_id)
+            return patient_id
+        except Exception as e:
+            print(f"Error allocating patient ID: {e}")
+            return None
+
     def get_patient_info(self, patient_id: str) -> Dict[str, Any]:
         """Get patient basic information."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT name, phone, created_at, updated_at
-                    FROM patients
-                    WHERE patient_id = ?
-                """, (patient_id,))
-
-                row = cursor.fetchone()
-                if row:
-                    name, phone, created_at, updated_at = row
-                    return {
-                        "patient_id": patient_id,
-                        "name": name,
-                        "phone": phone,
-                        "created_at": created_at,
-                        "updated_at": updated_at
-                    }
-                return {}
+            return self.cache.get_or_load(
+                ("patient_info", patient_id),
+                lambda: self._load_patient_info(patient_id),
+                tags=(patient_cache_tag(patient_id),),
+            )
         except Exception as e:
             print(f"Error retrieving patient info: {e}")
             return {}
 
+    def _load_patient_info(self, patient_id: str) -> Dict[str, Any]:
+        conn = self.connection()
+        cursor = conn.execute("""
+            SELECT name, phone, created_at, updated_at
+            FROM patients
+            WHERE patient_id = ?
+        """, (patient_id,))
+
+        row = cursor.fetchone()
+        if row:
+            name, phone, created_at, updated_at = row
+            return {
+                "patient_id": patient_id,
+                "name": name,
+                "phone": phone,
+                "created_at": created_at,
+                "updated_at": updated_at
+            }
+        return {}
+
+    def find_patients(self, name: Optional[str] = None, phone: Optional[str] = None,
+                      limit: int = 10) -> List[Dict[str, Any]]:
+        """Find patients matching a name and/or phone, best match first.
+
+        Phone numbers and names are compared by their normalized keys, so
+        formatting, case, accents and word order do not matter; names that
+        sound alike are ranked by similarity. Every lookup is an index seek
+        bounded by `limit`. See patient_matching.rank_candidates for scores.
+        """
+        try:
+            conn = self.connection()
+            columns = "patient_id, name, phone, phone_key, name_key"
+            rows: List[tuple] = []
+            key = phone_key(phone)
+            if key:
+                rows.extend(conn.execute(f"""
+                    SELECT {columns} FROM patients WHERE phone_key = ? LIMIT ?
+                """, (key, limit)))
+            key = name_key(name)
+            if key:
+                rows.extend(conn.execute(f"""
+                    SELECT {columns} FROM patients WHERE name_key = ? LIMIT ?
+                """, (key, limit)))
+                if len(rows) < limit:
+                    # Similar-sounding names; over-fetch since some score too low to keep
+                    rows.extend(conn.execute(f"""
+                        SELECT {columns} FROM patients WHERE name_phonetic = ? AND name_key != ? LIMIT ?
+                    """, (name_phonetic(name), key, 4 * limit)))
+            return rank_candidates(rows, name, phone, limit)
+        except Exception as e:
+            print(f"Error finding patients: {e}")
+            return []
+
+    def list_patient_ids(self, after: str = "", limit: int = 1000) -> List[str]:
+        """Return up to `limit` patient IDs sorted after `after`, for paging through every patient."""
+        try:
+            cursor = self.connection().execute("""
+                SELECT patient_id
+                FROM patients
+                WHERE patient_id > ?
+                ORDER BY patient_id
+                LIMIT ?
+            """, (after, limit))
+            return [patient_id for patient_id, in cursor]
+        except Exception as e:
+            print(f"Error listing patients: {e}")
+            return []
+
     def store_patient_data(self, patient_id: str, data_type: str, data: Dict[str, Any]) -> bool:
         """Store patient health data."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 # Ensure patient exists
-                self.store_patient_info(patient_id)
+                self._upsert_patient(conn, patient_id)
 
                 # Store the data
-                conn.execute("""
+                cursor = conn.execute("""
                     INSERT INTO health_data (patient_id, data_type, data_json)
                     VALUES (?, ?, ?)
                 """, (patient_id, data_type, json.dumps(data)))
-
-                conn.commit()
-                return True
+                self._refresh_latest(conn, cursor.lastrowid)
+                index_observations(conn, cursor.lastrowid - 1)
+                # Cached sub-agent results were computed from the old data
+                conn.execute("""
+                    UPDATE assessments SET input_hash = NULL
+                    WHERE patient_id = ? AND input_hash IS NOT NULL
+                """, (patient_id,))
+            self.invalidate_patient(patient_id)
+            return True
         except Exception as e:
             print(f"Error storing patient data: {e}")
             return False
 
+    def store_patient_data_batch(self, rows: List[Tuple[str, str, str, Optional[str]]],
+                                 patients: Dict[str, Tuple[Optional[str], Optional[str]]]) -> int:
+        """Insert many health data rows and upsert their patients in one transaction.
+
+        `rows` are (patient_id, data_type, data_json, recorded_at) tuples with
+        already-serialized data; a None recorded_at means now. `patients` maps
+        every patient ID in the batch to a (name, phone) pair, either of which
+        may be None. Returns the number of rows inserted. Errors propagate so
+        the caller can report which batch failed.
+        """
+        with self.transaction() as conn:
+            conn.executemany(_UPSERT_PATIENT_SQL + """
+                WHERE EXCLUDED.name IS NOT NULL OR EXCLUDED.phone IS NOT NULL
+            """, [(patient_id, name, phone, *patient_keys(name, phone))
+                  for patient_id, (name, phone) in patients.items()])
+            first_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM health_data").fetchone()[0]
+            conn.executemany("""
+                INSERT INTO health_data (patient_id, data_type, data_json, recorded_at)
+                VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """, rows)
+            # Promote the newest new row per patient and category in one pass
+            conn.execute("""
+                INSERT INTO latest_health_data (patient_id, data_type, health_data_id, data_json, recorded_at)
+                SELECT patient_id, data_type, id, data_json, recorded_at
+                FROM (
+                    SELECT patient_id, data_type, id, data_json, recorded_at,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY patient_id, data_type ORDER BY recorded_at DESC, id DESC
+                           ) AS newest
+                    FROM health_data
+                    WHERE id > ?
+                )
+                WHERE newest = 1
+                ON CONFLICT(patient_id, data_type) DO UPDATE SET
+                    health_data_id = EXCLUDED.health_data_id,
+                    data_json = EXCLUDED.data_json,
+                    recorded_at = EXCLUDED.recorded_at
+                WHERE (EXCLUDED.recorded_at, EXCLUDED.health_data_id)
+                    >= (latest_health_data.recorded_at, latest_health_data.health_data_id)
+            """, (first_id,))
+            index_observations(conn, first_id)
+            conn.executemany("""
+                UPDATE assessments SET input_hash = NULL
+                WHERE patient_id = ? AND input_hash IS NOT NULL
+            """, [(patient_id,) for patient_id in patients])
+        lookups = any(name or phone for name, phone in patients.values())
+        for patient_id in patients:
+            self.invalidate_patient(patient_id)
+        if lookups:
+            self.cache.invalidate_tag(LOOKUP_CACHE_TAG)
+        return len(rows)
+
     def get_patient_data(self, patient_id: str, data_type: Optional[str] = None) -> Dict[str, Any]:
-        """Retrieve patient health data."""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                if data_type:
-                    cursor = conn.execute("""
-                        SELECT data_json, recorded_at
-                        FROM health_data
-                        WHERE patient_id = ? AND data_type = ?
-                        ORDER BY recorded_at DESC
-                        LIMIT 1
-                    """, (patient_id, data_type))
-                else:
-                    cursor = conn.execute("""
-                        SELECT data_type, data_json, recorded_at
-                        FROM health_data
-                        WHERE patient_id = ?
-                        ORDER BY recorded_at DESC
-                    """, (patient_id,))
-
-                rows = cursor.fetchall()
-
-                if data_type and rows:
-                    return json.loads(rows[0][0])
-                elif not data_type:
-                    result = {}
-                    for row in rows:
-                        data_type_key, data_json, recorded_at = row
-                        if data_type_key not in result:
-                            result[data_type_key] = json.loads(data_json)
-                    return result
-                else:
-                    return {}
+        """Retrieve the latest patient health data, per category."""
+        try:
+            return self.cache.get_or_load(
+                ("patient_data", patient_id, data_type),
+                lambda: self._load_patient_data(patient_id, data_type),
+                tags=(patient_cache_tag(patient_id),),
+            )
         except Exception as e:
             print(f"Error retrieving patient data: {e}")
             return {}
 
-    def store_assessment(self, patient_id: str, assessment_type: str, content: str) -> bool:
-        """Store assessment results."""
+    def _load_patient_data(self, patient_id: str, data_type: Optional[str]) -> Dict[str, Any]:
+        conn = self.connection()
+        if data_type:
+            row = conn.execute("""
+                SELECT data_json
+                FROM latest_health_data
+                WHERE patient_id = ? AND data_type = ?
+            """, (patient_id, data_type)).fetchone()
+            return json.loads(row[0]) if row else {}
+
+        cursor = conn.execute("""
+            SELECT data_type, data_json
+            FROM latest_health_data
+            WHERE patient_id = ?
+        """, (patient_id,))
+        return {data_type_key: json.loads(data_json) for data_type_key, data_json in cursor}
+
+    def get_patient_data_history(self, patient_id: str, data_type: Optional[str] = None,
+                                 limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Retrieve every stored health data record for a patient, newest first."""
+        try:
+            conn = self.connection()
+            if data_type:
+                cursor = conn.execute("""
+                    SELECT data_type, data_json, recorded_at
+                    FROM health_data
+                    WHERE patient_id = ? AND data_type = ?
+                    ORDER BY recorded_at DESC, id DESC
+                    LIMIT ?
+                """, (patient_id, data_type, -1 if limit is None else limit))
+            else:
+                cursor = conn.execute("""
+                    SELECT data_type, data_json, recorded_at
+                    FROM health_data
+                    WHERE patient_id = ?
+                    ORDER BY recorded_at DESC, id DESC
+                    LIMIT ?
+                """, (patient_id, -1 if limit is None else limit))
+
+            return [
+                {"data_type": data_type_key, "data": json.loads(data_json), "recorded_at": recorded_at}
+                for data_type_key, data_json, recorded_at in cursor
+            ]
+        except Exception as e:
+            print(f"Error retrieving patient data history: {e}")
+            return []
+
+    def get_observations(self, patient_id: str, metrics: Optional[List[str]] = None,
+                         since: Optional[str] = None, until: Optional[str] = None) -> List[tuple]:
+        """Retrieve numeric observations for a patient in a time range, oldest first.
+
+        Returns (metric, recorded_at, health_data_id, value, unit) rows for
+        the given metrics, or all metrics, with since <= recorded_at <= until
+        compared as "YYYY-MM-DD HH:MM:SS" strings. Each metric is an indexed
+        range scan, so the cost follows the window, not the full history.
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            conn = self.connection()
+            bounds = (since or "0000-01-01 00:00:00", until or "9999-12-31 23:59:59")
+            if metrics:
+                rows = []
+                for metric in metrics:
+                    rows.extend(conn.execute("""
+                        SELECT metric, recorded_at, health_data_id, value, unit
+                        FROM observations
+                        WHERE patient_id = ? AND metric = ? AND recorded_at BETWEEN ? AND ?
+                        ORDER BY recorded_at, health_data_id
+                    """, (patient_id, metric, *bounds)))
+                return rows
+            return conn.execute("""
+                SELECT metric, recorded_at, health_data_id, value, unit
+                FROM observations INDEXED BY idx_observations_patient_recorded
+                WHERE patient_id = ? AND recorded_at BETWEEN ? AND ?
+                ORDER BY recorded_at, health_data_id
+            """, (patient_id, *bounds)).fetchall()
+        except Exception as e:
+            print(f"Error retrieving observations: {e}")
+            return []
+
+    def store_assessment(self, patient_id: str, assessment_type: str, content: str,
+                         input_hash: Optional[str] = None) -> bool:
+        """Store assessment results, keyed by the hash of their inputs if given."""
+        try:
+            with self.transaction() as conn:
                 conn.execute("""
-                    INSERT INTO assessments (patient_id, assessment_type, content)
-                    VALUES (?, ?, ?)
-                """, (patient_id, assessment_type, content))
-                conn.commit()
+                    INSERT INTO assessments (patient_id, assessment_type, content, input_hash)
+                    VALUES (?, ?, ?, ?)
+                """, (patient_id, assessment_type, content, input_hash))
                 return True
         except Exception as e:
             print(f"Error storing assessment: {e}")
@@ -185,50 +463,279 @@ class HealthDatabase:
     def get_latest_assessment(self, patient_id: str, assessment_type: str) -> Optional[str]:
         """Get the latest assessment of a specific type."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT content
-                    FROM assessments
-                    WHERE patient_id = ? AND assessment_type = ?
-                    ORDER BY created_at DESC
-                    LIMIT 1
-                """, (patient_id, assessment_type))
+            conn = self.connection()
+            cursor = conn.execute("""
+                SELECT content
+                FROM assessments
+                WHERE patient_id = ? AND assessment_type = ?
+                ORDER BY created_at DESC
+                LIMIT 1
+            """, (patient_id, assessment_type))
 
-                row = cursor.fetchone()
-                return row[0] if row else None
+            row = cursor.fetchone()
+            return row[0] if row else None
         except Exception as e:
             print(f"Error retrieving assessment: {e}")
             return None
 
+    def get_cached_assessment(self, patient_id: str, assessment_type: str, input_hash: str) -> Optional[str]:
+        """Get the newest assessment computed from inputs hashing to `input_hash`."""
+        try:
+            conn = self.connection()
+            row = conn.execute("""
+                SELECT content
+                FROM assessments
+                WHERE patient_id = ? AND assessment_type = ? AND input_hash = ?
+                ORDER BY id DESC
+                LIMIT 1
+            """, (patient_id, assessment_type, input_hash)).fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            print(f"Error retrieving cached assessment: {e}")
+            return None
+
+    def get_search_result(self, query_key: str, max_age_seconds: float) -> Optional[Any]:
+        """Return cached search results younger than `max_age_seconds`, marking them used.
+
+        A hit is a plain read: its last_used and hits updates are buffered
+        and written in one batch every SEARCH_TOUCH_BATCH hits, before the
+        next store, or on close.
+        """
+        try:
+            now = time.time()
+            row = self.connection().execute("""
+                SELECT results_json FROM search_cache
+                WHERE query_key = ? AND created_at > ?
+            """, (query_key, now - max_age_seconds)).fetchone()
+            if row is None:
+                return None
+            with self._search_lock:
+                _, hits = self._search_touches.get(query_key, (now, 0))
+                self._search_touches[query_key] = (now, hits + 1)
+                full = len(self._search_touches) >= SEARCH_TOUCH_BATCH
+            if full:
+                with self.transaction() as conn:
+                    self._write_search_touches(conn)
+            return json.loads(row[0])
+        except Exception as e:
+            print(f"Error retrieving search result: {e}")
+            return None
+
+    def _write_search_touches(self, conn: sqlite3.Connection) -> None:
+        """Write buffered search cache hits inside the caller's transaction."""
+        with self._search_lock:
+            touches, self._search_touches = self._search_touches, {}
+        conn.executemany("""
+            UPDATE search_cache SET last_used = MAX(last_used, ?), hits = hits + ?
+            WHERE query_key = ?
+        """, [(last_used, hits, query_key) for query_key, (last_used, hits) in touches.items()])
+
+    def store_search_result(self, query_key: str, query: str, results: Any, max_entries: int) -> bool:
+        """Cache search results, evicting the least recently used beyond `max_entries`.
+
+        The bound is checked against the trigger-maintained row count inside
+        the insert transaction, so it holds across processes sharing the file.
+        """
+        try:
+            now = time.time()
+            with self.transaction() as conn:
+                self._write_search_touches(conn)
+                conn.execute("""
+                    INSERT INTO search_cache (query_key, query, results_json, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (query_key) DO UPDATE SET
+                        query = EXCLUDED.query,
+                        results_json = EXCLUDED.results_json,
+                        created_at = EXCLUDED.created_at,
+                        last_used = EXCLUDED.last_used,
+                        hits = 0
+                """, (query_key, query, json.dumps(results), now, now))
+                rows = conn.execute(
+                    "SELECT row_count FROM table_rows WHERE name = 'search_cache'"
+                ).fetchone()[0]
+                if rows > max_entries:
+                    conn.execute("""
+                        DELETE FROM search_cache
+                        WHERE query_key IN (
+                            SELECT query_key FROM search_cache ORDER BY last_used LIMIT ?
+                        )
+                    """, (rows - max_entries,))
+            return True
+        except Exception as e:
+            print(f"Error storing search result: {e}")
+            return False
+
+    def search_records(self, query: str, patient_id: Optional[str] = None,
+                       sources: Tuple[str, ...] = SEARCH_SOURCES, limit: int = 10) -> List[Dict[str, Any]]:
+        """Full-text search over conversations and assessments, best matches first.
+
+        Searches one patient's records (matched exactly on patient_id), or
+        every patient's when `patient_id` is None. Each hit carries its
+        source, IDs, timestamp, a snippet with matched words in [brackets]
+        and a relevance score (higher is better). bm25 scores from the two
+        indexes are not comparable, so sources are interleaved, each in its
+        own rank order, and `score` only orders hits of the same source.
+        Queued conversation messages are flushed first so recent turns are
+        searchable.
+        """
+        if not fts_query(query, "content"):
+            return []
+        patient_filter = "" if patient_id is None else "AND base.patient_id = ?"
+        patient_params = () if patient_id is None else (patient_id,)
+        try:
+            conn = self.connection()
+            results = []
+            if "conversations" in sources:
+                self.flush_conversations()
+                rows = conn.execute(f"""
+                    SELECT base.id, base.patient_id, base.session_id, base.message_type, base.timestamp,
+                           snippet(conversations_fts, 0, '[', ']', '…', 12),
+                           bm25(conversations_fts) AS rank
+                    FROM conversations_fts
+                    JOIN conversations base ON base.id = conversations_fts.rowid
+                    WHERE conversations_fts MATCH ? {patient_filter}
+                    ORDER BY rank
+                    LIMIT ?
+                """, (fts_query(query, "message_content"), *patient_params, limit))
+                results.append([
+                    {"source": "conversation", "id": row_id, "patient_id": pid, "session_id": session_id,
+                     "message_type": message_type, "timestamp": timestamp, "snippet": snippet,
+                     "score": round(-rank, 3)}
+                    for row_id, pid, session_id, message_type, timestamp, snippet, rank in rows
+                ])
+            if "assessments" in sources:
+                rows = conn.execute(f"""
+                    SELECT base.id, base.patient_id, base.assessment_type, base.created_at,
+                           snippet(assessments_fts, 0, '[', ']', '…', 12),
+                           bm25(assessments_fts) AS rank
+                    FROM assessments_fts
+                    JOIN assessments base ON base.id = assessments_fts.rowid
+                    WHERE assessments_fts MATCH ? {patient_filter}
+                    ORDER BY rank
+                    LIMIT ?
+                """, (fts_query(query, "content"), *patient_params, limit))
+                results.append([
+                    {"source": "assessment", "id": row_id, "patient_id": pid, "assessment_type": assessment_type,
+                     "timestamp": created_at, "snippet": snippet, "score": round(-rank, 3)}
+                    for row_id, pid, assessment_type, created_at, snippet, rank in rows
+                ])
+            hits = [hit for group in itertools.zip_longest(*results) for hit in group if hit is not None]
+            return hits[:limit]
+        except Exception as e:
+            print(f"Error searching records: {e}")
+            return []
+
     def get_conversation_history(self, patient_id: str, session_id: str) -> List[tuple]:
         """Get conversation history for a patient session."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            self.flush_conversations()
+            conn = self.connection()
+            cursor = conn.execute("""
+                SELECT message_type, message_content, timestamp
+                FROM conversations
+                WHERE patient_id = ? AND session_id = ?
+                ORDER BY timestamp ASC, id ASC
+            """, (patient_id, session_id))
+            return cursor.fetchall()
+        except Exception as e:
+            print(f"Error retrieving conversation history: {e}")
+            return []
+
+    def get_conversation_page(self, patient_id: str, session_id: str, limit: int,
+                              before: Optional[Tuple[str, int]] = None) -> List[tuple]:
+        """Get up to `limit` messages older than the `before` cursor, newest first.
+
+        Rows are (id, message_type, message_content, timestamp). The cursor is
+        the (timestamp, id) of the oldest message already loaded, so each page
+        is a single index range scan no matter how long the history is.
+        """
+        try:
+            self.flush_conversations()
+            conn = self.connection()
+            if before is None:
                 cursor = conn.execute("""
-                    SELECT message_type, message_content, timestamp
+                    SELECT id, message_type, message_content, timestamp
                     FROM conversations
                     WHERE patient_id = ? AND session_id = ?
-                    ORDER BY timestamp ASC
-                """, (patient_id, session_id))
-                return cursor.fetchall()
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (patient_id, session_id, limit))
+            else:
+                before_timestamp, before_id = before
+                cursor = conn.execute("""
+                    SELECT id, message_type, message_content, timestamp
+                    FROM conversations
+                    WHERE patient_id = ? AND session_id = ?
+                        AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                """, (patient_id, session_id, before_timestamp, before_id, limit))
+            return cursor.fetchall()
         except Exception as e:
-            print(f"Error retrieving conversation history: {e}")
+            print(f"Error retrieving conversation page: {e}")
             return []
 
     def store_conversation_message(self, patient_id: str, session_id: str, message_type: str, content: str) -> bool:
-        """Store a conversation message."""
+        """Store a conversation message.
+
+        In batched durability mode the message is handed to the background
+        writer and committed with the next group commit: True means queued,
+        not committed. A message lost to a failing batch shows up only in
+        `conversation_writer.stats()` and as a False `flush_conversations()`;
+        use sync durability where every acknowledged message must be on disk.
+        """
+        if self.conversation_durability == DURABILITY_BATCHED:
+            self.conversation_writer.enqueue((patient_id, session_id, message_type, content))
+            return True
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.transaction() as conn:
                 conn.execute("""
                     INSERT INTO conversations (patient_id, session_id, message_type, message_content)
                     VALUES (?, ?, ?, ?)
                 """, (patient_id, session_id, message_type, content))
-                conn.commit()
                 return True
         except Exception as e:
             print(f"Error storing conversation message: {e}")
             return False
 
 
-# Global database instance
-db = HealthDatabase()
\ No newline at end of file
+class LazyHealthDatabase:
+    """Stand-in that opens the real HealthDatabase on first use.
+
+    Lets modules bind the global `db` at import time without creating the
+    database file or running migrations until storage is actually used.
+    Looking up a HealthDatabase method does not open it, only calling the
+    method does, so `async_db.run(db.method)` opens it on the executor.
+    Private and dunder names are never forwarded, so probes such as
+    pytest's `__test__` check leave it closed.
+    """
+
+    def __init__(self, factory: Callable[[], HealthDatabase]):
+        self._factory = factory
+        self._instance: Optional[HealthDatabase] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> HealthDatabase:
+        """Return the real database, opening it if needed."""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    @property
+    def is_open(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if self._instance is None and callable(getattr(HealthDatabase, name, None)):
+            return functools.wraps(getattr(HealthDatabase, name))(
+                lambda *args, **kwargs: getattr(self.get(), name)(*args, **kwargs)
+            )
+        return getattr(self.get(), name)
+
+
+# Global database instance, stored at $HEALTH_GUARDIAN_DB if set
+db = LazyHealthDatabase(lambda: HealthDatabase(os.environ.get("HEALTH_GUARDIAN_DB", "sessions.db")))
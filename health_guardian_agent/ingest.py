@@ -0,0 +1,454 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Bulk health data ingestion.
+
+Streams JSONL, CSV and FHIR files record by record, validates each one and
+writes them in batched transactions. Memory stays constant in the number
+of observations.
+
+    python -m health_guardian_agent.ingest readings.jsonl labs.csv export/Observation.ndjson
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import time
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+DATA_TYPES = ("vital_signs", "lab_results", "medications", "conditions")
+FORMATS = ("jsonl", "csv", "fhir")
+# CSV columns that describe the row rather than the reading
+CSV_META_COLUMNS = ("patient_id", "data_type", "recorded_at", "name", "phone", "data")
+
+Record = Dict[str, Any]  # patient_id, data_type, data, recorded_at, name, phone
+# Readers may also yield {"_patient": True, "patient_id", "name", "phone"} for demographics
+# that arrive without a reading, such as a FHIR Patient resource.
+Source = Union[str, os.PathLike, IO[str]]
+
+# LOINC codes for the readings the agents look at, mapped to our metric names
+LOINC_METRICS = {
+    "8867-4": ("vital_signs", "heart_rate"),
+    "8310-5": ("vital_signs", "temperature"),
+    "9279-1": ("vital_signs", "respiratory_rate"),
+    "59408-5": ("vital_signs", "oxygen_saturation"),
+    "2708-6": ("vital_signs", "oxygen_saturation"),
+    "29463-7": ("vital_signs", "weight_kg"),
+    "8480-6": ("vital_signs", "systolic"),
+    "8462-4": ("vital_signs", "diastolic"),
+    "2339-0": ("lab_results", "glucose"),
+    "2345-7": ("lab_results", "glucose"),
+    "4548-4": ("lab_results", "hba1c"),
+    "2093-3": ("lab_results", "cholesterol"),
+    "13457-7": ("lab_results", "ldl"),
+    "18262-6": ("lab_results", "ldl"),
+    "2085-9": ("lab_results", "hdl"),
+    "2571-8": ("lab_results", "triglycerides"),
+    "718-7": ("lab_results", "hemoglobin"),
+    "2160-0": ("lab_results", "creatinine"),
+}
+FHIR_CATEGORIES = {"vital-signs": "vital_signs", "laboratory": "lab_results"}
+
+
+class IngestError(ValueError):
+    """Raised for a record that cannot be ingested."""
+
+
+def normalize_timestamp(value: Any) -> Optional[str]:
+    """Convert an ISO 8601 date or datetime to UTC "YYYY-MM-DD HH:MM:SS".
+
+    This is the format CURRENT_TIMESTAMP uses, so ingested and live rows
+    sort together.
+    """
+    if value in (None, ""):
+        return None
+    text = str(value).strip().replace("Z", "+00:00")
+    try:
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        raise IngestError(f"invalid recorded_at {value!r}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def validate_record(record: Record) -> Record:
+    """Check and normalize one record, raising IngestError if it is unusable."""
+    patient_id = record.get("patient_id")
+    if not isinstance(patient_id, str) or not patient_id.strip():
+        raise IngestError("missing patient_id")
+    data_type = record.get("data_type")
+    if data_type not in DATA_TYPES:
+        raise IngestError(f"unknown data_type {data_type!r}")
+    data = record.get("data")
+    if not isinstance(data, (dict, list)) or not data:
+        raise IngestError("data must be a non-empty object or list")
+    return {
+        "patient_id": patient_id.strip(),
+        "data_type": data_type,
+        "data": data,
+        "recorded_at": normalize_timestamp(record.get("recorded_at")),
+        "name": record.get("name") or None,
+        "phone": record.get("phone") or None,
+    }
+
+
+def _open(source: Source) -> Tuple[IO[str], bool]:
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, newline="", encoding="utf-8"), True
+    return source, False
+
+
+def _parse_scalar(value: str) -> Any:
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def read_jsonl(source: Source) -> Iterator[Record]:
+    """Yield records from JSON Lines: row objects or FHIR resources (bulk-export NDJSON)."""
+    f, owned = _open(source)
+    try:
+        converter = FhirConverter()
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                yield {"_error": f"line {line_number}: invalid JSON ({e})"}
+                continue
+            if isinstance(item, dict) and "resourceType" in item:
+                yield from converter.feed(item, line_number)
+            else:
+                yield {**item, "_line": line_number} if isinstance(item, dict) else {
+                    "_error": f"line {line_number}: expected an object"}
+        yield from converter.finish()
+    finally:
+        if owned:
+            f.close()
+
+
+def read_csv(source: Source) -> Iterator[Record]:
+    """Yield records from CSV with patient_id, data_type and recorded_at columns.
+
+    Readings are either JSON in a `data` column or one column per metric;
+    empty cells are skipped and numbers are parsed. For medications and
+    conditions, the non-empty cells form the list.
+    """
+    f, owned = _open(source)
+    try:
+        for line_number, row in enumerate(csv.DictReader(f), 2):
+            record: Record = {key: row.get(key) for key in CSV_META_COLUMNS if key != "data"}
+            record["_line"] = line_number
+            if row.get("data"):
+                try:
+                    record["data"] = json.loads(row["data"])
+                except ValueError as e:
+                    yield {"_error": f"line {line_number}: invalid JSON in data column ({e})"}
+                    continue
+            else:
+                values = {key: _parse_scalar(value.strip()) for key, value in row.items()
+                          if key not in CSV_META_COLUMNS and key and value and value.strip()}
+                if record["data_type"] in ("medications", "conditions"):
+                    record["data"] = [str(value) for value in values.values()]
+                else:
+                    record["data"] = values
+            yield record
+    finally:
+        if owned:
+            f.close()
+
+
+def read_fhir_bundle(source: Source) -> Iterator[Record]:
+    """Yield records from a FHIR Bundle JSON document.
+
+    A Bundle is a single JSON document and is parsed whole; use NDJSON bulk
+    exports through read_jsonl for constant-memory loads.
+    """
+    f, owned = _open(source)
+    try:
+        bundle = json.load(f)
+    finally:
+        if owned:
+            f.close()
+    converter = FhirConverter()
+    for index, entry in enumerate(bundle.get("entry") or [], 1):
+        resource = entry.get("resource") or {}
+        yield from converter.feed(resource, index)
+    yield from converter.finish()
+
+
+class FhirConverter:
+    """Turns FHIR resources into records.
+
+    Observations with the same patient, category and time that arrive back to
+    back (e.g. one encounter's vitals) are merged into one reading, and blood
+    pressure panels become "systolic/diastolic" strings. Patient resources
+    become demographics-only records wherever they appear, so a split bulk
+    export can list patients before, after or apart from their observations.
+    Medications and conditions are collected per patient and emitted as
+    lists at the end, so memory grows with MedicationStatement,
+    MedicationRequest and Condition entries, not observations.
+    """
+
+    def __init__(self):
+        self._pending: Optional[Record] = None
+        self._lists: Dict[Tuple[str, str], List[str]] = {}
+
+    def feed(self, resource: Dict[str, Any], position: int) -> Iterator[Record]:
+        kind = resource.get("resourceType")
+        if kind == "Patient":
+            name, phone = _fhir_name(resource), _fhir_phone(resource)
+            if resource.get("id") and (name or phone):
+                yield {"_patient": True, "patient_id": resource["id"], "name": name, "phone": phone}
+        elif kind == "Observation":
+            try:
+                record = self._observation(resource)
+            except IngestError as e:
+                yield {"_error": f"entry {position}: {e}"}
+                return
+            if record is None:
+                return
+            pending = self._pending
+            if pending and all(pending[key] == record[key] for key in ("patient_id", "data_type", "recorded_at")):
+                pending["data"].update(record["data"])
+                return
+            yield from self._flush()
+            record["_line"] = position
+            self._pending = record
+        elif kind in ("MedicationStatement", "MedicationRequest", "Condition"):
+            patient_id = _fhir_subject(resource)
+            concept = resource.get("medicationCodeableConcept") or resource.get("code") or {}
+            text = _concept_text(concept)
+            if patient_id and text:
+                data_type = "conditions" if kind == "Condition" else "medications"
+                self._lists.setdefault((patient_id, data_type), []).append(text)
+
+    def finish(self) -> Iterator[Record]:
+        yield from self._flush()
+        for (patient_id, data_type), items in self._lists.items():
+            yield {"patient_id": patient_id, "data_type": data_type, "data": items}
+        self._lists.clear()
+
+    def _flush(self) -> Iterator[Record]:
+        if self._pending is not None:
+            record, self._pending = self._pending, None
+            yield record
+
+    def _observation(self, resource: Dict[str, Any]) -> Optional[Record]:
+        patient_id = _fhir_subject(resource)
+        if not patient_id:
+            raise IngestError("Observation without a Patient subject")
+        data_type, data = None, {}
+        for coding in (resource.get("code") or {}).get("coding") or []:
+            if coding.get("code") in LOINC_METRICS:
+                data_type, name = LOINC_METRICS[coding["code"]]
+                value = _fhir_value(resource)
+                if value is not None:
+                    data[name] = value
+                break
+        if "systolic" in data or "diastolic" in data or resource.get("component"):
+            data.update(_fhir_components(resource))
+        if data_type is None:
+            for category in resource.get("category") or []:
+                for coding in category.get("coding") or []:
+                    data_type = data_type or FHIR_CATEGORIES.get(coding.get("code"))
+            name = _concept_text(resource.get("code") or {})
+            value = _fhir_value(resource)
+            if data_type and name and value is not None:
+                data[name.strip().lower().replace(" ", "_")] = value
+        if not data_type or not data:
+            return None
+        if "systolic" in data and "diastolic" in data:
+            systolic = _pressure(data.pop("systolic"), "systolic")
+            diastolic = _pressure(data.pop("diastolic"), "diastolic")
+            data["blood_pressure"] = f"{systolic:g}/{diastolic:g}"
+        recorded_at = resource.get("effectiveDateTime") or (resource.get("effectivePeriod") or {}).get("start")
+        return {"patient_id": patient_id, "data_type": data_type, "data": data,
+                "recorded_at": normalize_timestamp(recorded_at)}
+
+
+def _fhir_subject(resource: Dict[str, Any]) -> Optional[str]:
+    reference = (resource.get("subject") or resource.get("patient") or {}).get("reference") or ""
+    return reference.split("/", 1)[1] if reference.startswith("Patient/") else None
+
+
+def _fhir_value(resource: Dict[str, Any]) -> Any:
+    if "valueQuantity" in resource:
+        return resource["valueQuantity"].get("value")
+    for key in ("valueInteger", "valueString", "valueBoolean"):
+        if key in resource:
+            return resource[key]
+    return None
+
+
+def _pressure(value: Any, name: str) -> float:
+    """A blood pressure component as a number; numeric strings are accepted."""
+    if not isinstance(value, bool):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            pass
+    raise IngestError(f"non-numeric {name} pressure {value!r}")
+
+
+def _fhir_components(resource: Dict[str, Any]) -> Dict[str, Any]:
+    values = {}
+    for component in resource.get("component") or []:
+        for coding in (component.get("code") or {}).get("coding") or []:
+            if coding.get("code") in LOINC_METRICS:
+                value = _fhir_value(component)
+                if value is not None:
+                    values[LOINC_METRICS[coding["code"]][1]] = value
+    return values
+
+
+def _concept_text(concept: Dict[str, Any]) -> Optional[str]:
+    if concept.get("text"):
+        return concept["text"]
+    for coding in concept.get("coding") or []:
+        if coding.get("display"):
+            return coding["display"]
+    return None
+
+
+def _fhir_name(resource: Dict[str, Any]) -> Optional[str]:
+    for name in resource.get("name") or []:
+        if name.get("text"):
+            return name["text"]
+        parts = list(name.get("given") or []) + ([name["family"]] if name.get("family") else [])
+        if parts:
+            return " ".join(parts)
+    return None
+
+
+def _fhir_phone(resource: Dict[str, Any]) -> Optional[str]:
+    for telecom in resource.get("telecom") or []:
+        if telecom.get("system") == "phone" and telecom.get("value"):
+            return telecom["value"]
+    return None
+
+
+def detect_format(path: str) -> str:
+    """Guess a file's format from its extension."""
+    suffix = os.path.splitext(str(path))[1].lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    if suffix == ".json":
+        return "fhir"
+    raise ValueError(f"Cannot tell the format of {path}; pass one of {', '.join(FORMATS)}")
+
+
+def read_records(source: Source, fmt: Optional[str] = None) -> Iterator[Record]:
+    """Stream raw records from a file path or text stream."""
+    fmt = fmt or detect_format(source)
+    readers = {"jsonl": read_jsonl, "csv": read_csv, "fhir": read_fhir_bundle}
+    if fmt not in readers:
+        raise ValueError(f"Unknown format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return readers[fmt](source)
+
+
+def ingest_records(database, records: Iterable[Record], batch_size: int = 5000,
+                   max_reported_errors: int = 20) -> Dict[str, Any]:
+    """Validate records and write them in batches of `batch_size` rows.
+
+    Invalid records are skipped and counted; the first few errors are
+    returned. Demographics-only records update their patient with the
+    next batch. Returns rows written, rows rejected, batches and rows/sec.
+    """
+    start = time.perf_counter()
+    stats: Dict[str, Any] = {"rows": 0, "rejected": 0, "batches": 0, "errors": []}
+    rows: List[Tuple[str, str, str, Optional[str]]] = []
+    patients: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def reject(message: str) -> None:
+        stats["rejected"] += 1
+        if len(stats["errors"]) < max_reported_errors:
+            stats["errors"].append(message)
+
+    def flush() -> None:
+        if rows or patients:
+            stats["rows"] += database.store_patient_data_batch(rows, patients)
+            stats["batches"] += 1
+            rows.clear()
+            patients.clear()
+
+    for raw in records:
+        if "_error" in raw:
+            reject(raw["_error"])
+            continue
+        if raw.get("_patient"):
+            name, phone = patients.get(raw["patient_id"], (None, None))
+            patients[raw["patient_id"]] = (raw["name"] or name, raw["phone"] or phone)
+            if len(patients) >= batch_size:
+                flush()
+            continue
+        try:
+            record = validate_record(raw)
+        except IngestError as e:
+            reject(f"line {raw['_line']}: {e}" if "_line" in raw else str(e))
+            continue
+        rows.append((record["patient_id"], record["data_type"],
+                     json.dumps(record["data"]), record["recorded_at"]))
+        name, phone = patients.get(record["patient_id"], (None, None))
+        patients[record["patient_id"]] = (record["name"] or name, record["phone"] or phone)
+        if len(rows) >= batch_size:
+            flush()
+    flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_sec"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def ingest_file(database, source: Source, fmt: Optional[str] = None, batch_size: int = 5000) -> Dict[str, Any]:
+    """Stream one file into the database and return ingest statistics."""
+    return ingest_records(database, read_records(source, fmt), batch_size)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="JSONL/NDJSON, CSV or FHIR Bundle files")
+    parser.add_argument("--format", choices=FORMATS, help="file format (default: from the extension)")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per transaction")
+    parser.add_argument("--db", help="database file (default: $HEALTH_GUARDIAN_DB or sessions.db)")
+    args = parser.parse_args(argv)
+
+    from .database import HealthDatabase
+
+    database = HealthDatabase(args.db or os.environ.get("HEALTH_GUARDIAN_DB", "sessions.db"))
+    failed = False
+    try:
+        for path in args.files:
+            stats = ingest_file(database, path, args.format, args.batch_size)
+            print(json.dumps({"file": path, **stats}))
+            failed = failed or stats["rejected"] > 0
+    finally:
+        database.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
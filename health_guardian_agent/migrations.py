@@ -0,0 +1,433 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Sequence, Union
+
+from .observations import index_observations
+from .patient_matching import patient_keys
+
+# A step is either a SQL statement or a callable that receives the connection.
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A single schema upgrade.
+
+    Attributes:
+        version (int): Schema version reached once this migration is applied.
+        description (str): Short human-readable summary.
+        steps (Sequence[MigrationStep]): Statements or callables to run in order.
+    """
+
+    version: int
+    description: str
+    steps: Sequence[MigrationStep]
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        version=1,
+        description="Base tables",
+        steps=(
+            """
+            CREATE TABLE IF NOT EXISTS patients (
+                patient_id TEXT PRIMARY KEY,
+                name TEXT,
+                phone TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS health_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                data_type TEXT,  -- 'vital_signs', 'lab_results', 'medications', 'conditions'
+                data_json TEXT,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS assessments (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                assessment_type TEXT,  -- 'risk_assessment', 'education_content', 'care_plan'
+                content TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id TEXT,
+                session_id TEXT,
+                message_type TEXT,
+                message_content TEXT,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                app_name TEXT,
+                user_id TEXT,
+                id TEXT,
+                state TEXT,
+                create_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (app_name, user_id, id)
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=2,
+        description="Indexes for patient, health data, assessment and conversation lookups",
+        steps=(
+            """
+            CREATE INDEX IF NOT EXISTS idx_health_data_patient_type_recorded
+            ON health_data (patient_id, data_type, recorded_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_health_data_patient_recorded
+            ON health_data (patient_id, recorded_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_assessments_patient_type_created
+            ON assessments (patient_id, assessment_type, created_at)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_conversations_patient_session_timestamp
+            ON conversations (patient_id, session_id, timestamp)
+            """,
+            # Name and phone indexes also carry the other lookup columns so
+            # find_patient_by_name_or_phone is answered from the index alone.
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_name
+            ON patients (name, phone, patient_id)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_phone
+            ON patients (phone, name, patient_id)
+            """,
+        ),
+    ),
+    Migration(
+        version=3,
+        description="Latest health data per patient and category, maintained on write",
+        steps=(
+            """
+            CREATE TABLE IF NOT EXISTS latest_health_data (
+                patient_id TEXT NOT NULL,
+                data_type TEXT NOT NULL,
+                health_data_id INTEGER NOT NULL,
+                data_json TEXT,
+                recorded_at TIMESTAMP,
+                PRIMARY KEY (patient_id, data_type)
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT OR REPLACE INTO latest_health_data
+                (patient_id, data_type, health_data_id, data_json, recorded_at)
+            SELECT h.patient_id, h.data_type, h.id, h.data_json, h.recorded_at
+            FROM health_data h
+            WHERE h.id = (
+                SELECT newest.id
+                FROM health_data newest
+                WHERE newest.patient_id = h.patient_id AND newest.data_type = h.data_type
+                ORDER BY newest.recorded_at DESC, newest.id DESC
+                LIMIT 1
+            )
+            """,
+        ),
+    ),
+    Migration(
+        version=4,
+        description="Sequence table for patient ID allocation",
+        steps=(
+            """
+            CREATE TABLE IF NOT EXISTS id_sequences (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            # Continue numbering after the highest existing PAT<digits> ID.
+            """
+            INSERT OR IGNORE INTO id_sequences (name, value)
+            SELECT 'PAT', COALESCE(MAX(CAST(SUBSTR(patient_id, 4) AS INTEGER)), 0)
+            FROM patients
+            WHERE patient_id GLOB 'PAT[0-9]*' AND SUBSTR(patient_id, 4) NOT GLOB '*[^0-9]*'
+            """,
+        ),
+    ),
+    Migration(
+        version=5,
+        description="Key-per-row session state with optimistic version numbers",
+        steps=(
+            lambda conn: _add_column(conn, "sessions", "version", "INTEGER NOT NULL DEFAULT 0"),
+            """
+            CREATE TABLE IF NOT EXISTS session_state (
+                app_name TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value_json TEXT,
+                version INTEGER NOT NULL,
+                PRIMARY KEY (app_name, user_id, session_id, key)
+            ) WITHOUT ROWID
+            """,
+            lambda conn: _split_session_state(conn),
+        ),
+    ),
+    Migration(
+        version=6,
+        description="Input hashes for cached sub-agent results",
+        steps=(
+            lambda conn: _add_column(conn, "assessments", "input_hash", "TEXT"),
+            # Only cache entries are indexed; plain assessments keep input_hash NULL.
+            """
+            CREATE INDEX IF NOT EXISTS idx_assessments_input_hash
+            ON assessments (patient_id, assessment_type, input_hash)
+            WHERE input_hash IS NOT NULL
+            """,
+        ),
+    ),
+    Migration(
+        version=7,
+        description="Persistent web search result cache",
+        steps=(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                query_key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                results_json TEXT NOT NULL,
+                created_at REAL NOT NULL,  -- unix time the backend answered
+                last_used REAL NOT NULL,  -- unix time of the latest hit, for LRU eviction
+                hits INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_search_cache_last_used
+            ON search_cache (last_used)
+            """,
+            # Row count kept by triggers, so every writer enforces the same bound
+            # without a COUNT(*) scan per insert
+            """
+            CREATE TABLE IF NOT EXISTS table_rows (
+                name TEXT PRIMARY KEY,
+                row_count INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT OR REPLACE INTO table_rows (name, row_count)
+            SELECT 'search_cache', COUNT(*) FROM search_cache
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS search_cache_count_insert AFTER INSERT ON search_cache BEGIN
+                UPDATE table_rows SET row_count = row_count + 1 WHERE name = 'search_cache';
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS search_cache_count_delete AFTER DELETE ON search_cache BEGIN
+                UPDATE table_rows SET row_count = row_count - 1 WHERE name = 'search_cache';
+            END
+            """,
+        ),
+    ),
+    Migration(
+        version=8,
+        description="Normalized per-metric observations for vitals and labs",
+        steps=(
+            # Clustered by (patient, metric, time) so a metric's range read is one contiguous scan
+            """
+            CREATE TABLE IF NOT EXISTS observations (
+                patient_id TEXT NOT NULL,
+                metric TEXT NOT NULL,
+                recorded_at TIMESTAMP NOT NULL,
+                health_data_id INTEGER NOT NULL,
+                value REAL NOT NULL,
+                unit TEXT,
+                PRIMARY KEY (patient_id, metric, recorded_at, health_data_id)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_observations_patient_recorded
+            ON observations (patient_id, recorded_at, health_data_id)
+            """,
+            lambda conn: index_observations(conn),
+        ),
+    ),
+    Migration(
+        version=9,
+        description="Full-text search over conversations and assessments",
+        steps=(
+            # External-content FTS5 tables: the text lives only in the base tables.
+            # Only the text is indexed; searches filter on the exact base-table
+            # patient_id, since a tokenized one matched "p1" against "P1" and "p1-2".
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                message_content,
+                content='conversations', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_insert AFTER INSERT ON conversations BEGIN
+                INSERT INTO conversations_fts (rowid, message_content) VALUES (new.id, new.message_content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_delete AFTER DELETE ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, message_content)
+                VALUES ('delete', old.id, old.message_content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS conversations_fts_update AFTER UPDATE OF message_content ON conversations BEGIN
+                INSERT INTO conversations_fts (conversations_fts, rowid, message_content)
+                VALUES ('delete', old.id, old.message_content);
+                INSERT INTO conversations_fts (rowid, message_content) VALUES (new.id, new.message_content);
+            END
+            """,
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS assessments_fts USING fts5(
+                content,
+                content='assessments', content_rowid='id',
+                tokenize='porter unicode61 remove_diacritics 2'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_insert AFTER INSERT ON assessments BEGIN
+                INSERT INTO assessments_fts (rowid, content) VALUES (new.id, new.content);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_delete AFTER DELETE ON assessments BEGIN
+                INSERT INTO assessments_fts (assessments_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            END
+            """,
+            # Only text changes reindex; clearing input_hash on new health data does not.
+            """
+            CREATE TRIGGER IF NOT EXISTS assessments_fts_update AFTER UPDATE OF content ON assessments BEGIN
+                INSERT INTO assessments_fts (assessments_fts, rowid, content) VALUES ('delete', old.id, old.content);
+                INSERT INTO assessments_fts (rowid, content) VALUES (new.id, new.content);
+            END
+            """,
+            "INSERT INTO conversations_fts (conversations_fts) VALUES ('rebuild')",
+            "INSERT INTO assessments_fts (assessments_fts) VALUES ('rebuild')",
+        ),
+    ),
+    Migration(
+        version=10,
+        description="Normalized phone and name keys for fuzzy patient lookup",
+        steps=(
+            lambda conn: _add_column(conn, "patients", "phone_key", "TEXT"),
+            lambda conn: _add_column(conn, "patients", "name_key", "TEXT"),
+            lambda conn: _add_column(conn, "patients", "name_phonetic", "TEXT"),
+            lambda conn: _backfill_patient_keys(conn),
+            # Each lookup index carries the columns rank_candidates needs
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_phone_key
+            ON patients (phone_key, patient_id, name, phone, name_key)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_name_key
+            ON patients (name_key, patient_id, name, phone, phone_key)
+            """,
+            """
+            CREATE INDEX IF NOT EXISTS idx_patients_name_phonetic
+            ON patients (name_phonetic, patient_id, name, phone, phone_key, name_key)
+            """,
+            # Lookups go through the normalized keys now; the raw name/phone
+            # indexes only cost every patient write
+            "DROP INDEX IF EXISTS idx_patients_name",
+            "DROP INDEX IF EXISTS idx_patients_phone",
+        ),
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str) -> None:
+    """Add a column unless an earlier tool already created it."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _split_session_state(conn: sqlite3.Connection) -> None:
+    """Move whole-blob session state into one session_state row per key."""
+    rows = conn.execute("SELECT app_name, user_id, id, state FROM sessions WHERE state IS NOT NULL").fetchall()
+    for app_name, user_id, session_id, state_json in rows:
+        try:
+            state = json.loads(state_json)
+        except ValueError:
+            continue
+        if not isinstance(state, dict):
+            continue
+        conn.executemany("""
+            INSERT OR REPLACE INTO session_state (app_name, user_id, session_id, key, value_json, version)
+            VALUES (?, ?, ?, ?, ?, 1)
+        """, [(app_name, user_id, session_id, key, json.dumps(value)) for key, value in state.items()])
+    conn.execute("UPDATE sessions SET state = NULL, version = MAX(version, 1)")
+
+
+def _backfill_patient_keys(conn: sqlite3.Connection) -> None:
+    """Fill the lookup key columns for existing patients."""
+    rows = conn.execute("SELECT patient_id, name, phone FROM patients").fetchall()
+    conn.executemany("""
+        UPDATE patients SET phone_key = ?, name_key = ?, name_phonetic = ?
+        WHERE patient_id = ?
+    """, [(*patient_keys(name, phone), patient_id) for patient_id, name, phone in rows])
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version recorded in the database file."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version.
+
+    Each migration runs in its own write transaction together with the
+    user_version bump, so an interrupted upgrade never leaves a half-applied
+    version behind. The connection must be in autocommit mode.
+    """
+    for migration in MIGRATIONS:
+        if get_schema_version(conn) >= migration.version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have upgraded while we waited for the lock.
+            if get_schema_version(conn) >= migration.version:
+                conn.execute("COMMIT")
+                continue
+            for step in migration.steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    return get_schema_version(conn)
@@ -0,0 +1,236 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+
+from .config import config
+
+# Model backends
+MODEL_BACKEND_LIVE = "live"  # call the configured models
+MODEL_BACKEND_RECORD = "record"  # call the configured models and record every response
+MODEL_BACKEND_REPLAY = "replay"  # answer from recordings only, without a network
+
+# Dates and timestamps are masked in request keys so recordings replay on later days
+_TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?")
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def _strip_ids(data: Any) -> Any:
+    # Function call IDs are random and row IDs in tool results depend on how
+    # concurrent sessions interleave; neither may change a key or be replayed
+    if isinstance(data, dict):
+        return {key: _strip_ids(value) for key, value in data.items() if key != "id"}
+    if isinstance(data, list):
+        return [_strip_ids(item) for item in data]
+    return data
+
+
+def _dump(value: Any) -> Any:
+    if value is None or isinstance(value, str):
+        return value
+    return _strip_ids(value.model_dump(mode="json", exclude_none=True))
+
+
+def request_key(model: str, instruction: Any, contents: List[Any]) -> str:
+    """SHA-256 of the model, system instruction and conversation contents.
+
+    `id` fields (function call and database row IDs) are dropped and dates
+    and timestamps masked, so the same conversation maps to the same key on
+    every run.
+    """
+    payload = json.dumps(
+        {"model": model, "instruction": _dump(instruction), "contents": [_dump(content) for content in contents]},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(_TIMESTAMP.sub("<timestamp>", payload).encode("utf-8")).hexdigest()
+
+
+class ModelRecordings:
+    """Recorded responses by request key, stored as one JSON object per line.
+
+    The file is read once on first use; new recordings are appended and a
+    later line for the same key replaces an earlier one.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is None:
+            entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            entries[entry["key"]] = entry
+            self._entries = entries
+        return self._entries
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._load()[entry["key"]] = entry
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._load())
+
+
+_recordings: Dict[str, ModelRecordings] = {}
+_recordings_lock = threading.Lock()
+
+
+def recordings_for(path: str) -> ModelRecordings:
+    """The shared ModelRecordings for `path`."""
+    path = os.path.abspath(path)
+    with _recordings_lock:
+        if path not in _recordings:
+            _recordings[path] = ModelRecordings(path)
+        return _recordings[path]
+
+
+async def _synthetic_delay(latency_ms: float, jitter_ms: float) -> None:
+    delay = (latency_ms + (random.uniform(0, jitter_ms) if jitter_ms else 0.0)) / 1000
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+class RecordReplayLlm(BaseLlm):
+    """Model that records live responses or replays them offline.
+
+    In "record" mode requests go to the live model (`live`, or the model
+    registered for `model`) and every successful answer is stored under
+    request_key() in `store_path`. In "replay" mode the recorded answer is
+    returned after `latency_ms` plus up to `latency_jitter_ms` of
+    synthetic latency, and a request that was never recorded raises
+    ReplayMissError.
+    """
+
+    mode: str = MODEL_BACKEND_REPLAY
+    store_path: str
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    live: Optional[BaseLlm] = None
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.mode not in (MODEL_BACKEND_RECORD, MODEL_BACKEND_REPLAY):
+            raise ValueError(f"Unknown record/replay mode: {self.mode}")
+
+    async def generate_content_async(self, llm_request: LlmRequest,
+                                     stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        instruction = llm_request.config.system_instruction if llm_request.config else None
+        key = request_key(self.model, instruction, llm_request.contents)
+        recordings = recordings_for(self.store_path)
+
+        if self.mode == MODEL_BACKEND_REPLAY:
+            entry = recordings.get(key)
+            if entry is None:
+                raise ReplayMissError(
+                    f"No recorded response for a {self.model} request (key {key[:12]}) in {self.store_path}; "
+                    f"record it with model_backend='{MODEL_BACKEND_RECORD}'"
+                )
+            await _synthetic_delay(self.latency_ms, self.latency_jitter_ms)
+            for response in entry["responses"]:
+                yield LlmResponse.model_validate(response)
+            return
+
+        if self.live is None:
+            from google.adk.models.registry import LLMRegistry
+
+            self.live = LLMRegistry.new_llm(self.model)
+        started = time.perf_counter()
+        responses = []
+        async for response in self.live.generate_content_async(llm_request, stream):
+            responses.append(response)
+            yield response
+        if responses and not any(response.error_code for response in responses):
+            recordings.put({
+                "key": key,
+                "model": self.model,
+                "seconds": round(time.perf_counter() - started, 3),
+                "responses": [_dump(response) for response in responses],
+            })
+
+
+class RecordReplaySearchBackend:
+    """Records or replays a network search backend's results like model calls."""
+
+    def __init__(self, backend, model: str, mode: str, store_path: str,
+                 latency_ms: float = 0.0, latency_jitter_ms: float = 0.0):
+        self.backend = backend
+        self.model = model
+        self.mode = mode
+        self.store_path = store_path
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+
+    async def search(self, query: str) -> Dict[str, Any]:
+        key = request_key(self.model, "google_search", [query])
+        recordings = recordings_for(self.store_path)
+        if self.mode == MODEL_BACKEND_REPLAY:
+            entry = recordings.get(key)
+            if entry is None:
+                raise ReplayMissError(f"No recorded search for {query!r} in {self.store_path}")
+            await _synthetic_delay(self.latency_ms, self.latency_jitter_ms)
+            return entry["results"]
+        started = time.perf_counter()
+        results = await self.backend.search(query)
+        recordings.put({"key": key, "model": self.model, "seconds": round(time.perf_counter() - started, 3),
+                        "query": query, "results": results})
+        return results
+
+
+def resolve_model(name: str) -> Union[str, BaseLlm]:
+    """The model for agents configured with `name`, following config.model_backend."""
+    if config.model_backend == MODEL_BACKEND_LIVE:
+        return name
+    return RecordReplayLlm(
+        model=name,
+        mode=config.model_backend,
+        store_path=config.model_recordings_path,
+        latency_ms=config.replay_latency_ms,
+        latency_jitter_ms=config.replay_latency_jitter_ms,
+    )
+
+
+def resolve_search_backend(backend, model: str):
+    """Wrap a network search backend for recording or replay, following config.model_backend."""
+    if config.model_backend == MODEL_BACKEND_LIVE:
+        return backend
+    return RecordReplaySearchBackend(
+        backend, model, config.model_backend, config.model_recordings_path,
+        latency_ms=config.replay_latency_ms, latency_jitter_ms=config.replay_latency_jitter_ms,
+    )
@@ -0,0 +1,86 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import re
+import sqlite3
+from typing import Any, List, Optional, Tuple
+
+# Categories whose records are split into per-metric observations
+OBSERVATION_DATA_TYPES = ("vital_signs", "lab_results")
+
+Observation = Tuple[str, float, Optional[str]]  # (metric, value, unit)
+
+_NUMBER = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(.*?)\s*$")
+_BLOOD_PRESSURE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*/\s*(\d+(?:\.\d+)?)\s*(.*?)\s*$")
+
+
+def extract_observations(data: Any) -> List[Observation]:
+    """Pull numeric readings, with units, out of a stored health data record.
+
+    Blood pressure strings like "130/85" become systolic/diastolic in mmHg,
+    values with units ("98.6 F", "110 mg/dL") keep their leading number and
+    the rest as the unit, and {"value": ..., "unit": ...} objects are
+    unpacked. Metric names are lowercased with underscores.
+    """
+    observations: List[Observation] = []
+    if not isinstance(data, dict):
+        return observations
+    for key, value in data.items():
+        name = str(key).strip().lower().replace(" ", "_")
+        unit = None
+        if isinstance(value, dict) and "value" in value:
+            unit = value.get("unit") or None
+            value = value["value"]
+        if name == "blood_pressure" and isinstance(value, str):
+            match = _BLOOD_PRESSURE.match(value)
+            if match:
+                unit = match.group(3) or unit or "mmHg"
+                observations.append(("systolic", float(match.group(1)), unit))
+                observations.append(("diastolic", float(match.group(2)), unit))
+        elif isinstance(value, bool):
+            continue
+        elif isinstance(value, (int, float)):
+            observations.append((name, float(value), unit))
+        elif isinstance(value, str):
+            match = _NUMBER.match(value)
+            if match:
+                observations.append((name, float(match.group(1)), match.group(2) or unit))
+    return observations
+
+
+def index_observations(conn: sqlite3.Connection, after_id: int = 0) -> int:
+    """Write observations for vitals and labs rows in health_data with id > `after_id`.
+
+    Runs in the caller's transaction and returns the number of observations
+    written.
+    """
+    cursor = conn.execute(f"""
+        SELECT id, patient_id, data_type, data_json, recorded_at
+        FROM health_data
+        WHERE id > ? AND data_type IN ({", ".join("?" * len(OBSERVATION_DATA_TYPES))})
+    """, (after_id, *OBSERVATION_DATA_TYPES))
+    rows = []
+    for health_data_id, patient_id, data_type, data_json, recorded_at in cursor:
+        try:
+            data = json.loads(data_json)
+        except ValueError:
+            continue
+        for metric, value, unit in extract_observations(data):
+            rows.append((patient_id, metric, recorded_at, health_data_id, value, unit))
+    conn.executemany("""
+        INSERT OR REPLACE INTO observations (patient_id, metric, recorded_at, health_data_id, value, unit)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
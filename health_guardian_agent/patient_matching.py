@@ -0,0 +1,170 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Country code assumed for 10-digit numbers written without one (NANP)
+DEFAULT_COUNTRY_CODE = "1"
+
+# Weights when both a name and a phone are given; a phone match is the stronger signal
+PHONE_WEIGHT = 0.6
+NAME_WEIGHT = 0.4
+# Candidates below this name similarity are dropped from phonetic matches
+MIN_NAME_SIMILARITY = 0.5
+
+_EXTENSION = re.compile(r"\s*(?:ext\.?|x|#)\s*\d+\s*$", re.IGNORECASE)
+_WORD = re.compile(r"[^\W_]+")
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+
+PatientRow = Tuple[str, Optional[str], Optional[str], Optional[str], Optional[str]]  # id, name, phone, keys
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Normalize a phone number to E.164 ("+15551234567").
+
+    Formatting and extensions are dropped, "00" international prefixes
+    become "+", and 10-digit numbers get DEFAULT_COUNTRY_CODE. Returns None
+    when fewer than 7 digits remain.
+    """
+    if not phone:
+        return None
+    text = _EXTENSION.sub("", str(phone)).strip()
+    digits = "".join(ch for ch in text if ch.isdigit())
+    if text.startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif len(digits) == 10:
+        digits = DEFAULT_COUNTRY_CODE + digits
+    return f"+{digits}" if len(digits) >= 7 else None
+
+
+def _name_words(name: Optional[str]) -> List[str]:
+    if not name:
+        return []
+    decomposed = unicodedata.normalize("NFKD", str(name))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return sorted(_WORD.findall(stripped.casefold()))
+
+
+def name_key(name: Optional[str]) -> Optional[str]:
+    """Casefolded, accent- and punctuation-free name words in sorted order.
+
+    "Doe, Jane", "JANE DOE" and "Jane Doé" share one key.
+    """
+    return " ".join(_name_words(name)) or None
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of one word; words without Latin letters are returned as-is."""
+    letters = [ch for ch in word if "a" <= ch <= "z"]
+    if not letters:
+        return word
+    code = letters[0].upper()
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+        if ch not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def name_phonetic(name: Optional[str]) -> Optional[str]:
+    """Order-insensitive phonetic key: the sorted Soundex codes of the name's words.
+
+    "Jon Smyth" and "John Smith" share one key.
+    """
+    codes = sorted(soundex(word) for word in _name_words(name))
+    return " ".join(codes) or None
+
+
+def patient_keys(name: Optional[str], phone: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Return the (phone_key, name_key, name_phonetic) lookup columns for a patient."""
+    return phone_key(phone), name_key(name), name_phonetic(name)
+
+
+def _bigrams(key: str) -> Set[str]:
+    padded = f" {key} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def name_similarity(query_key: Optional[str], candidate_key: Optional[str]) -> float:
+    """Dice coefficient of the two name keys' character bigrams (1.0 for the same key)."""
+    if not query_key or not candidate_key:
+        return 0.0
+    if query_key == candidate_key:
+        return 1.0
+    query, candidate = _bigrams(query_key), _bigrams(candidate_key)
+    return 2 * len(query & candidate) / (len(query) + len(candidate))
+
+
+def rank_candidates(rows: Iterable[PatientRow], name: Optional[str], phone: Optional[str],
+                    limit: int = 10) -> List[Dict[str, Any]]:
+    """Score candidate patients against a lookup and return the best first.
+
+    `rows` are (patient_id, name, phone, phone_key, name_key) tuples. Each
+    candidate gets a 0-1 score from its phone match and name similarity,
+    weighted PHONE_WEIGHT/NAME_WEIGHT when both were given, and lists what
+    matched: "phone", "name" (same name key) or "similar_name".
+    """
+    query_phone, query_name = phone_key(phone), name_key(name)
+    scored: Dict[str, Dict[str, Any]] = {}
+    similarities: Dict[Optional[str], float] = {}
+    for patient_id, found_name, found_phone, found_phone_key, found_name_key in rows:
+        if patient_id in scored:
+            continue
+        matched = []
+        phone_score = 1.0 if query_phone and found_phone_key == query_phone else 0.0
+        if phone_score:
+            matched.append("phone")
+        similarity = similarities.get(found_name_key)
+        if similarity is None:
+            similarity = similarities[found_name_key] = name_similarity(query_name, found_name_key)
+        if similarity == 1.0:
+            matched.append("name")
+        elif similarity >= MIN_NAME_SIMILARITY:
+            matched.append("similar_name")
+        else:
+            similarity = 0.0
+        if not matched:
+            continue
+        if query_phone and query_name:
+            score = PHONE_WEIGHT * phone_score + NAME_WEIGHT * similarity
+        else:
+            score = phone_score if query_phone else similarity
+        scored[patient_id] = {
+            "patient_id": patient_id,
+            "name": found_name,
+            "phone": found_phone,
+            "score": round(score, 3),
+            "matched": matched,
+        }
+    return sorted(scored.values(), key=lambda c: (-c["score"], c["patient_id"]))[:limit]
+
+
+def identified_patient(candidates: List[Dict[str, Any]], phone: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The best candidate that identifies the patient, if any.
+
+    Only an exact phone match does when a phone was given, and only an
+    exact name match when it was not; similar names need confirmation.
+    """
+    required = "phone" if phone_key(phone) else "name"
+    return next((candidate for candidate in candidates if required in candidate["matched"]), None)
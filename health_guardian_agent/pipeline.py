@@ -0,0 +1,156 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+
+# Scheduling modes
+PIPELINE_PARALLEL = "parallel"  # run independent stages concurrently
+PIPELINE_SEQUENTIAL = "sequential"  # run stages one at a time, in dependency order
+
+
+class PipelineScheduler(BaseAgent):
+    """Runs sub-agent stages in dependency order, overlapping independent ones.
+
+    Each stage declares the state keys it reads (`stage_inputs`) and writes
+    (`stage_outputs`), keyed by sub-agent name. Stages are grouped into
+    waves: a stage joins the first wave after every stage producing one of
+    its inputs. Stages within a wave run concurrently in parallel mode and
+    one after another, in declaration order, in sequential mode. Every stage
+    runs on its own branch so concurrent stages do not see each other's
+    turns, and per-stage timings are written to `timings_key` in state.
+    """
+
+    stage_inputs: Dict[str, List[str]] = {}
+    stage_outputs: Dict[str, List[str]] = {}
+    mode: str = PIPELINE_PARALLEL
+    timings_key: str = "pipeline_timings"
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if self.mode not in (PIPELINE_PARALLEL, PIPELINE_SEQUENTIAL):
+            raise ValueError(f"Unknown pipeline mode: {self.mode}")
+        self.waves()  # reject cycles and conflicting outputs up front
+
+    def waves(self) -> List[List[BaseAgent]]:
+        """Group stages into dependency levels, preserving declaration order."""
+        producers: Dict[str, str] = {}
+        for stage in self.sub_agents:
+            for key in self.stage_outputs.get(stage.name, ()):
+                if key in producers:
+                    raise ValueError(f"State key {key!r} is produced by both {producers[key]} and {stage.name}")
+                producers[key] = stage.name
+
+        depends_on = {
+            stage.name: {producers[key] for key in self.stage_inputs.get(stage.name, ())
+                         if key in producers and producers[key] != stage.name}
+            for stage in self.sub_agents
+        }
+        done: set = set()
+        remaining = list(self.sub_agents)
+        waves: List[List[BaseAgent]] = []
+        while remaining:
+            wave = [stage for stage in remaining if depends_on[stage.name] <= done]
+            if not wave:
+                raise ValueError(f"Pipeline stages have a dependency cycle: {[s.name for s in remaining]}")
+            waves.append(wave)
+            done.update(stage.name for stage in wave)
+            remaining = [stage for stage in remaining if stage.name not in done]
+        return waves
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        origin = time.perf_counter()
+        timings: Dict[str, Dict[str, float]] = {}
+        waves = self.waves()
+        if self.mode == PIPELINE_SEQUENTIAL:
+            waves = [[stage] for wave in waves for stage in wave]
+
+        for wave in waves:
+            runs = [self._run_stage(stage, self._branch_context(stage, ctx), timings, origin) for stage in wave]
+            events = runs[0] if len(runs) == 1 else _merge(runs)
+            async with aclosing(events) as agen:
+                async for event in agen:
+                    yield event
+
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.timings_key: {
+                "mode": self.mode,
+                "waves": [[stage.name for stage in wave] for wave in waves],
+                "total_seconds": round(time.perf_counter() - origin, 3),
+                "stages": timings,
+            }}),
+        )
+
+    def _branch_context(self, stage: BaseAgent, ctx: InvocationContext) -> InvocationContext:
+        branch_ctx = ctx.model_copy()
+        suffix = f"{self.name}.{stage.name}"
+        branch_ctx.branch = f"{ctx.branch}.{suffix}" if ctx.branch else suffix
+        return branch_ctx
+
+    async def _run_stage(self, stage: BaseAgent, ctx: InvocationContext,
+                         timings: Dict[str, Dict[str, float]], origin: float) -> AsyncGenerator[Event, None]:
+        started = time.perf_counter()
+        try:
+            async with aclosing(stage.run_async(ctx)) as agen:
+                async for event in agen:
+                    yield event
+        finally:
+            timings[stage.name] = {
+                "start_seconds": round(started - origin, 3),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+
+
+async def _merge(runs: List[AsyncGenerator[Event, None]]) -> AsyncGenerator[Event, None]:
+    """Interleave events from concurrent stages.
+
+    Each stage waits until its previous event has been consumed, so state
+    deltas are applied by the runner before that stage continues.
+    """
+    done = object()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def drain(run: AsyncGenerator[Event, None]) -> None:
+        try:
+            async for event in run:
+                consumed = asyncio.Event()
+                await queue.put((event, consumed))
+                await consumed.wait()
+        finally:
+            await queue.put((done, None))
+
+    tasks = [asyncio.create_task(drain(run)) for run in runs]
+    try:
+        finished = 0
+        while finished < len(tasks):
+            event, consumed = await queue.get()
+            if event is done:
+                finished += 1
+                continue
+            yield event
+            consumed.set()
+        for task in tasks:
+            task.result()  # re-raise stage failures
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,136 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Long unit spellings seen in extracted reports, and their standard abbreviations
+UNIT_ABBREVIATIONS = [
+    (r"beats per minute", "bpm"),
+    (r"breaths per minute", "breaths/min"),
+    (r"millimeters of mercury|mm ?hg", "mmHg"),
+    (r"milligrams per deciliter|mg ?/ ?dl", "mg/dL"),
+    (r"grams per deciliter|g ?/ ?dl", "g/dL"),
+    (r"millimoles per liter|mmol ?/ ?l", "mmol/L"),
+    (r"milligrams", "mg"),
+    (r"micrograms", "mcg"),
+    (r"milliliters", "mL"),
+    (r"kilograms", "kg"),
+    (r"pounds", "lb"),
+    (r"degrees fahrenheit|deg f", "°F"),
+    (r"degrees celsius|deg c", "°C"),
+    (r"percent", "%"),
+    (r"three times (a day|daily)", "TID"),
+    (r"twice (a day|daily)", "BID"),
+    (r"once (a day|daily)", "daily"),
+    (r"as needed", "PRN"),
+]
+_UNITS = [(re.compile(rf"\b(?:{pattern})(?!\w)", re.IGNORECASE), short) for pattern, short in UNIT_ABBREVIATIONS]
+_SPACES = re.compile(r"\s+")
+
+# Letters, digit runs, whitespace runs and single punctuation marks
+_PIECES = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]|_")
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free token estimate for budgeting prompts.
+
+    Counts a token per four letters of a word, per three digits of a
+    number, per punctuation mark and per run of newlines/indentation,
+    which tracks subword tokenizers on JSON and prose far better than a
+    flat characters/4 rule.
+    """
+    tokens = 1
+    for piece in _PIECES.findall(text or ""):
+        first = piece[0]
+        if first.isspace():
+            tokens += piece != " "
+        elif first.isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif first.isalpha():
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+
+def compact_value(value: Any) -> Any:
+    """Canonicalize a value for prompts.
+
+    Drops None, empty strings and empty containers, collapses whitespace and
+    abbreviates units in strings, and recurses into lists and dicts.
+    Returns None when nothing is left.
+    """
+    if isinstance(value, dict):
+        pruned = {str(key): compact_value(item) for key, item in value.items()}
+        pruned = {key: item for key, item in pruned.items() if item is not None}
+        return pruned or None
+    if isinstance(value, (list, tuple)):
+        pruned = [item for item in (compact_value(item) for item in value) if item is not None]
+        return pruned or None
+    if isinstance(value, str):
+        text = _SPACES.sub(" ", value).strip()
+        for pattern, short in _UNITS:
+            text = pattern.sub(short, text)
+        return text or None
+    return value
+
+
+def encode_compact(value: Any) -> str:
+    """Serialize a value as compact, canonical JSON (sorted keys, no whitespace)."""
+    return json.dumps(compact_value(value), separators=(",", ":"), sort_keys=True, ensure_ascii=False)
+
+
+def encode_health_data(patient_id: str, latest: Dict[str, Any],
+                       history: Optional[List[Dict[str, Any]]] = None,
+                       token_budget: Optional[int] = None) -> str:
+    """Encode a patient's latest data, plus optional history, for a prompt.
+
+    `history` holds get_patient_data_history records, newest first; the
+    newest record of each type already in `latest` is skipped. The rest are
+    grouped by data type as [recorded_at, data] pairs so record keys are not
+    repeated, and the oldest are dropped once the estimated size exceeds
+    `token_budget`; "history_omitted" says how many.
+    """
+    payload: Dict[str, Any] = {"patient_id": patient_id, **(compact_value(latest) or {})}
+    if not history:
+        return encode_compact(payload)
+    # Reserve room for the wrapper keys so the whole result fits the budget
+    used = estimate_tokens(encode_compact(payload)) + estimate_tokens('"history":{},"history_omitted":100000')
+
+    grouped: Dict[str, List[Any]] = {}
+    omitted = 0
+    older = []
+    seen = set()
+    for record in history:
+        if record["data_type"] in latest and record["data_type"] not in seen:
+            seen.add(record["data_type"])
+            continue
+        older.append(record)
+    for index, record in enumerate(older):
+        row = [str(record["recorded_at"])[:16], compact_value(record["data"])]
+        cost = estimate_tokens(encode_compact(row)) + 1
+        if record["data_type"] not in grouped:
+            cost += estimate_tokens(f'"{record["data_type"]}":[],')
+        if token_budget is not None and used + cost > token_budget:
+            omitted = len(older) - index
+            break
+        used += cost
+        grouped.setdefault(record["data_type"], []).append(row)
+    if grouped:
+        payload["history"] = grouped
+    if omitted:
+        payload["history_omitted"] = omitted
+    return encode_compact(payload)
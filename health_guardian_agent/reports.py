@@ -0,0 +1,342 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Health report engine.
+
+Renders markdown reports from stored patient data with a template compiled
+once, streams them to disk, and in batch mode spreads patients across a
+process pool, writing a manifest line per report.
+
+    python -m health_guardian_agent.reports --out-dir reports --workers 8
+"""
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import string
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .trends import analyze_patient_trends
+
+# Metrics shown in the report, per category: (key, label, unit suffix)
+REPORT_METRICS = {
+    "vital_signs": [
+        ("blood_pressure", "Blood Pressure", ""),
+        ("heart_rate", "Heart Rate", " bpm"),
+        ("temperature", "Temperature", "°F"),
+        ("oxygen_saturation", "Oxygen Saturation", "%"),
+    ],
+    "lab_results": [
+        ("glucose", "Glucose", " mg/dL"),
+        ("cholesterol", "Cholesterol", " mg/dL"),
+        ("hemoglobin", "Hemoglobin", " g/dL"),
+    ],
+}
+# Stored agent outputs included when present: (assessment_type, heading)
+REPORT_ASSESSMENTS = [
+    ("risk_assessment", "Risk Assessment"),
+    ("care_plan", "Care Plan"),
+]
+
+REPORT_TEMPLATE = """# Health Report for Patient {patient_id}
+
+## Patient Information
+- **Patient ID**: {patient_id}
+- **Name**: {name}
+- **Report Date**: {report_date}
+
+## Current Health Status
+
+### Vital Signs
+{vital_signs}
+
+### Laboratory Results
+{lab_results}
+
+### Medications
+{medications}
+
+### Medical Conditions
+{conditions}
+
+## Trends
+{trends}
+{assessments}
+## Important Notes
+- This report is for informational purposes only
+- Always consult with qualified healthcare professionals for medical advice
+- Report generated from stored patient data
+
+---
+*Generated by HealthGuardian Agent*
+"""
+
+# A field value is a string or an iterable of lines
+FieldValue = Union[str, Iterable[str]]
+
+
+class ReportTemplate:
+    """A report template parsed once into literal text and field names.
+
+    Rendering walks the parsed pieces and yields chunks, so a report is
+    never built as one large string; fields may be strings or iterables of
+    lines.
+    """
+
+    def __init__(self, text: str = REPORT_TEMPLATE):
+        self.pieces: List[Tuple[str, Optional[str]]] = [
+            (literal, field) for literal, field, _, _ in string.Formatter().parse(text)
+        ]
+        self.fields: Set[str] = {field for _, field in self.pieces if field}
+
+    def stream(self, values: Dict[str, FieldValue]) -> Iterator[str]:
+        """Yield the rendered report chunk by chunk."""
+        for literal, field in self.pieces:
+            if literal:
+                yield literal
+            if field:
+                value = values[field]
+                if isinstance(value, str):
+                    yield value
+                else:
+                    yield from value
+
+    def render(self, values: Dict[str, FieldValue]) -> str:
+        return "".join(self.stream(values))
+
+
+DEFAULT_TEMPLATE = ReportTemplate()
+
+
+def _bullets(items: Iterable[str], empty: str = "- None recorded") -> Iterator[str]:
+    first = True
+    for item in items:
+        yield ("" if first else "\n") + f"- {item}"
+        first = False
+    if first:
+        yield empty
+
+
+def _metric_lines(data: Dict[str, Any], category: str) -> Iterator[str]:
+    for index, (key, label, unit) in enumerate(REPORT_METRICS[category]):
+        value = data.get(key)
+        value = "N/A" if value in (None, "") else f"{value}{unit}"
+        yield ("\n" if index else "") + f"- **{label}**: {value}"
+
+
+def _list_items(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    if isinstance(value, dict):
+        return [f"{key}: {item}" for key, item in value.items()]
+    return [str(value)] if value else []
+
+
+def _assessment_sections(database, patient_id: str) -> Iterator[str]:
+    for assessment_type, heading in REPORT_ASSESSMENTS:
+        content = database.get_latest_assessment(patient_id, assessment_type)
+        if content:
+            yield f"\n## {heading}\n{content.strip()}\n"
+
+
+def report_values(database, patient_id: str, report_date: Optional[str] = None) -> Dict[str, FieldValue]:
+    """Collect one patient's template values from the database."""
+    latest = database.get_patient_data(patient_id)
+    info = database.get_patient_info(patient_id)
+    trends = analyze_patient_trends(database, patient_id)
+    return {
+        "patient_id": patient_id,
+        "name": info.get("name") or "N/A",
+        "report_date": report_date or datetime.date.today().isoformat(),
+        "vital_signs": _metric_lines(latest.get("vital_signs") or {}, "vital_signs"),
+        "lab_results": _metric_lines(latest.get("lab_results") or {}, "lab_results"),
+        "medications": _bullets(_list_items(latest.get("medications"))),
+        "conditions": _bullets(_list_items(latest.get("conditions"))),
+        "trends": _bullets(trends["flags"], empty="- No concerning trends"),
+        "assessments": _assessment_sections(database, patient_id),
+    }
+
+
+def render_report(database, patient_id: str, report_date: Optional[str] = None,
+                  template: Optional[ReportTemplate] = None) -> str:
+    """Render one patient's report as a string."""
+    return (template or DEFAULT_TEMPLATE).render(report_values(database, patient_id, report_date))
+
+
+def write_report(database, patient_id: str, path: str, report_date: Optional[str] = None,
+                 template: Optional[ReportTemplate] = None) -> int:
+    """Stream one patient's report to `path` and return the bytes written.
+
+    The report is written to a temporary file and renamed into place, so
+    readers never see a partial report.
+    """
+    chunks = (template or DEFAULT_TEMPLATE).stream(report_values(database, patient_id, report_date))
+    return write_chunks(path, chunks)
+
+
+def write_chunks(path: str, chunks: Iterable[str]) -> int:
+    """Write text chunks to `path` atomically and return the bytes written."""
+    partial = f"{path}.partial"
+    written = 0
+    with open(partial, "w", encoding="utf-8", buffering=64 * 1024) as f:
+        for chunk in chunks:
+            written += len(chunk.encode("utf-8"))
+            f.write(chunk)
+    os.replace(partial, path)
+    return written
+
+
+def report_filename(patient_id: str) -> str:
+    return f"health_report_{patient_id}.md"
+
+
+# Per-process state for pool workers
+_worker_db = None
+
+
+def _init_worker(db_path: str) -> None:
+    global _worker_db
+    from .database import HealthDatabase
+
+    _worker_db = HealthDatabase(db_path)
+
+
+def _write_chunk(patient_ids: List[str], out_dir: str, report_date: str,
+                 database=None) -> List[Dict[str, Any]]:
+    """Write reports for a chunk of patients and return their manifest entries."""
+    database = database or _worker_db
+    entries = []
+    for patient_id in patient_ids:
+        filename = report_filename(patient_id)
+        try:
+            size = write_report(database, patient_id, os.path.join(out_dir, filename), report_date)
+            entries.append({"patient_id": patient_id, "file": filename, "bytes": size})
+        except Exception as e:
+            entries.append({"patient_id": patient_id, "error": str(e)})
+    # Reports are one-off reads; keep the worker's cache from growing over the run
+    database.cache.clear()
+    return entries
+
+
+def _chunks(database, patient_ids: Optional[Iterable[str]], chunk_size: int) -> Iterator[List[str]]:
+    if patient_ids is not None:
+        chunk: List[str] = []
+        for patient_id in patient_ids:
+            chunk.append(patient_id)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+        return
+    after = ""
+    while True:
+        chunk = database.list_patient_ids(after, chunk_size)
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1]
+
+
+def generate_reports(db_path: str, out_dir: str, patient_ids: Optional[Iterable[str]] = None,
+                     workers: Optional[int] = None, chunk_size: int = 200,
+                     report_date: Optional[str] = None,
+                     progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Write a report per patient into `out_dir`, plus a manifest.jsonl.
+
+    Patients (all of them by default) are paged from the database and sent
+    to `workers` processes in chunks of `chunk_size`; at most two chunks
+    per worker are in flight, so memory stays bounded however many
+    patients there are. Each worker opens its own connection. With
+    workers=0 everything runs in this process. Returns report and failure
+    counts, bytes written and reports per second.
+    """
+    from .database import HealthDatabase
+
+    os.makedirs(out_dir, exist_ok=True)
+    report_date = report_date or datetime.date.today().isoformat()
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    start = time.perf_counter()
+    stats: Dict[str, Any] = {"reports": 0, "failed": 0, "bytes": 0, "workers": workers}
+
+    database = HealthDatabase(db_path)
+    manifest_path = os.path.join(out_dir, "manifest.jsonl")
+    try:
+        with open(f"{manifest_path}.partial", "w", encoding="utf-8") as manifest:
+
+            def record(entries: List[Dict[str, Any]]) -> None:
+                for entry in entries:
+                    manifest.write(json.dumps(entry) + "\n")
+                    if "error" in entry:
+                        stats["failed"] += 1
+                    else:
+                        stats["reports"] += 1
+                        stats["bytes"] += entry["bytes"]
+                if progress:
+                    progress(stats)
+
+            chunks = _chunks(database, patient_ids, chunk_size)
+            if workers == 0:
+                for chunk in chunks:
+                    record(_write_chunk(chunk, out_dir, report_date, database))
+            else:
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(db_path,)) as pool:
+                    pending: Set[Future] = set()
+                    for chunk in chunks:
+                        pending.add(pool.submit(_write_chunk, chunk, out_dir, report_date))
+                        if len(pending) >= 2 * workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                record(future.result())
+                    for future in pending:
+                        record(future.result())
+        os.replace(f"{manifest_path}.partial", manifest_path)
+    finally:
+        database.close()
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["reports_per_sec"] = stats["reports"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["manifest"] = manifest_path
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("patient_ids", nargs="*", help="patients to report on (default: all)")
+    parser.add_argument("--db", help="database file (default: $HEALTH_GUARDIAN_DB or sessions.db)")
+    parser.add_argument("--out-dir", default="reports", help="directory for reports and manifest.jsonl")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count; 0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="patients per worker task")
+    args = parser.parse_args(argv)
+
+    stats = generate_reports(
+        args.db or os.environ.get("HEALTH_GUARDIAN_DB", "sessions.db"),
+        args.out_dir,
+        args.patient_ids or None,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+    )
+    print(json.dumps(stats))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from google.adk.agents import LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from .async_database import AsyncHealthDatabase, async_db
+from .config import config
+
+# State keys written by the patient lookup and health data tools
+PATIENT_ID_KEY = "patient_id"
+HEALTH_DATA_FINGERPRINT_KEY = "health_data_fingerprint"
+
+
+def _as_list(callback: Any) -> list:
+    if callback is None:
+        return []
+    return list(callback) if isinstance(callback, list) else [callback]
+
+
+def _response_text(response: LlmResponse) -> Optional[str]:
+    """Return the text of a final model answer, or None for tool calls and partials."""
+    if response.partial or not response.content or not response.content.parts:
+        return None
+    parts = response.content.parts
+    if any(part.function_call for part in parts):
+        return None
+    text = "".join(part.text for part in parts if part.text and not part.thought)
+    return text if text.strip() else None
+
+
+class SubAgentResultCache:
+    """Serves a sub-agent's stored answer when its inputs have not changed.
+
+    The key is a SHA-256 over the agent's model name, instruction text, the
+    patient ID, the fingerprint of the health data last fetched and the
+    values of the state keys the agent reads. The patient is the one the
+    lookup and health data tools last resolved in the session; until a
+    tool has resolved one nothing is cached. Answers are stored in the
+    assessments table under the agent's output_key, and storing new health
+    data for a patient invalidates all of them. A hit short-circuits the
+    model call, so the output still lands in state and the stage's
+    validator passes as usual.
+    """
+
+    def __init__(self, database: AsyncHealthDatabase):
+        self.async_db = database
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._lock = threading.Lock()
+
+    def attach(self, agent: LlmAgent, inputs: Sequence[str] = ()) -> LlmAgent:
+        """Wrap `agent`'s model calls with cache lookups and stores."""
+        if not agent.output_key:
+            raise ValueError(f"{agent.name} needs an output_key to be cached")
+        inputs = tuple(inputs)
+
+        async def lookup(callback_context: CallbackContext, llm_request: LlmRequest) -> Optional[LlmResponse]:
+            if not config.result_cache_enabled:
+                return None
+            key = self._key(agent, inputs, callback_context)
+            if key is None:
+                return None
+            patient_id, input_hash = key
+            content = await self.async_db.get_cached_assessment(patient_id, agent.output_key, input_hash)
+            with self._lock:
+                if content is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+            return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=content)]))
+
+        async def store(callback_context: CallbackContext, llm_response: LlmResponse) -> Optional[LlmResponse]:
+            text = _response_text(llm_response)
+            if text is None or not config.result_cache_enabled:
+                return None
+            key = self._key(agent, inputs, callback_context)
+            if key is None:
+                return None
+            patient_id, input_hash = key
+            if await self.async_db.store_assessment(patient_id, agent.output_key, text, input_hash):
+                with self._lock:
+                    self.stores += 1
+            return None
+
+        agent.before_model_callback = _as_list(agent.before_model_callback) + [lookup]
+        agent.after_model_callback = _as_list(agent.after_model_callback) + [store]
+        return agent
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/store counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _key(self, agent: LlmAgent, inputs: Sequence[str],
+             callback_context: CallbackContext) -> Optional[Tuple[str, str]]:
+        state = callback_context.state
+        patient_id = state.get(PATIENT_ID_KEY)
+        if not patient_id:
+            return None
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, "model", "")
+        instruction = agent.instruction if isinstance(agent.instruction, str) else agent.instruction.__qualname__
+        payload = json.dumps({
+            "model": model,
+            "instruction": instruction,
+            "patient_id": patient_id,
+            "health_data": state.get(HEALTH_DATA_FINGERPRINT_KEY),
+            "inputs": {key: state.get(key) for key in inputs},
+        }, sort_keys=True, default=str)
+        return patient_id, hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# Global cache for the analysis sub-agents
+result_cache = SubAgentResultCache(async_db)
@@ -0,0 +1,260 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+import httpx
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import errors as genai_errors
+
+from .config import config
+from .tracing import Tracer, tracer
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Stage outcomes
+OUTCOME_OK = "ok"
+OUTCOME_VALIDATION_FAILED = "validation_failed"
+OUTCOME_TRANSPORT_ERROR = "transport_error"
+OUTCOME_DEADLINE = "deadline"
+OUTCOME_CALL_BUDGET = "call_budget"
+
+# error_code on the response returned instead of calling the model once the budget is spent
+BUDGET_EXHAUSTED_ERROR = "RETRY_BUDGET_EXHAUSTED"
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a model call failure is a transport problem worth retrying."""
+    if isinstance(error, genai_errors.APIError):
+        return error.code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+@dataclass
+class RequestBudget:
+    """Wall-clock deadline and model call allowance shared by one request's stages."""
+
+    deadline: float
+    max_model_calls: int
+    model_calls: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def remaining_seconds(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+    def exhausted(self) -> Optional[str]:
+        """Return OUTCOME_DEADLINE or OUTCOME_CALL_BUDGET once spent, else None."""
+        if time.monotonic() >= self.deadline:
+            return OUTCOME_DEADLINE
+        if self.model_calls >= self.max_model_calls:
+            return OUTCOME_CALL_BUDGET
+        return None
+
+
+class RetryController:
+    """Hands out per-request budgets and decides how long to back off.
+
+    A request is one invocation: its budget starts when the first stage
+    asks for it and is shared by every RetryLoopAgent stage in that
+    invocation, so the worst-case latency of a turn is bounded by
+    `deadline_seconds` plus one in-flight model call, however many stages
+    retry. Backoff uses full jitter: a uniform delay between zero and
+    `base_delay * 2**(failures - 1)`, capped at `max_delay`.
+    """
+
+    def __init__(self, deadline_seconds: float, max_model_calls: int, base_delay: float = 0.5,
+                 max_delay: float = 8.0, rng: Optional[random.Random] = None, max_requests: int = 1000):
+        self.deadline_seconds = deadline_seconds
+        self.max_model_calls = max_model_calls
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_requests = max_requests
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._budgets: "OrderedDict[str, RequestBudget]" = OrderedDict()
+        self._counts: Dict[str, float] = {
+            "stages": 0, "attempts": 0, "validation_failures": 0, "transport_errors": 0, "backoff_seconds": 0.0,
+        }
+        self._outcomes: Dict[str, int] = {}
+
+    def budget(self, invocation_id: str) -> RequestBudget:
+        """Return the invocation's budget, starting it on first use."""
+        with self._lock:
+            budget = self._budgets.get(invocation_id)
+            if budget is None:
+                budget = RequestBudget(time.monotonic() + self.deadline_seconds, self.max_model_calls)
+                self._budgets[invocation_id] = budget
+                while len(self._budgets) > self.max_requests:
+                    self._budgets.popitem(last=False)
+            return budget
+
+    def charge_model_call(self, invocation_id: str) -> Optional[str]:
+        """Count a model call against the request; return why not if the budget is spent."""
+        budget = self.budget(invocation_id)
+        with self._lock:
+            reason = budget.exhausted()
+            if reason is None:
+                budget.model_calls += 1
+            return reason
+
+    def backoff(self, failures: int) -> float:
+        """Seconds to wait before retrying after `failures` consecutive transport errors."""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+        with self._lock:
+            return self._rng.uniform(0, ceiling)
+
+    def record(self, counts: Dict[str, Any], outcome: str) -> None:
+        with self._lock:
+            self._counts["stages"] += 1
+            for key, value in counts.items():
+                self._counts[key] += value
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return attempt, failure and backoff totals and stage outcome counts."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            stats["retries"] = stats["attempts"] - stats["stages"]
+            stats["outcomes"] = dict(self._outcomes)
+            return stats
+
+
+def _agent_names(agent: BaseAgent) -> List[str]:
+    return [agent.name] + [name for sub_agent in agent.sub_agents for name in _agent_names(sub_agent)]
+
+
+class RetryLoopAgent(BaseAgent):
+    """Runs a worker agent and its validator, retrying within the request budget.
+
+    `sub_agents` is [worker, validator]; the validator passes by yielding
+    an escalating event. A failed validation is retried straight away, at
+    most `validation_retries` times, since the model answered and only
+    its output was unusable. A transient model error (see is_transient) is
+    retried after a jittered backoff, at most `transport_retries` times;
+    other errors propagate. No attempt starts, and no model call is made,
+    once the request's deadline or call budget is spent. Attempt and
+    failure counts and the outcome are written to `<name>_retries` in state.
+    A failed attempt's open spans are finished as errors on `tracer`.
+    """
+
+    validation_retries: Optional[int] = None
+    transport_retries: Optional[int] = None
+    controller: Optional[RetryController] = None
+    tracer: Optional[Tracer] = None
+
+    def model_post_init(self, __context: Any) -> None:
+        super().model_post_init(__context)
+        if len(self.sub_agents) != 2:
+            raise ValueError(f"{self.name} needs exactly a worker and a validator sub-agent")
+        worker = self.sub_agents[0]
+        if isinstance(worker, LlmAgent):
+            # Appended last, so calls answered by the result cache are not charged
+            callbacks = worker.before_model_callback
+            callbacks = [] if callbacks is None else list(callbacks) if isinstance(callbacks, list) else [callbacks]
+            worker.before_model_callback = callbacks + [self._charge_model_call]
+
+    def _controller(self) -> RetryController:
+        return self.controller or retry_controller
+
+    def _charge_model_call(self, callback_context: CallbackContext,
+                           llm_request: LlmRequest) -> Optional[LlmResponse]:
+        reason = self._controller().charge_model_call(callback_context.invocation_id)
+        if reason is None:
+            return None
+        return LlmResponse(error_code=BUDGET_EXHAUSTED_ERROR, error_message=f"Request {reason} reached")
+
+    async def _validate(self, validator: BaseAgent, ctx: InvocationContext) -> bool:
+        passed = False
+        async with aclosing(validator.run_async(ctx)) as agen:
+            async for event in agen:
+                passed = passed or bool(event.actions.escalate)
+        return passed
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        controller = self._controller()
+        budget = controller.budget(ctx.invocation_id)
+        validation_retries = (config.stage_validation_retries if self.validation_retries is None
+                              else self.validation_retries)
+        transport_retries = (config.stage_transport_retries if self.transport_retries is None
+                             else self.transport_retries)
+        worker, validator = self.sub_agents
+        counts: Dict[str, Any] = {"attempts": 0, "validation_failures": 0, "transport_errors": 0,
+                                  "backoff_seconds": 0.0}
+        outcome = None
+
+        while outcome is None:
+            outcome = budget.exhausted()
+            if outcome:
+                break
+            counts["attempts"] += 1
+            try:
+                async with aclosing(worker.run_async(ctx)) as agen:
+                    async for event in agen:
+                        yield event
+            except Exception as e:
+                (self.tracer or tracer).fail(ctx.invocation_id, _agent_names(worker), e)
+                if not is_transient(e):
+                    raise
+                counts["transport_errors"] += 1
+                if counts["transport_errors"] > transport_retries:
+                    outcome = OUTCOME_TRANSPORT_ERROR
+                    break
+                delay = controller.backoff(counts["transport_errors"])
+                if delay >= budget.remaining_seconds():
+                    outcome = OUTCOME_DEADLINE
+                    break
+                print(f"{worker.name} failed with {type(e).__name__}: {e}; retrying in {delay:.2f}s")
+                counts["backoff_seconds"] += delay
+                await asyncio.sleep(delay)
+                continue
+
+            if await self._validate(validator, ctx):
+                outcome = OUTCOME_OK
+                break
+            outcome = budget.exhausted()
+            if outcome:
+                break
+            counts["validation_failures"] += 1
+            if counts["validation_failures"] > validation_retries:
+                outcome = OUTCOME_VALIDATION_FAILED
+
+        counts["backoff_seconds"] = round(counts["backoff_seconds"], 3)
+        controller.record(counts, outcome)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={f"{self.name}_retries": {**counts, "outcome": outcome}}),
+        )
+
+
+# Global retry controller shared by the robust sub-agents
+retry_controller = RetryController(
+    config.request_deadline_seconds,
+    config.request_model_call_budget,
+    base_delay=config.retry_base_delay_seconds,
+    max_delay=config.retry_max_delay_seconds,
+)
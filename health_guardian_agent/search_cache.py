@@ -0,0 +1,227 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from google.genai import types
+
+from .async_database import AsyncHealthDatabase, async_db
+from .config import config, ensure_environment
+
+# Search backends
+SEARCH_BACKEND_GEMINI = "gemini"  # Gemini with Google Search grounding (network)
+SEARCH_BACKEND_LOCAL = "local"  # offline stand-in over a small guideline corpus
+
+SearchResult = Dict[str, Any]  # {"summary": str, "sources": [{"title", "url"}]}
+
+_TOKEN = re.compile(r"[^\W_]+")
+_STOPWORDS = frozenset("a an and are for how in is of on or the to what with".split())
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: casefolded, punctuation-free, deduplicated, sorted terms.
+
+    "Hypertension guidelines 2024?" and "2024 guidelines for hypertension"
+    share one entry.
+    """
+    terms = {term for term in _TOKEN.findall(query.casefold()) if term not in _STOPWORDS}
+    return " ".join(sorted(terms))
+
+
+class GeminiSearchBackend:
+    """Answers a query with one Google Search grounded Gemini call.
+
+    Every cache miss therefore costs a generate_content round-trip of its
+    own, on top of the model call of the agent that issued the search.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._client = None
+
+    async def search(self, query: str) -> SearchResult:
+        if self._client is None:
+            from google import genai
+
+            ensure_environment()
+            self._client = genai.Client()
+        response = await self._client.aio.models.generate_content(
+            model=self.model,
+            contents=query,
+            config=types.GenerateContentConfig(tools=[types.Tool(google_search=types.GoogleSearch())]),
+        )
+        sources = []
+        metadata = response.candidates[0].grounding_metadata if response.candidates else None
+        for chunk in (metadata.grounding_chunks or []) if metadata else []:
+            if chunk.web:
+                sources.append({"title": chunk.web.title, "url": chunk.web.uri})
+        return {"summary": response.text or "", "sources": sources}
+
+
+# Short, stable guideline summaries served by the offline backend
+LOCAL_GUIDELINES: List[Dict[str, str]] = [
+    {"title": "ACC/AHA High Blood Pressure Guideline", "url": "https://www.ahajournals.org/doi/10.1161/HYP.0000000000000065",
+     "text": "hypertension blood pressure stage 1 130-139/80-89 stage 2 140/90 lifestyle changes sodium "
+             "DASH diet medication thiazide ACE inhibitor ARB calcium channel blocker home monitoring"},
+    {"title": "ADA Standards of Care in Diabetes", "url": "https://diabetesjournals.org/care/issue/47/Supplement_1",
+     "text": "diabetes type 2 glucose hba1c target below 7% metformin SGLT2 GLP-1 hypoglycemia foot exam "
+             "eye exam kidney screening self-monitoring"},
+    {"title": "ACC/AHA Blood Cholesterol Guideline", "url": "https://www.ahajournals.org/doi/10.1161/CIR.0000000000000625",
+     "text": "cholesterol ldl hyperlipidemia statin therapy cardiovascular risk lipid panel diet exercise"},
+    {"title": "KDIGO Chronic Kidney Disease Guideline", "url": "https://kdigo.org/guidelines/ckd-evaluation-and-management/",
+     "text": "chronic kidney disease ckd creatinine egfr albuminuria blood pressure sglt2 nephrotoxic nsaids"},
+    {"title": "GINA Asthma Management", "url": "https://ginasthma.org/reports/",
+     "text": "asthma inhaler albuterol inhaled corticosteroid action plan triggers peak flow exacerbation"},
+    {"title": "GOLD COPD Report", "url": "https://goldcopd.org/",
+     "text": "copd chronic obstructive pulmonary disease bronchodilator smoking cessation pulmonary "
+             "rehabilitation oxygen saturation exacerbation vaccination"},
+    {"title": "ACC/AHA Atrial Fibrillation Guideline", "url": "https://www.ahajournals.org/doi/10.1161/CIR.0000000000001193",
+     "text": "atrial fibrillation heart rate anticoagulation apixaban stroke risk rhythm control"},
+    {"title": "ACC/AHA Heart Failure Guideline", "url": "https://www.ahajournals.org/doi/10.1161/CIR.0000000000001063",
+     "text": "heart failure furosemide diuretic weight monitoring fluid sodium restriction ejection fraction"},
+    {"title": "Care Coordination and Chronic Care Management", "url": "https://www.ahrq.gov/ncepcr/care/coordination.html",
+     "text": "care plan care coordination follow-up appointment scheduling medication reconciliation "
+             "reminders emergency action plan patient education"},
+]
+
+
+class LocalSearchBackend:
+    """Offline stand-in that ranks a fixed corpus by shared query terms.
+
+    Counts calls so tests can check how many backend round-trips were made.
+    """
+
+    def __init__(self, documents: Optional[List[Dict[str, str]]] = None, max_results: int = 3):
+        self.documents = LOCAL_GUIDELINES if documents is None else documents
+        self.max_results = max_results
+        self.calls = 0
+        self._terms = [set(normalize_query(f"{doc['title']} {doc['text']}").split()) for doc in self.documents]
+
+    async def search(self, query: str) -> SearchResult:
+        self.calls += 1
+        terms = set(normalize_query(query).split())
+        ranked = sorted(
+            ((len(terms & doc_terms), i) for i, doc_terms in enumerate(self._terms) if terms & doc_terms),
+            key=lambda match: (-match[0], match[1]),
+        )[:self.max_results]
+        matches = [self.documents[i] for _, i in ranked]
+        return {
+            "summary": "\n".join(f"{doc['title']}: {doc['text']}" for doc in matches)
+                       or "No matching guidelines found.",
+            "sources": [{"title": doc["title"], "url": doc["url"]} for doc in matches],
+        }
+
+
+class SearchCache:
+    """Persistent, TTL- and size-bounded cache in front of a search backend.
+
+    Results live in the search_cache table under the normalized query, so
+    they survive restarts and are shared by every agent and retry.
+    Concurrent misses for the same query share a single backend call.
+    Counters are kept overall and per invocation, so each report can say
+    how many network round-trips the cache saved.
+    """
+
+    def __init__(self, database: AsyncHealthDatabase, backend, ttl_seconds: float = 7 * 86400,
+                 max_entries: int = 10000, max_tracked_invocations: int = 1000):
+        self.async_db = database
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_tracked_invocations = max_tracked_invocations
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._invocations: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    async def search(self, query: str, invocation_id: Optional[str] = None) -> SearchResult:
+        """Return results for `query`, calling the backend only on a miss."""
+        key = normalize_query(query) or query.strip().casefold()
+        results = await self.async_db.get_search_result(key, self.ttl_seconds)
+        if results is not None:
+            self._count(invocation_id, hit=True)
+            return results
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self._count(invocation_id, hit=True)
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            self._count(invocation_id, hit=False)
+            results = await self.backend.search(query)
+            await self.async_db.store_search_result(key, query, results, self.max_entries)
+            future.set_result(results)
+            return results
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        finally:
+            del self._inflight[key]
+
+    def report(self, invocation_id: str) -> Dict[str, int]:
+        """Searches, network round-trips and round-trips saved for one invocation."""
+        with self._lock:
+            counts = self._invocations.get(invocation_id, {"hits": 0, "misses": 0})
+            return {
+                "searches": counts["hits"] + counts["misses"],
+                "network_round_trips": counts["misses"],
+                "round_trips_saved": counts["hits"],
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return overall hit/miss counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def _count(self, invocation_id: Optional[str], hit: bool) -> None:
+        field = "hits" if hit else "misses"
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if invocation_id is None:
+                return
+            counts = self._invocations.get(invocation_id)
+            if counts is None:
+                counts = self._invocations[invocation_id] = {"hits": 0, "misses": 0}
+                while len(self._invocations) > self.max_tracked_invocations:
+                    self._invocations.popitem(last=False)
+            counts[field] += 1
+
+
+def _make_backend(name: str):
+    if name == SEARCH_BACKEND_LOCAL:
+        return LocalSearchBackend()
+    if name == SEARCH_BACKEND_GEMINI:
+        from .model_replay import resolve_search_backend
+
+        return resolve_search_backend(GeminiSearchBackend(config.worker_model), config.worker_model)
+    raise ValueError(f"Unknown search backend: {name}")
+
+
+# Global search cache used by the cached_google_search tool
+search_cache = SearchCache(
+    async_db,
+    _make_backend(config.search_backend),
+    ttl_seconds=config.search_cache_ttl_seconds,
+    max_entries=config.search_cache_max_entries,
+)
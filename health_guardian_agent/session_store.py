@@ -12,132 +12,321 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sqlite3
 import json
-from typing import Dict, Any, List, Optional
-from google.adk import Session, SessionService
-from .database import db
+import uuid
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session, State
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from .async_database import AsyncHealthDatabase, async_db
+from .config import config
+from .database import HealthDatabase, db
+from .prompt_encoding import estimate_tokens
 
+# State keys rebuilt from the conversations table on every load, never persisted
+HISTORY_STATE_KEYS = ("conversation_history", "conversation_history_cursor", "conversation_history_has_more")
 
-class PersistentSessionService(SessionService):
-    """A session service that persists conversations to SQLite database."""
+# State key carrying the stored version a session was loaded at; temporary, so never persisted
+SESSION_VERSION_KEY = State.TEMP_PREFIX + "session_version"
 
-    def __init__(self):
-        # Ensure conversations table exists
-        with sqlite3.connect(db.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    patient_id TEXT,
-                    session_id TEXT,
-                    message_type TEXT,
-                    message_content TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (patient_id) REFERENCES patients (patient_id)
-                )
-            """)
-
-    async def create_session(self, app_name: str, user_id: str, session_id: str) -> Session:
-        """Create a new session."""
+MESSAGE_ROLES = {"user": "user", "agent": "assistant"}
+
+
+def build_history_page(rows: List[tuple], limit: int, token_budget: int) -> Dict[str, Any]:
+    """Turn newest-first conversation rows into a chronological history page.
+
+    `rows` may hold one row more than `limit` to signal that older messages
+    exist. Messages are kept newest first until `limit` or `token_budget` is
+    reached; the newest message is always kept.
+    """
+    messages = []
+    used_tokens = 0
+    kept = 0
+    oldest = None
+    for row_id, msg_type, content, timestamp in rows[:limit]:
+        cost = estimate_tokens(content)
+        if kept and used_tokens + cost > token_budget:
+            break
+        used_tokens += cost
+        kept += 1
+        oldest = [timestamp, row_id]
+        if msg_type in MESSAGE_ROLES:
+            messages.append({
+                'role': MESSAGE_ROLES[msg_type],
+                'content': content,
+                'timestamp': timestamp
+            })
+    messages.reverse()
+    has_more = len(rows) > kept
+    return {"messages": messages, "cursor": oldest if has_more else None, "has_more": has_more}
+
+
+def _serialize(state: Dict[str, Any]) -> Dict[str, str]:
+    """JSON-encode the state keys that are stored; history and temporary keys are not."""
+    return {
+        key: json.dumps(value)
+        for key, value in state.items()
+        if key not in HISTORY_STATE_KEYS and not key.startswith(State.TEMP_PREFIX)
+    }
+
+
+def _event_text(event: Event) -> str:
+    """The text parts of an event, without model thoughts."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text and not part.thought)
+
+
+class StaleSessionError(Exception):
+    """Raised when a session was saved by another writer since it was loaded."""
+
+
+class PersistentSessionService(BaseSessionService):
+    """A session service that persists conversations to SQLite database.
+
+    All storage calls run on the async database executor, so a slow disk
+    write never blocks the event loop serving other conversations. Sessions
+    load only a recent window of conversation history; older turns are
+    paged in on demand with `load_history`.
+
+    State is stored one row per key. The ADK Runner persists state through
+    `append_event`, which writes the keys in each event's state delta;
+    `save_session` writes whatever differs from the stored state. Every
+    write bumps a version number, carried on the session in its
+    SESSION_VERSION_KEY state entry, and a write based on an outdated
+    version raises StaleSessionError.
+    """
+
+    def __init__(
+        self,
+        database: Optional[HealthDatabase] = None,
+        history_window_messages: Optional[int] = None,
+        history_token_budget: Optional[int] = None,
+    ):
+        self.db = database or db
+        self.async_db = AsyncHealthDatabase(self.db) if database else async_db
+        self.history_window_messages = history_window_messages or config.history_window_messages
+        self.history_token_budget = history_token_budget or config.history_token_budget
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        """Create a new session, storing its initial state."""
+        session_id = session_id or str(uuid.uuid4())
         # Try to get existing session state from database
-        state = self._get_session_state(app_name, user_id, session_id)
+        stored_state = await self._load_state(app_name, user_id, session_id)
         session = Session(
             app_name=app_name,
             user_id=user_id,
-            session_id=session_id,
-            state=state or {}
+            id=session_id,
+            state={**stored_state, **(state or {})}
         )
+        if state:
+            await self._persist(session, _serialize(state), [])
         return session
 
-    async def get_session(self, app_name: str, user_id: str, session_id: str) -> Optional[Session]:
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
         """Retrieve a session and its conversation history."""
         # Load session state from database
-        state = self._get_session_state(app_name, user_id, session_id) or {}
-
-        # Load conversation history from database
-        conversation_history = db.get_conversation_history(user_id, session_id)
-
-        # Convert to the format expected by ADK
-        messages = []
-        for msg_type, content, timestamp in conversation_history:
-            if msg_type == 'user':
-                messages.append({
-                    'role': 'user',
-                    'content': content,
-                    'timestamp': timestamp
-                })
-            elif msg_type == 'agent':
-                messages.append({
-                    'role': 'assistant',
-                    'content': content,
-                    'timestamp': timestamp
-                })
+        state = await self._load_state(app_name, user_id, session_id)
+
+        # Load only the most recent window of conversation history
+        page = await self.load_history(user_id, session_id)
 
         # Merge conversation history into state
-        state['conversation_history'] = messages
+        state['conversation_history'] = page['messages']
+        state['conversation_history_cursor'] = page['cursor']
+        state['conversation_history_has_more'] = page['has_more']
 
         session = Session(
             app_name=app_name,
             user_id=user_id,
-            session_id=session_id,
+            id=session_id,
             state=state
         )
         return session
 
+    async def load_history(
+        self,
+        user_id: str,
+        session_id: str,
+        before: Optional[Sequence[Any]] = None,
+        limit: Optional[int] = None,
+        token_budget: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Load one window of conversation history, older than `before`.
+
+        Pass the returned cursor back as `before` to fetch the next older page.
+        """
+        limit = limit or self.history_window_messages
+        token_budget = token_budget or self.history_token_budget
+        rows = await self.async_db.get_conversation_page(
+            user_id, session_id, limit + 1, tuple(before) if before else None
+        )
+        return build_history_page(rows, limit, token_budget)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        """Apply an event to the session and persist its state delta.
+
+        User messages and final agent replies are also stored as
+        conversation turns, so Runner-driven sessions keep their history.
+
+        Raises:
+            StaleSessionError: Another writer saved this session since it was loaded.
+        """
+        event = await super().append_event(session=session, event=event)
+        if event.partial:
+            return event
+        session.last_update_time = event.timestamp
+        if event.actions and event.actions.state_delta:
+            await self._persist(session, _serialize(event.actions.state_delta), [])
+        text = _event_text(event)
+        if text and (event.author == "user" or event.is_final_response()):
+            message_type = "user" if event.author == "user" else "agent"
+            await self.store_message(session.user_id, session.id, message_type, text)
+        return event
+
     async def save_session(self, session: Session) -> None:
-        """Save session data (conversation history) to database."""
-        # Save session state
-        self._save_session_state(session.app_name, session.user_id, session.session_id, session.state)
+        """Persist the state keys that differ from the stored state.
+
+        Raises:
+            StaleSessionError: Another writer saved this session since it was loaded.
+        """
+        # Serialize on the loop so the state cannot change under the writer
+        # thread; the writer compares against the stored values
+        await self._persist(session, _serialize(session.state), None)
         # Messages are saved as they're added
 
-    async def delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
         """Delete a session."""
         # Optional: implement if needed
         pass
 
-    async def list_sessions(self, app_name: str, user_id: str) -> List[str]:
-        """List all session IDs for a user."""
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        """List all sessions for a user."""
+        session_ids = await self.async_db.run(self._list_session_ids, user_id)
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=user_id, id=session_id)
+            for session_id in session_ids
+        ])
+
+    def _list_session_ids(self, user_id: str) -> List[str]:
+        """List all session IDs with stored conversations for a user."""
         try:
-            with sqlite3.connect(db.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT DISTINCT session_id
-                    FROM conversations
-                    WHERE patient_id = ?
-                """, (user_id,))
-                return [row[0] for row in cursor.fetchall()]
+            self.db.flush_conversations()
+            conn = self.db.connection()
+            cursor = conn.execute("""
+                SELECT DISTINCT session_id
+                FROM conversations
+                WHERE patient_id = ?
+            """, (user_id,))
+            return [row[0] for row in cursor.fetchall()]
         except Exception:
             return []
 
-    def _get_session_state(self, app_name: str, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session state from database."""
-        try:
-            with sqlite3.connect(db.db_path) as conn:
-                cursor = conn.execute("""
-                    SELECT state FROM sessions
-                    WHERE app_name = ? AND user_id = ? AND id = ?
-                """, (app_name, user_id, session_id))
-                row = cursor.fetchone()
-                if row and row[0]:
-                    return json.loads(row[0])
-        except Exception:
-            pass
-        return None
+    async def _load_state(self, app_name: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        """Load stored state, with its version under SESSION_VERSION_KEY."""
+        version, state = await self.async_db.run(self._get_session_state, app_name, user_id, session_id)
+        state[SESSION_VERSION_KEY] = version
+        return state
 
-    def _save_session_state(self, app_name: str, user_id: str, session_id: str, state: Dict[str, Any]) -> None:
-        """Save session state to database."""
+    async def _persist(self, session: Session, changed: Dict[str, str], removed: Optional[List[str]]) -> None:
+        """Write a state delta based on the session's version and carry the new version."""
         try:
-            with sqlite3.connect(db.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time)
-                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-                    ON CONFLICT(app_name, user_id, id) DO UPDATE SET
-                        state = EXCLUDED.state,
-                        update_time = CURRENT_TIMESTAMP
-                """, (app_name, user_id, session_id, json.dumps(state)))
-                conn.commit()
+            version = await self.async_db.run(
+                self._save_state_delta, session.app_name, session.user_id, session.id,
+                session.state.get(SESSION_VERSION_KEY), changed, removed,
+            )
+        except StaleSessionError:
+            raise
         except Exception as e:
             print(f"Error saving session state: {e}")
+            return
+        session.state[SESSION_VERSION_KEY] = version
+
+    def _get_session_state(self, app_name: str, user_id: str, session_id: str) -> Tuple[int, Dict[str, Any]]:
+        """Get the stored version and state of a session from database."""
+        state = {}
+        try:
+            conn = self.db.connection()
+            row = conn.execute("""
+                SELECT version FROM sessions
+                WHERE app_name = ? AND user_id = ? AND id = ?
+            """, (app_name, user_id, session_id)).fetchone()
+            if not row:
+                return 0, state
+            cursor = conn.execute("""
+                SELECT key, value_json FROM session_state
+                WHERE app_name = ? AND user_id = ? AND session_id = ?
+            """, (app_name, user_id, session_id))
+            for key, value_json in cursor:
+                state[key] = json.loads(value_json)
+            return row[0], state
+        except Exception as e:
+            print(f"Error loading session state: {e}")
+            return 0, {}
+
+    def _save_state_delta(self, app_name: str, user_id: str, session_id: str, expected_version: Optional[int],
+                          changed: Dict[str, str], removed: Optional[List[str]]) -> int:
+        """Write changed and removed state keys and bump the session version.
+
+        `removed` None means `changed` is the complete state: unchanged keys
+        are skipped and stored keys missing from it are removed. Returns the
+        session's version after the write. `expected_version` is the version
+        the caller loaded; None skips the check and overwrites unconditionally.
+        """
+        with self.db.transaction() as conn:
+            row = conn.execute("""
+                SELECT version FROM sessions
+                WHERE app_name = ? AND user_id = ? AND id = ?
+            """, (app_name, user_id, session_id)).fetchone()
+            version = row[0] if row else 0
+            if removed is None:
+                stored = dict(conn.execute("""
+                    SELECT key, value_json FROM session_state
+                    WHERE app_name = ? AND user_id = ? AND session_id = ?
+                """, (app_name, user_id, session_id)).fetchall())
+                removed = [key for key in stored if key not in changed]
+                changed = {key: value_json for key, value_json in changed.items() if stored.get(key) != value_json}
+            if not changed and not removed:
+                return version
+            if expected_version is not None and expected_version != version:
+                raise StaleSessionError(f"Session {session_id} was modified by another writer")
+
+            new_version = version + 1
+            conn.execute("""
+                INSERT INTO sessions (app_name, user_id, id, version, create_time, update_time)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                ON CONFLICT(app_name, user_id, id) DO UPDATE SET
+                    version = EXCLUDED.version,
+                    update_time = EXCLUDED.update_time
+            """, (app_name, user_id, session_id, new_version))
+            conn.executemany("""
+                INSERT INTO session_state (app_name, user_id, session_id, key, value_json, version)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(app_name, user_id, session_id, key) DO UPDATE SET
+                    value_json = EXCLUDED.value_json,
+                    version = EXCLUDED.version
+            """, [(app_name, user_id, session_id, key, value_json, new_version)
+                  for key, value_json in changed.items()])
+            conn.executemany("""
+                DELETE FROM session_state
+                WHERE app_name = ? AND user_id = ? AND session_id = ? AND key = ?
+            """, [(app_name, user_id, session_id, key) for key in removed])
+            return new_version
 
-    def store_message(self, patient_id: str, session_id: str, message_type: str, content: str) -> None:
+    async def store_message(self, patient_id: str, session_id: str, message_type: str, content: str) -> None:
         """Store a conversation message."""
-        db.store_conversation_message(patient_id, session_id, message_type, content)
\ No newline at end of file
+        await self.async_db.store_conversation_message(patient_id, session_id, message_type, content)
\ No newline at end of file
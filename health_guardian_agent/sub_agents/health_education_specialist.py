@@ -12,39 +12,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import Agent, LoopAgent
-from google.adk.tools import google_search
+from google.adk.agents import Agent
 
 from ..config import config
+from ..model_replay import resolve_model
 from ..agent_utils import suppress_output_callback
+from ..result_cache import result_cache
+from ..retry import RetryLoopAgent
+from ..tools import cached_google_search
 from ..validation_checkers import EducationContentValidationChecker
 
 health_education_specialist = Agent(
-    model=config.worker_model,
+    model=resolve_model(config.worker_model),
     name="health_education_specialist",
     description="Creates personalized health education content.",
     instruction="""
     You are a health education specialist. Your job is to create personalized educational content.
-    The health data summary and risk assessment will be available in the state keys.
+    The health data summary and risk assessment will be available in the `health_data_summary`
+    and `risk_assessment` state keys.
     Create educational materials that help patients understand their conditions and management.
     Include information about their specific conditions, medications, lifestyle modifications, and warning signs.
     Make the content patient-friendly, using simple language and clear explanations.
     Include actionable tips and when to seek medical attention.
     Your output should be comprehensive educational content in readable format.
-    Use Google Search for current health education resources and guidelines.
+    Use the cached_google_search tool to look up current health education resources and guidelines.
+
+    Health data summary:
+    {health_data_summary?}
+
+    Risk assessment:
+    {risk_assessment?}
     """,
-    tools=[google_search],
+    tools=[cached_google_search],
     output_key="education_content",
     after_agent_callback=suppress_output_callback,
 )
+result_cache.attach(health_education_specialist, inputs=["health_data_summary", "risk_assessment"])
 
-robust_health_education_specialist = LoopAgent(
+robust_health_education_specialist = RetryLoopAgent(
     name="robust_health_education_specialist",
-    description="A robust health education specialist that retries if it fails.",
+    description="A robust health education specialist that retries within the request's retry budget.",
     sub_agents=[
         health_education_specialist,
         EducationContentValidationChecker(name="education_content_validation_checker"),
     ],
-    max_iterations=3,
     after_agent_callback=suppress_output_callback,
 )
\ No newline at end of file
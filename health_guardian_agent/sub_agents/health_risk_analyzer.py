@@ -12,15 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import Agent, LoopAgent
-from google.adk.tools import google_search
+from google.adk.agents import Agent
 
 from ..config import config
+from ..model_replay import resolve_model
 from ..agent_utils import suppress_output_callback
+from ..result_cache import result_cache
+from ..retry import RetryLoopAgent
+from ..tools import cached_google_search
 from ..validation_checkers import RiskAssessmentValidationChecker
 
 health_risk_analyzer = Agent(
-    model=config.worker_model,
+    model=resolve_model(config.worker_model),
     name="health_risk_analyzer",
     description="Analyzes health risks and predicts potential complications.",
     instruction="""
@@ -31,20 +34,23 @@ health_risk_analyzer = Agent(
     Use medical knowledge to predict potential complications or adverse events.
     Provide a risk assessment with severity levels and recommended monitoring.
     Your output should be a structured risk assessment report.
-    Use Google Search for current medical guidelines and risk factors.
+    Use the cached_google_search tool to look up current medical guidelines and risk factors.
+
+    Health data summary:
+    {health_data_summary?}
     """,
-    tools=[google_search],
+    tools=[cached_google_search],
     output_key="risk_assessment",
     after_agent_callback=suppress_output_callback,
 )
+result_cache.attach(health_risk_analyzer, inputs=["health_data_summary"])
 
-robust_health_risk_analyzer = LoopAgent(
+robust_health_risk_analyzer = RetryLoopAgent(
     name="robust_health_risk_analyzer",
-    description="A robust health risk analyzer that retries if it fails.",
+    description="A robust health risk analyzer that retries within the request's retry budget.",
     sub_agents=[
         health_risk_analyzer,
         RiskAssessmentValidationChecker(name="risk_assessment_validation_checker"),
     ],
-    max_iterations=3,
     after_agent_callback=suppress_output_callback,
 )
\ No newline at end of file
@@ -12,15 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import Agent, LoopAgent
-from google.adk.tools import google_search
+from google.adk.agents import Agent
 
 from ..config import config
+from ..model_replay import resolve_model
 from ..agent_utils import suppress_output_callback
+from ..result_cache import result_cache
+from ..retry import RetryLoopAgent
+from ..tools import cached_google_search
 from ..validation_checkers import CarePlanValidationChecker
 
 treatment_planner = Agent(
-    model=config.worker_model,
+    model=resolve_model(config.worker_model),
     name="treatment_planner",
     description="Develops personalized care plans and coordinates treatment.",
     instruction="""
@@ -35,20 +38,26 @@ treatment_planner = Agent(
     Coordinate with healthcare providers and suggest appointment scheduling.
     Ensure the plan is realistic and patient-centered.
     Your output should be a detailed care plan in structured format.
-    Use Google Search for care coordination best practices and guidelines.
+    Use the cached_google_search tool to look up care coordination best practices and guidelines.
+
+    Health data summary:
+    {health_data_summary?}
+
+    Risk assessment:
+    {risk_assessment?}
     """,
-    tools=[google_search],
+    tools=[cached_google_search],
     output_key="care_plan",
     after_agent_callback=suppress_output_callback,
 )
+result_cache.attach(treatment_planner, inputs=["health_data_summary", "risk_assessment"])
 
-robust_treatment_planner = LoopAgent(
+robust_treatment_planner = RetryLoopAgent(
     name="robust_treatment_planner",
-    description="A robust treatment planner that retries if it fails.",
+    description="A robust treatment planner that retries within the request's retry budget.",
     sub_agents=[
         treatment_planner,
         CarePlanValidationChecker(name="care_plan_validation_checker"),
     ],
-    max_iterations=3,
     after_agent_callback=suppress_output_callback,
 )
\ No newline at end of file
@@ -12,37 +12,42 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from google.adk.agents import Agent, LoopAgent
+from google.adk.agents import Agent
 
 from ..config import config
+from ..model_replay import resolve_model
 from ..agent_utils import suppress_output_callback
-from ..tools import fetch_health_data
+from ..result_cache import result_cache
+from ..retry import RetryLoopAgent
+from ..tools import analyze_health_trends, fetch_health_data
 from ..validation_checkers import HealthDataValidationChecker
 
 vital_signs_monitor = Agent(
-    model=config.worker_model,
+    model=resolve_model(config.worker_model),
     name="vital_signs_monitor",
     description="Monitors and analyzes patient vital signs and health data.",
     instruction="""
     You are a health data analyst. Your job is to analyze patient vital signs and health data.
     The health data will be available in the `health_data` state key from the fetch_health_data tool.
     Analyze the vital signs, lab results, medications, and conditions.
+    Call the analyze_health_trends tool to get precomputed trends over the patient's full history
+    (rolling means, slopes, variability and out-of-range counts) instead of inferring trends yourself.
     Provide a summary of the patient's current health status, including any concerning trends.
     Focus on key metrics like blood pressure, heart rate, glucose levels, etc.
     Your output should be a clear summary in structured format.
     """,
-    tools=[fetch_health_data],
+    tools=[fetch_health_data, analyze_health_trends],
     output_key="health_data_summary",
     after_agent_callback=suppress_output_callback,
 )
+result_cache.attach(vital_signs_monitor)
 
-robust_vital_signs_monitor = LoopAgent(
+robust_vital_signs_monitor = RetryLoopAgent(
     name="robust_vital_signs_monitor",
-    description="A robust vital signs monitor that retries if it fails.",
+    description="A robust vital signs monitor that retries within the request's retry budget.",
     sub_agents=[
         vital_signs_monitor,
         HealthDataValidationChecker(name="health_data_validation_checker"),
     ],
-    max_iterations=3,
     after_agent_callback=suppress_output_callback,
 )
\ No newline at end of file
@@ -12,131 +12,208 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import json
+import asyncio
+import hashlib
 import os
-import sqlite3
 from typing import Dict, Any, Optional, Union
 
-from .database import db
+from google.adk.tools import ToolContext
 
+from .async_database import async_db
+from .config import config
+from .database import LOOKUP_CACHE_TAG, db, patient_cache_tag
+from .patient_matching import identified_patient, name_key, phone_key
+from .prompt_encoding import encode_health_data
+from .reports import write_chunks
+from .result_cache import HEALTH_DATA_FINGERPRINT_KEY, PATIENT_ID_KEY
+from .search_cache import search_cache
+from .session_store import build_history_page
+from .trends import analyze_patient_trends
 
-def save_health_report_to_file(health_report: str, filename: str) -> dict:
+
+async def save_health_report_to_file(health_report: str, filename: str) -> dict:
     """Saves the health report to a file."""
-    with open(filename, "w") as f:
-        f.write(health_report)
+    await asyncio.to_thread(write_chunks, filename, (health_report,))
     return {"status": "success"}
 
 
-def fetch_health_data(patient_id: str) -> dict:
+def _remember_patient(tool_context: Optional[ToolContext], patient_id: str,
+                      health_data: Optional[str] = None) -> None:
+    """Record the patient a tool resolved, and the health data it saw, in session state."""
+    if tool_context is None:
+        return
+    tool_context.state[PATIENT_ID_KEY] = patient_id
+    if health_data is not None:
+        fingerprint = hashlib.sha256(health_data.encode("utf-8")).hexdigest()
+        tool_context.state[HEALTH_DATA_FINGERPRINT_KEY] = fingerprint
+
+
+async def fetch_health_data(patient_id: str, tool_context: Optional[ToolContext] = None) -> dict:
     """Fetches health data for a patient from the database."""
+    # Serve repeated calls within a session straight from memory
+    database = await async_db.open()
+    key = ("health_data_json", patient_id)
+    cached = database.cache.get(key)
+    if cached is None:
+        cached = await async_db.run(
+            database.cache.load, key, lambda: _render_health_data(patient_id), (patient_cache_tag(patient_id),)
+        )
+    _remember_patient(tool_context, patient_id, cached["health_data"])
+    return cached
+
+
+def _render_health_data(patient_id: str) -> dict:
+    """Blocking implementation of fetch_health_data."""
     # Try to get data from database first
     stored_data = db.get_patient_data(patient_id)
 
     if stored_data:
-        # Return stored data
-        health_data = {
-            "patient_id": patient_id,
-            **stored_data
-        }
-        return {"health_data": json.dumps(health_data, indent=2)}
+        # Compact encoding, with older readings only if a budget is configured
+        history = None
+        if config.health_data_history_token_budget > 0:
+            history = db.get_patient_data_history(patient_id)
+        return {"health_data": encode_health_data(
+            patient_id, stored_data, history, config.health_data_history_token_budget
+        )}
     else:
         # No data found, ask user to provide medical images
         return {"health_data": "No health data found for this patient. Please upload images of your medical reports, lab results, or doctor's notes, and I'll analyze them to extract your health information."}
 
 
-def store_patient_info(patient_id: str, name: str, phone: str) -> dict:
+async def analyze_health_trends(patient_id: str, days: Optional[int] = None) -> dict:
+    """Summarizes trends across a patient's vital sign and lab history.
+
+    Covers the full history, or only the last `days` days when given.
+    Returns per-metric rolling means, slopes, variability and out-of-range
+    counts, plus short flags for anything rising, falling or out of range.
+    """
+    database = await async_db.open()
+    key = ("health_trends", patient_id, days)
+    cached = database.cache.get(key)
+    if cached is None:
+        cached = await async_db.run(
+            database.cache.load, key, lambda: analyze_patient_trends(db, patient_id, days=days),
+            (patient_cache_tag(patient_id),)
+        )
+    return cached
+
+
+async def fetch_earlier_conversation(tool_context: ToolContext) -> dict:
+    """Fetches earlier turns of this conversation that are not already in context."""
+    state = tool_context.state
+    cursor = state.get("conversation_history_cursor")
+    if not cursor:
+        return {"messages": [], "has_more": False}
+
+    session = tool_context.session
+    rows = await async_db.get_conversation_page(
+        session.user_id, session.id, config.history_window_messages + 1, tuple(cursor)
+    )
+    page = build_history_page(rows, config.history_window_messages, config.history_token_budget)
+    state["conversation_history_cursor"] = page["cursor"]
+    state["conversation_history_has_more"] = page["has_more"]
+    return {"messages": page["messages"], "has_more": page["has_more"]}
+
+
+async def search_patient_records(patient_id: str, query: str, limit: int = 5) -> dict:
+    """Searches the patient's past conversations and stored assessments and care plans.
+
+    Use this to recall something discussed or recommended before instead of
+    loading whole histories. Returns the best matching excerpts, with the
+    matched words in [brackets].
+    """
+    if not patient_id or not patient_id.strip():
+        return {"status": "error", "message": "A patient_id is required to search records"}
+    hits = await async_db.search_records(query, patient_id, limit=min(max(limit, 1), 20))
+    return {"results": hits, "count": len(hits)}
+
+
+async def cached_google_search(query: str, tool_context: ToolContext) -> dict:
+    """Searches Google for current medical guidelines and health information."""
+    # Repeated and reworded searches are answered from the local cache
+    results = await search_cache.search(query, tool_context.invocation_id)
+    tool_context.state["search_cache_report"] = search_cache.report(tool_context.invocation_id)
+    return results
+
+
+async def store_patient_info(patient_id: str, name: str, phone: str) -> dict:
     """Stores basic patient information."""
-    success = db.store_patient_info(patient_id, name, phone)
+    success = await async_db.store_patient_info(patient_id, name, phone)
     return {"status": "success" if success else "error"}
 
 
-def store_health_data(patient_id: str, data_type: str, data: Dict[str, Any]) -> dict:
+async def store_health_data(patient_id: str, data_type: str, data: Dict[str, Any]) -> dict:
     """Stores health data for a patient in the database."""
-    success = db.store_patient_data(patient_id, data_type, data)
+    success = await async_db.store_patient_data(patient_id, data_type, data)
     return {"status": "success" if success else "error"}
 
 
-def store_assessment(patient_id: str, assessment_type: str, content: str) -> dict:
+async def store_assessment(patient_id: str, assessment_type: str, content: str) -> dict:
     """Stores assessment results in the database."""
-    success = db.store_assessment(patient_id, assessment_type, content)
+    success = await async_db.store_assessment(patient_id, assessment_type, content)
     return {"status": "success" if success else "error"}
 
 
 
-def generate_patient_id() -> dict:
-    """Generate a unique patient ID in format PAT001, PAT002, etc."""
-    try:
-        with sqlite3.connect(db.db_path) as conn:
-            # Get all existing patient IDs
-            cursor = conn.execute("SELECT patient_id FROM patients")
-            existing_ids = [row[0] for row in cursor.fetchall()]
-
-            # Extract numbers from PATxxx format
-            numbers = []
-            for pid in existing_ids:
-                if pid.startswith('PAT') and len(pid) == 6:
-                    try:
-                        num = int(pid[3:])
-                        numbers.append(num)
-                    except ValueError:
-                        continue
-
-            # Find next available number
-            next_num = 1
-            if numbers:
-                next_num = max(numbers) + 1
-
-            # Format as PATxxx (3 digits)
-            patient_id = f"PAT{next_num:03d}"
-
-            return {"patient_id": patient_id}
-    except Exception as e:
-        print(f"Error generating patient ID: {e}")
-        return {"patient_id": "PAT001"}  # Fallback
+async def generate_patient_id(tool_context: Optional[ToolContext] = None) -> dict:
+    """Generate and reserve a unique patient ID in format PAT001, PAT002, etc."""
+    patient_id = await async_db.run(db.allocate_patient_id, "PAT", config.patient_id_width)
+    if patient_id is None:
+        return {"status": "error", "message": "Could not generate a patient ID"}
+    _remember_patient(tool_context, patient_id)
+    return {"patient_id": patient_id}
 
 
-def find_patient_by_name_or_phone(name: Optional[str] = None, phone: Optional[str] = None) -> dict:
-    """Find existing patient by name or phone number."""
+async def find_patient_by_name_or_phone(name: Optional[str] = None, phone: Optional[str] = None,
+                                        tool_context: Optional[ToolContext] = None) -> dict:
+    """Find existing patients by name and/or phone number.
+
+    Formatting, case and word order are ignored and similar-sounding names
+    are included. The patient is found only on an exact phone match, or an
+    exact name match when no phone is given. Every candidate is returned
+    with a 0-1 score; confirm any other candidate with the patient before
+    using its ID.
+    """
+    result = await async_db.run(_find_patient_by_name_or_phone, name, phone)
+    if result.get("found"):
+        _remember_patient(tool_context, result["patient_id"])
+    return result
+
+
+def _find_patient_by_name_or_phone(name: Optional[str] = None, phone: Optional[str] = None) -> dict:
+    """Blocking implementation of find_patient_by_name_or_phone."""
+    if not name and not phone:
+        return {"found": False, "message": "Please provide name or phone to search"}
     try:
-        with sqlite3.connect(db.db_path) as conn:
-            if name and phone:
-                cursor = conn.execute("""
-                    SELECT patient_id, name, phone
-                    FROM patients
-                    WHERE name = ? OR phone = ?
-                """, (name, phone))
-            elif name:
-                cursor = conn.execute("""
-                    SELECT patient_id, name, phone
-                    FROM patients
-                    WHERE name = ?
-                """, (name,))
-            elif phone:
-                cursor = conn.execute("""
-                    SELECT patient_id, name, phone
-                    FROM patients
-                    WHERE phone = ?
-                """, (phone,))
-            else:
-                return {"found": False, "message": "Please provide name or phone to search"}
-
-            rows = cursor.fetchall()
-            if rows:
-                # Return the first match
-                patient_id, found_name, found_phone = rows[0]
-                return {
-                    "found": True,
-                    "patient_id": patient_id,
-                    "name": found_name,
-                    "phone": found_phone
-                }
-            else:
-                return {"found": False, "message": "No patient found with the provided information"}
+        return db.cache.get_or_load(
+            ("patient_lookup", name_key(name), phone_key(phone)),
+            lambda: _query_patient_by_name_or_phone(name, phone),
+            tags=(LOOKUP_CACHE_TAG,),
+        )
     except Exception as e:
         print(f"Error searching for patient: {e}")
         return {"found": False, "message": "Error occurred while searching"}
 
 
+def _query_patient_by_name_or_phone(name: Optional[str], phone: Optional[str]) -> dict:
+    candidates = db.find_patients(name, phone, limit=5)
+    best = identified_patient(candidates, phone)
+    if best:
+        return {
+            "found": True,
+            "patient_id": best["patient_id"],
+            "name": best["name"],
+            "phone": best["phone"],
+            "score": best["score"],
+            "candidates": candidates,
+        }
+    if candidates:
+        return {
+            "found": False,
+            "message": "No exact match; ask the patient to confirm whether they are one of the candidates",
+            "candidates": candidates,
+        }
+    return {"found": False, "message": "No patient found with the provided information"}
 
 
 def validate_medical_content(content: str) -> dict:
@@ -0,0 +1,321 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import inspect
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.tools import BaseTool, ToolContext
+
+from .config import config
+
+# Span kinds
+SPAN_AGENT = "agent"
+SPAN_MODEL = "model"
+SPAN_TOOL = "tool"
+
+# Histogram bucket upper bounds, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Span = Dict[str, Any]
+
+
+def _as_list(callback: Any) -> list:
+    if callback is None:
+        return []
+    return list(callback) if isinstance(callback, list) else [callback]
+
+
+def _branch(callback_context: CallbackContext) -> str:
+    return callback_context._invocation_context.branch or ""
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Tracer:
+    """Records agent, model and tool spans from ADK callbacks.
+
+    Every finished span updates in-memory Prometheus counters and duration
+    histograms and, when `path` is set, is appended to a JSONL trace file.
+    Spans carry the invocation ID as trace ID, the agent and branch, the
+    iteration number for agents re-run by a loop or retry agent, token counts for
+    model calls, and status "ok", "error" or "cache_hit" (a before-model
+    callback such as the result cache answered without calling the model).
+
+    An exception raised inside an agent skips its after callbacks; whoever
+    catches it calls `fail()` to finish those spans as errors. A background
+    thread flushes the trace file every `flush_interval` seconds, and the
+    file is closed at interpreter exit.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_open_spans: int = 10000, flush_interval: float = 1.0):
+        self.path = path
+        self.max_open_spans = max_open_spans
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._file = None
+        self._closed: Optional[threading.Event] = None
+        self._open: "OrderedDict[tuple, Tuple[float, float]]" = OrderedDict()
+        self._iterations: "OrderedDict[tuple, int]" = OrderedDict()
+        self._counts: Dict[Tuple[str, str, str], int] = {}
+        self._histograms: Dict[Tuple[str, str], List[float]] = {}  # bucket counts, then sum and count
+        self._tokens: Dict[Tuple[str, str], int] = {}
+
+    def instrument(self, agent: BaseAgent) -> BaseAgent:
+        """Attach tracing callbacks to `agent` and every agent below it."""
+        self._attach_agent(agent)
+        if isinstance(agent, LlmAgent):
+            self._attach_model(agent)
+            self._attach_tools(agent)
+        for sub_agent in agent.sub_agents:
+            self.instrument(sub_agent)
+        return agent
+
+    # Callbacks
+
+    def _attach_agent(self, agent: BaseAgent) -> None:
+        def before_agent(callback_context: CallbackContext) -> None:
+            key = (callback_context.invocation_id, _branch(callback_context), agent.name)
+            with self._lock:
+                iteration = self._iterations.get(key, 0) + 1
+                self._remember(self._iterations, key, iteration)
+            self._start((SPAN_AGENT, *key))
+
+        def after_agent(callback_context: CallbackContext) -> None:
+            key = (callback_context.invocation_id, _branch(callback_context), agent.name)
+            self._finish(SPAN_AGENT, agent.name, callback_context, (SPAN_AGENT, *key),
+                         iteration=self._iterations.get(key, 1))
+
+        agent.before_agent_callback = [before_agent] + _as_list(agent.before_agent_callback)
+        agent.after_agent_callback = [after_agent] + _as_list(agent.after_agent_callback)
+
+    def _attach_model(self, agent: LlmAgent) -> None:
+        inner = _as_list(agent.before_model_callback)
+
+        async def before_model(callback_context: CallbackContext,
+                               llm_request: LlmRequest) -> Optional[LlmResponse]:
+            key = (SPAN_MODEL, callback_context.invocation_id, _branch(callback_context), agent.name)
+            self._start(key)
+            # Run the agent's own callbacks here so a short-circuit can be seen
+            for callback in inner:
+                response = callback(callback_context=callback_context, llm_request=llm_request)
+                if inspect.isawaitable(response):
+                    response = await response
+                if response is not None:
+                    status = "error" if response.error_code else "cache_hit"
+                    self._finish(SPAN_MODEL, agent.name, callback_context, key, status=status)
+                    return response
+            return None
+
+        def after_model(callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+            if llm_response.partial:
+                return None
+            key = (SPAN_MODEL, callback_context.invocation_id, _branch(callback_context), agent.name)
+            usage = llm_response.usage_metadata
+            self._finish(
+                SPAN_MODEL, agent.name, callback_context, key,
+                status="error" if llm_response.error_code else "ok",
+                prompt_tokens=usage.prompt_token_count if usage else None,
+                output_tokens=usage.candidates_token_count if usage else None,
+            )
+            return None
+
+        agent.before_model_callback = [before_model]
+        agent.after_model_callback = [after_model] + _as_list(agent.after_model_callback)
+
+    def _attach_tools(self, agent: LlmAgent) -> None:
+        def before_tool(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> None:
+            self._start((SPAN_TOOL, tool_context.invocation_id, tool_context.function_call_id))
+
+        def after_tool(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
+                       tool_response: Any) -> None:
+            status = "error" if isinstance(tool_response, dict) and tool_response.get("status") == "error" else "ok"
+            self._finish(SPAN_TOOL, tool.name, tool_context,
+                         (SPAN_TOOL, tool_context.invocation_id, tool_context.function_call_id), status=status)
+
+        def on_tool_error(tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext,
+                          error: Exception) -> None:
+            self._finish(SPAN_TOOL, tool.name, tool_context,
+                         (SPAN_TOOL, tool_context.invocation_id, tool_context.function_call_id),
+                         status="error", error=type(error).__name__)
+
+        agent.before_tool_callback = [before_tool] + _as_list(agent.before_tool_callback)
+        agent.after_tool_callback = [after_tool] + _as_list(agent.after_tool_callback)
+        agent.on_tool_error_callback = [on_tool_error] + _as_list(agent.on_tool_error_callback)
+
+    # Span bookkeeping
+
+    def _remember(self, table: OrderedDict, key: tuple, value: Any) -> None:
+        # Spans cut short by an exception never finish; keep the tables bounded
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_open_spans:
+            table.popitem(last=False)
+
+    def _start(self, key: tuple) -> None:
+        with self._lock:
+            self._remember(self._open, key, (time.time(), time.perf_counter()))
+
+    def _finish(self, kind: str, name: str, callback_context: CallbackContext, key: tuple,
+                status: str = "ok", **attributes: Any) -> None:
+        self._close(kind, name, callback_context.invocation_id, callback_context.agent_name,
+                    _branch(callback_context), key, status, **attributes)
+
+    def fail(self, invocation_id: str, agent_names: Iterable[str], error: BaseException) -> None:
+        """Finish the open agent and model spans of `agent_names` with status "error"."""
+        names = set(agent_names)
+        with self._lock:
+            keys = [key for key in self._open
+                    if key[0] in (SPAN_AGENT, SPAN_MODEL) and key[1] == invocation_id and key[3] in names]
+            iterations = {key: self._iterations.get(key[1:]) for key in keys if key[0] == SPAN_AGENT}
+        for key in keys:
+            kind, _, branch, name = key
+            self._close(kind, name, invocation_id, name, branch, key, "error",
+                        error=type(error).__name__, iteration=iterations.get(key))
+
+    def _close(self, kind: str, name: str, trace_id: str, agent: str, branch: str, key: tuple,
+               status: str, **attributes: Any) -> None:
+        with self._lock:
+            started = self._open.pop(key, None)
+        if started is None:
+            return
+        wall_start, perf_start = started
+        span: Span = {
+            "trace_id": trace_id,
+            "kind": kind,
+            "name": name,
+            "agent": agent,
+            "branch": branch or None,
+            "start": round(wall_start, 6),
+            "duration_ms": round((time.perf_counter() - perf_start) * 1000, 3),
+            "status": status,
+        }
+        span.update({key: value for key, value in attributes.items() if value is not None})
+        self.record(span)
+
+    def record(self, span: Span) -> None:
+        """Add a finished span to the metrics and the trace file."""
+        seconds = span["duration_ms"] / 1000
+        with self._lock:
+            count_key = (span["kind"], span["name"], span["status"])
+            self._counts[count_key] = self._counts.get(count_key, 0) + 1
+            histogram = self._histograms.setdefault((span["kind"], span["name"]), [0.0] * (len(DURATION_BUCKETS) + 2))
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+            histogram[-2] += seconds
+            histogram[-1] += 1
+            for direction in ("prompt", "output"):
+                tokens = span.get(f"{direction}_tokens")
+                if tokens:
+                    token_key = (span["name"], direction)
+                    self._tokens[token_key] = self._tokens.get(token_key, 0) + tokens
+            if self.path:
+                if self._file is None:
+                    self._open_file()
+                self._file.write(json.dumps(span) + "\n")
+
+    def _open_file(self) -> None:
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, args=(self._closed,),
+                         name="trace-flusher", daemon=True).start()
+        atexit.register(self.close)
+
+    def _flush_periodically(self, closed: threading.Event) -> None:
+        while not closed.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._closed.set()
+                atexit.unregister(self.close)
+
+    # Metrics
+
+    def render_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counts = sorted(self._counts.items())
+            histograms = sorted((key, list(values)) for key, values in self._histograms.items())
+            tokens = sorted(self._tokens.items())
+        lines = [
+            "# HELP health_guardian_spans_total Finished spans by kind, name and status.",
+            "# TYPE health_guardian_spans_total counter",
+        ]
+        for (kind, name, status), count in counts:
+            lines.append(f'health_guardian_spans_total{{kind="{kind}",name="{_label(name)}",status="{status}"}} {count}')
+        lines += [
+            "# HELP health_guardian_span_duration_seconds Span duration by kind and name.",
+            "# TYPE health_guardian_span_duration_seconds histogram",
+        ]
+        for (kind, name), values in histograms:
+            labels = f'kind="{kind}",name="{_label(name)}"'
+            for bound, count in zip(DURATION_BUCKETS, values):
+                lines.append(f'health_guardian_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count:g}')
+            lines.append(f'health_guardian_span_duration_seconds_bucket{{{labels},le="+Inf"}} {values[-1]:g}')
+            lines.append(f"health_guardian_span_duration_seconds_sum{{{labels}}} {values[-2]:.6f}")
+            lines.append(f"health_guardian_span_duration_seconds_count{{{labels}}} {values[-1]:g}")
+        lines += [
+            "# HELP health_guardian_model_tokens_total Model tokens by agent and direction.",
+            "# TYPE health_guardian_model_tokens_total counter",
+        ]
+        for (name, direction), count in tokens:
+            lines.append(f'health_guardian_model_tokens_total{{name="{_label(name)}",direction="{direction}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """Serve render_prometheus() at /metrics from a background thread."""
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+# Global tracer for the agent tree
+tracer = Tracer(config.trace_path or None)
@@ -0,0 +1,194 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Adult reference ranges (low, high); None means unbounded on that side
+REFERENCE_RANGES: Dict[str, Tuple[Optional[float], Optional[float]]] = {
+    "systolic": (90, 130),
+    "diastolic": (60, 85),
+    "heart_rate": (60, 100),
+    "respiratory_rate": (12, 20),
+    "temperature": (97.0, 99.5),
+    "oxygen_saturation": (95, None),
+    "glucose": (70, 140),
+    "hba1c": (None, 5.7),
+    "cholesterol": (None, 200),
+    "ldl": (None, 130),
+    "hdl": (40, None),
+    "triglycerides": (None, 150),
+    "hemoglobin": (12.0, 17.5),
+    "creatinine": (0.6, 1.3),
+}
+
+_SECONDS_PER_DAY = 86400.0
+
+
+def load_observation_arrays(database, patient_id: str, metrics: Optional[Iterable[str]] = None,
+                            since: Optional[str] = None,
+                            until: Optional[str] = None) -> Dict[str, Dict[str, np.ndarray]]:
+    """Read a patient's observations into NumPy arrays, one set per metric.
+
+    Each metric maps to {"times": datetime64[s], "values": float64,
+    "health_data_ids": int64}, oldest first. Only rows in the requested
+    window are read.
+    """
+    rows = database.get_observations(patient_id, list(metrics) if metrics else None, since, until)
+    grouped: Dict[str, List[tuple]] = {}
+    for metric, recorded_at, health_data_id, value, _ in rows:
+        grouped.setdefault(metric, []).append((recorded_at, health_data_id, value))
+    arrays = {}
+    for metric, readings in grouped.items():
+        stamps, ids, values = zip(*readings)
+        arrays[metric] = {
+            "times": np.array(stamps, dtype="datetime64[s]"),
+            "values": np.array(values, dtype=np.float64),
+            "health_data_ids": np.array(ids, dtype=np.int64),
+        }
+    return arrays
+
+
+def series_from_arrays(arrays: Dict[str, Dict[str, np.ndarray]]) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """Align per-metric arrays into the (times, names, values) form summarize_series takes.
+
+    Readings from the same health data record share a row.
+    """
+    names = sorted(arrays)
+    if not names:
+        return np.array([], dtype="datetime64[s]"), names, np.empty((0, 0))
+    ids = np.concatenate([arrays[name]["health_data_ids"] for name in names])
+    times = np.concatenate([arrays[name]["times"] for name in names])
+    record_ids, first, rows = np.unique(ids, return_index=True, return_inverse=True)
+    columns = np.repeat(np.arange(len(names)), [len(arrays[name]["values"]) for name in names])
+    values = np.full((len(record_ids), len(names)), np.nan)
+    values[rows, columns] = np.concatenate([arrays[name]["values"] for name in names])
+    record_times = times[first]
+    order = np.lexsort((record_ids, record_times))
+    return record_times[order], names, values[order]
+
+
+def summarize_series(times: np.ndarray, names: List[str], values: np.ndarray,
+                     window: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Compute per-metric statistics over the whole series in one pass.
+
+    For every metric: reading count, latest value, mean, standard deviation,
+    coefficient of variation, min/max, the mean of the last `window`
+    readings and of the `window` before them, the least-squares slope per
+    30 days, and how many readings fell below/above the reference range.
+    A trend is "rising" or "falling" when the fitted change across the
+    observed span exceeds one standard deviation, otherwise "stable".
+    """
+    if not names or not len(times):
+        return {}
+
+    present = ~np.isnan(values)
+    count = present.sum(axis=0)
+    filled = np.where(present, values, 0.0)
+    mean = filled.sum(axis=0) / count
+    deviation = np.where(present, values - mean, 0.0)
+    std = np.sqrt((deviation ** 2).sum(axis=0) / count)
+
+    # Least-squares slope against time, ignoring missing readings
+    days = (times - times[0]).astype(np.float64) / _SECONDS_PER_DAY
+    day_grid = np.where(present, days[:, None], 0.0)
+    mean_day = day_grid.sum(axis=0) / count
+    day_deviation = np.where(present, days[:, None] - mean_day, 0.0)
+    day_variance = (day_deviation ** 2).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where(day_variance > 0, (day_deviation * deviation).sum(axis=0) / day_variance, 0.0)
+    span = (np.where(present, days[:, None], -np.inf).max(axis=0)
+            - np.where(present, days[:, None], np.inf).min(axis=0))
+
+    # Rank readings from newest (1) to oldest to pick the rolling windows
+    rank = np.cumsum(present[::-1], axis=0)[::-1]
+    recent = present & (rank <= window)
+    previous = present & (rank > window) & (rank <= 2 * window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        recent_mean = np.where(recent, values, 0.0).sum(axis=0) / recent.sum(axis=0)
+        previous_mean = np.where(previous, values, 0.0).sum(axis=0) / previous.sum(axis=0)
+    latest = values[np.argmax(present & (rank == 1), axis=0), np.arange(len(names))]
+
+    low = np.array([_bound(name, 0, -np.inf) for name in names])
+    high = np.array([_bound(name, 1, np.inf) for name in names])
+    below = (present & (values < low)).sum(axis=0)
+    above = (present & (values > high)).sum(axis=0)
+
+    change = slope * span
+    direction = np.where(change > std, "rising", np.where(change < -std, "falling", "stable"))
+    direction = np.where((count < 3) | (std == 0), "stable", direction)
+
+    summary: Dict[str, Dict[str, Any]] = {}
+    for i, name in enumerate(names):
+        stats: Dict[str, Any] = {
+            "n": int(count[i]),
+            "latest": _round(latest[i]),
+            "mean": _round(mean[i]),
+            "std": _round(std[i]),
+            "cv": _round(std[i] / abs(mean[i])) if mean[i] else None,
+            "min": _round(np.nanmin(values[:, i])),
+            "max": _round(np.nanmax(values[:, i])),
+            "rolling_mean": _round(recent_mean[i]),
+            "previous_rolling_mean": _round(previous_mean[i]),
+            "slope_per_30d": _round(slope[i] * 30),
+            "trend": str(direction[i]),
+        }
+        if name in REFERENCE_RANGES:
+            stats["reference_range"] = list(REFERENCE_RANGES[name])
+            stats["below_range"] = int(below[i])
+            stats["above_range"] = int(above[i])
+        summary[name] = stats
+    return summary
+
+
+def analyze_patient_trends(database, patient_id: str, window: int = 5,
+                           days: Optional[int] = None) -> Dict[str, Any]:
+    """Summarize a patient's vitals and labs, over the last `days` days if given."""
+    since = None
+    if days is not None:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+        since = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+    times, names, values = series_from_arrays(load_observation_arrays(database, patient_id, since=since))
+    metrics = summarize_series(times, names, values, window)
+    if not metrics:
+        return {"patient_id": patient_id, "readings": 0, "metrics": {}, "flags": []}
+
+    flags = []
+    for name, stats in metrics.items():
+        if stats["trend"] != "stable":
+            flags.append(f"{name} {stats['trend']} ({stats['slope_per_30d']:+g} per 30 days)")
+        out_of_range = stats.get("below_range", 0) + stats.get("above_range", 0)
+        if out_of_range:
+            flags.append(f"{name} out of range in {out_of_range} of {stats['n']} readings")
+    return {
+        "patient_id": patient_id,
+        "readings": len(times),
+        "first_recorded": str(times[0]).replace("T", " "),
+        "last_recorded": str(times[-1]).replace("T", " "),
+        "metrics": metrics,
+        "flags": flags,
+    }
+
+
+def _bound(name: str, side: int, default: float) -> float:
+    value = REFERENCE_RANGES.get(name, (None, None))[side]
+    return default if value is None else value
+
+
+def _round(value: float) -> Optional[float]:
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 2)
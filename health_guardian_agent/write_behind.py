@@ -0,0 +1,180 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import atexit
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .connection_pool import ConnectionPool
+
+# Durability modes for conversation messages
+DURABILITY_SYNC = "sync"  # commit every message before returning
+DURABILITY_BATCHED = "batched"  # acknowledge on enqueue, group-commit in the background writer
+
+ConversationRow = Tuple[str, str, str, str]
+
+
+class ConversationWriter:
+    """Background thread that group-commits conversation message inserts.
+
+    Messages are buffered in a queue and written with one executemany per
+    transaction once `batch_size` rows are waiting or `flush_interval`
+    seconds have passed since the first buffered row, turning one fsync per
+    chat turn into one per batch. `flush()` blocks until everything queued
+    before it is committed, and the writer flushes itself at interpreter exit.
+
+    A batch that fails is retried up to `max_attempts` times and then
+    dropped; dropped rows are counted in `stats()` and make the next
+    `flush()` return False.
+    """
+
+    def __init__(self, pool: ConnectionPool, batch_size: int = 256, flush_interval: float = 0.05,
+                 max_attempts: int = 3):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.batches_written = 0
+        self.messages_written = 0
+        self.batches_dropped = 0
+        self.messages_dropped = 0
+        self.last_error: Optional[str] = None
+        self._unreported_drops = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread on first use."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="conversation-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def enqueue(self, row: ConversationRow) -> None:
+        """Queue a (patient_id, session_id, message_type, content) row."""
+        self._ensure_started()
+        self._queue.put(row)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every row queued before this call is committed.
+
+        Returns False on timeout, or if rows were dropped since the previous
+        flush because their batch kept failing.
+        """
+        if self._thread is not None:
+            marker = threading.Event()
+            self._queue.put(marker)
+            if not marker.wait(timeout):
+                return False
+        with self._lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        return dropped == 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return written and dropped batch and message counters."""
+        with self._lock:
+            return {
+                "batches_written": self.batches_written,
+                "messages_written": self.messages_written,
+                "batches_dropped": self.batches_dropped,
+                "messages_dropped": self.messages_dropped,
+                "last_error": self.last_error,
+            }
+
+    def close(self) -> None:
+        """Flush pending rows and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            rows: List[ConversationRow] = []
+            markers: List[threading.Event] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    rows.append(item)
+                # Flush requests and shutdown skip the remaining wait.
+                if stopping or markers or len(rows) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            # Drain anything already waiting so a flush covers it too.
+            while not stopping and len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    markers.append(item)
+                else:
+                    rows.append(item)
+
+            if rows:
+                self._write(rows)
+            for marker in markers:
+                marker.set()
+
+    def _write(self, rows: List[ConversationRow]) -> None:
+        error = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                with self.pool.transaction() as conn:
+                    conn.executemany("""
+                        INSERT INTO conversations (patient_id, session_id, message_type, message_content)
+                        VALUES (?, ?, ?, ?)
+                    """, rows)
+            except Exception as e:
+                error = e
+                if attempt < self.max_attempts:
+                    time.sleep(self.flush_interval * attempt)
+                continue
+            with self._lock:
+                self.batches_written += 1
+                self.messages_written += len(rows)
+            return
+
+        print(f"Error writing conversation batch of {len(rows)} messages, dropping it: {error}")
+        with self._lock:
+            self.batches_dropped += 1
+            self.messages_dropped += len(rows)
+            self._unreported_drops += len(rows)
+            self.last_error = str(error)
@@ -0,0 +1,10 @@
+import pytest
+
+from health_guardian_agent.database import HealthDatabase
+
+
+@pytest.fixture
+def health_db(tmp_path):
+    database = HealthDatabase(str(tmp_path / "health.db"))
+    yield database
+    database.close()
@@ -24,9 +24,7 @@ async def main():
         query = input(">>> ")
         if query.lower() == 'exit':
             break
-        # Store user message
-        session_service.store_message("PAT001", "test_session_001", "user", query)
-
+        # The session service stores the user message and final replies
         async for event in runner.run_async(
             user_id="PAT001",
             session_id="test_session_001",
@@ -38,8 +36,6 @@ async def main():
             if event.is_final_response() and event.content and event.content.parts:
                 agent_response = event.content.parts[0].text
                 print(agent_response)
-                # Store agent response
-                session_service.store_message("PAT001", "test_session_001", "agent", agent_response)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+from health_guardian_agent.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 1, "expirations": 0, "size": 2}
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set("a", 1)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidation_during_load_is_not_cached():
+    cache = TTLCache()
+
+    def loader():
+        cache.invalidate_tag("patient")  # a concurrent write lands mid-load
+        return "stale"
+
+    assert cache.get_or_load("key", loader, tags=("patient",)) == "stale"
+    assert cache.get("key") is None
+
+
+def test_database_reads_are_cached_and_invalidated_on_write(health_db):
+    health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 70})
+    assert health_db.get_patient_data("PAT001") == {"vital_signs": {"heart_rate": 70}}
+    assert health_db.get_patient_data("PAT001") == {"vital_signs": {"heart_rate": 70}}
+    assert health_db.cache.stats()["hits"] == 1
+
+    health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 90})
+    assert health_db.get_patient_data("PAT001") == {"vital_signs": {"heart_rate": 90}}
+
+    assert health_db.get_patient_info("PAT001")["name"] is None
+    health_db.store_patient_info("PAT001", name="Jane Doe")
+    assert health_db.get_patient_info("PAT001")["name"] == "Jane Doe"
@@ -0,0 +1,194 @@
+import threading
+import time
+
+import pytest
+
+from health_guardian_agent.database import HealthDatabase
+
+
+def test_pool_reuses_connection_per_thread(health_db):
+    assert health_db.connection() is health_db.connection()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(health_db.connection()))
+    thread.start()
+    thread.join()
+    assert other[0] is not health_db.connection()
+
+
+def test_pool_applies_pragmas(health_db):
+    conn = health_db.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+
+def test_nested_transaction_rolls_back_as_a_unit(health_db):
+    with pytest.raises(RuntimeError):
+        with health_db.transaction() as conn:
+            with health_db.transaction() as inner:
+                inner.execute("INSERT INTO patients (patient_id) VALUES ('PAT001')")
+            conn.execute("INSERT INTO patients (patient_id) VALUES ('PAT002')")
+            raise RuntimeError("abort")
+
+    count = health_db.connection().execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+    assert count == 0
+
+
+def test_pool_counts_write_lock_waits(health_db):
+    health_db.pool.reset_stats()
+    holding = threading.Event()
+
+    def writer():
+        with health_db.transaction():
+            holding.set()
+            time.sleep(0.05)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    holding.wait()
+    with health_db.transaction():
+        pass
+    thread.join()
+
+    stats = health_db.pool.stats()
+    assert (stats["transactions"], stats["lock_waits"], stats["busy_errors"]) == (2, 1, 0)
+    assert stats["max_lock_wait_seconds"] > 0.01
+
+
+def test_store_patient_data_round_trip(health_db):
+    assert health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 72})
+    assert health_db.get_patient_data("PAT001", "vital_signs") == {"heart_rate": 72}
+    assert health_db.get_patient_info("PAT001")["patient_id"] == "PAT001"
+
+
+def test_latest_health_data_tracks_newest_record(health_db):
+    health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 70})
+    health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 80})
+    health_db.store_patient_data("PAT001", "medications", ["metformin"])
+
+    assert health_db.get_patient_data("PAT001") == {
+        "vital_signs": {"heart_rate": 80},
+        "medications": ["metformin"],
+    }
+    history = health_db.get_patient_data_history("PAT001", "vital_signs")
+    assert [record["data"]["heart_rate"] for record in history] == [80, 70]
+
+
+def test_allocate_patient_id_is_unique_under_concurrency(tmp_path):
+    db_path = str(tmp_path / "health.db")
+    databases = [HealthDatabase(db_path) for _ in range(2)]
+    allocated = []
+    lock = threading.Lock()
+
+    def worker(database):
+        ids = [database.allocate_patient_id() for _ in range(100)]
+        with lock:
+            allocated.extend(ids)
+
+    threads = [threading.Thread(target=worker, args=(databases[i % 2],)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert None not in allocated
+    assert sorted(allocated) == [f"PAT{n:03d}" for n in range(1, 801)]
+    for database in databases:
+        database.close()
+
+
+def test_allocate_patient_id_grows_past_width(health_db):
+    with health_db.transaction() as conn:
+        conn.execute("UPDATE id_sequences SET value = 999 WHERE name = 'PAT'")
+    assert health_db.allocate_patient_id() == "PAT1000"
+    assert health_db.allocate_patient_id(width=6) == "PAT001001"
+
+
+def test_allocate_patient_id_skips_existing_ids(health_db):
+    health_db.store_patient_info("PAT001", "Jane Doe")
+    assert health_db.allocate_patient_id() == "PAT002"
+
+
+@pytest.mark.parametrize("durability", ["sync", "batched"])
+def test_conversation_messages_are_read_back_in_order(tmp_path, durability):
+    database = HealthDatabase(str(tmp_path / "health.db"), conversation_durability=durability)
+    for i in range(10):
+        database.store_conversation_message("PAT001", "s1", "user" if i % 2 == 0 else "agent", f"msg {i}")
+    history = database.get_conversation_history("PAT001", "s1")
+    assert [content for _, content, _ in history] == [f"msg {i}" for i in range(10)]
+    database.close()
+
+
+def test_batched_conversation_messages_are_flushed_on_close(tmp_path):
+    db_path = str(tmp_path / "health.db")
+    database = HealthDatabase(db_path)
+    for i in range(500):
+        database.store_conversation_message("PAT001", "s1", "user", f"msg {i}")
+    database.close()
+    assert database.conversation_writer.batches_written < 500
+
+    reopened = HealthDatabase(db_path)
+    count = reopened.connection().execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+    assert count == 500
+    reopened.close()
+
+
+def test_failed_conversation_batch_is_reported_by_flush(health_db):
+    with health_db.transaction() as conn:
+        conn.execute("""
+            CREATE TRIGGER reject_message BEFORE INSERT ON conversations
+            WHEN NEW.message_content = 'boom'
+            BEGIN SELECT RAISE(ABORT, 'rejected'); END
+        """)
+    health_db.store_conversation_message("PAT001", "s1", "user", "hello")
+    health_db.store_conversation_message("PAT001", "s1", "user", "boom")
+
+    assert not health_db.flush_conversations()
+    stats = health_db.conversation_writer.stats()
+    assert (stats["batches_dropped"], stats["messages_dropped"]) == (1, 2)
+    assert "rejected" in stats["last_error"]
+    assert health_db.flush_conversations()
+
+
+def test_search_records_ranks_and_scopes_by_patient(health_db):
+    health_db.store_conversation_message("PAT001", "s1", "user", "I feel dizzy when standing up quickly.")
+    health_db.store_conversation_message("PAT001", "s1", "agent", "Dizziness on standing can follow blood pressure medication.")
+    health_db.store_conversation_message("PAT002", "s2", "user", "Dizzy spells again today.")
+    health_db.store_assessment("PAT001", "care_plan", "Check orthostatic blood pressure at the next visit.")
+
+    hits = health_db.search_records("dizzy standing", "PAT001")
+    assert [hit["source"] for hit in hits] == ["conversation", "conversation"]
+    assert {hit["patient_id"] for hit in hits} == {"PAT001"}
+    assert hits[0]["snippet"] == "I feel [dizzy] when [standing] up quickly."
+    assert hits[0]["score"] >= hits[1]["score"]
+
+    everyone = health_db.search_records("dizzy", limit=5)
+    assert {hit["patient_id"] for hit in everyone} == {"PAT001", "PAT002"}
+
+    plans = health_db.search_records("blood pressure", "PAT001", sources=("assessments",))
+    assert plans[0]["assessment_type"] == "care_plan"
+    # FTS5 syntax in user text is matched literally instead of raising
+    assert health_db.search_records('NEAR("dizzy" OR) -*', "PAT001")
+    assert health_db.search_records("?!", "PAT001") == []
+
+
+def test_search_records_matches_patient_id_exactly(health_db):
+    for patient_id in ("P1", "p1", "p1-2"):
+        health_db.store_conversation_message(patient_id, "s1", "user", f"{patient_id} needs more insulin.")
+        health_db.store_assessment(patient_id, "care_plan", "Review insulin dose.")
+
+    hits = health_db.search_records("insulin", "p1")
+    assert [(hit["source"], hit["patient_id"]) for hit in hits] == [("conversation", "p1"), ("assessment", "p1")]
+    assert health_db.search_records("insulin", "") == []
+
+
+def test_search_index_follows_updates_and_deletes(health_db):
+    health_db.store_assessment("PAT001", "risk_assessment", "Elevated fall risk.")
+    with health_db.transaction() as conn:
+        conn.execute("UPDATE assessments SET content = 'Low cardiac risk.' WHERE patient_id = 'PAT001'")
+    assert health_db.search_records("fall", "PAT001") == []
+    assert health_db.search_records("cardiac", "PAT001")[0]["snippet"] == "Low [cardiac] risk."
+
+    with health_db.transaction() as conn:
+        conn.execute("DELETE FROM assessments")
+    assert health_db.search_records("cardiac") == []
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cold `import health_guardian_agent` budget; it takes well under a
+# millisecond when nothing heavy is imported eagerly.
+IMPORT_BUDGET_MS = 100
+
+PROBE = """
+import sys
+import time
+
+start = time.perf_counter()
+import health_guardian_agent
+from health_guardian_agent.database import db
+elapsed_ms = (time.perf_counter() - start) * 1000
+heavy = sorted(name for name in ("google.adk", "google.auth", "dotenv") if name in sys.modules)
+print(elapsed_ms, ",".join(heavy))
+"""
+
+
+def test_cold_import_is_fast_and_side_effect_free(tmp_path):
+    env = dict(os.environ, PYTHONPATH=str(REPO_ROOT))
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=tmp_path, env=env, capture_output=True, text=True, check=True
+    )
+    elapsed_ms, heavy = result.stdout.split()[0], result.stdout.split()[1:]
+
+    assert heavy == [], f"eagerly imported: {heavy}"
+    assert not list(tmp_path.iterdir()), "importing created files"
+    assert float(elapsed_ms) < IMPORT_BUDGET_MS
+
+
+def test_database_opens_on_first_use(tmp_path):
+    from health_guardian_agent.database import HealthDatabase, LazyHealthDatabase
+
+    path = tmp_path / "lazy.db"
+    lazy = LazyHealthDatabase(lambda: HealthDatabase(str(path)))
+    assert not hasattr(lazy, "__test__")
+    store = lazy.store_patient_info
+    assert not path.exists()
+    assert store("PAT001", name="Jane Doe")
+    assert path.exists()
+    assert lazy.get() is lazy.get()
+    lazy.close()
+
+
+def test_async_first_use_opens_the_database_off_the_event_loop(tmp_path):
+    import asyncio
+    import threading
+
+    from health_guardian_agent.async_database import AsyncHealthDatabase
+    from health_guardian_agent.database import HealthDatabase, LazyHealthDatabase
+
+    opened_on = []
+
+    def factory():
+        opened_on.append(threading.current_thread())
+        return HealthDatabase(str(tmp_path / "lazy.db"))
+
+    lazy = LazyHealthDatabase(factory)
+    async_db = AsyncHealthDatabase(lazy)
+    assert asyncio.run(async_db.open()) is lazy.get()
+    assert opened_on[0] is not threading.main_thread()
+    async_db.close()
+    lazy.close()
@@ -0,0 +1,114 @@
+import io
+import json
+
+from health_guardian_agent.ingest import ingest_file, main
+
+
+def test_jsonl_batches_upsert_patients_and_keep_latest(health_db):
+    lines = [
+        {"patient_id": "PAT001", "name": "Ada", "phone": "555-0100", "data_type": "vital_signs",
+         "data": {"heart_rate": 70}, "recorded_at": "2024-03-01T09:00:00Z"},
+        {"patient_id": "PAT001", "data_type": "vital_signs",
+         "data": {"heart_rate": 90}, "recorded_at": "2024-01-01T09:00:00Z"},
+        {"patient_id": "PAT002", "data_type": "medications", "data": ["Metformin 500mg"]},
+        {"patient_id": "", "data_type": "vital_signs", "data": {"heart_rate": 1}},
+        {"patient_id": "PAT002", "data_type": "mood", "data": {"score": 3}},
+    ]
+    source = io.StringIO("\n".join(json.dumps(line) for line in lines) + "\nnot json\n")
+    health_db.get_patient_data("PAT001")  # warm the cache
+
+    stats = ingest_file(health_db, source, "jsonl", batch_size=1)
+
+    assert (stats["rows"], stats["rejected"], stats["batches"]) == (3, 3, 3)
+    assert stats["errors"][0] == "line 4: missing patient_id"
+    # The older reading arrived later but does not replace the latest one
+    assert health_db.get_patient_data("PAT001") == {"vital_signs": {"heart_rate": 70}}
+    assert health_db.get_patient_info("PAT001")["name"] == "Ada"
+    assert health_db.get_patient_data("PAT002", "medications") == ["Metformin 500mg"]
+    history = health_db.get_patient_data_history("PAT001")
+    assert [record["recorded_at"] for record in history] == ["2024-03-01 09:00:00", "2024-01-01 09:00:00"]
+
+
+def test_csv_columns_become_readings(health_db):
+    source = io.StringIO(
+        "patient_id,data_type,recorded_at,heart_rate,blood_pressure,note\n"
+        "PAT001,vital_signs,2024-05-01 08:00,72,120/80,\n"
+        "PAT001,lab_results,2024-05-02,,,fasting\n"
+    )
+
+    stats = ingest_file(health_db, source, "csv")
+
+    assert stats["rows"] == 2 and stats["rejected"] == 0
+    assert health_db.get_patient_data("PAT001", "vital_signs") == {"heart_rate": 72, "blood_pressure": "120/80"}
+
+
+def test_fhir_bundle_merges_observations(health_db, tmp_path):
+    def observation(code, value=None, components=()):
+        resource = {
+            "resourceType": "Observation",
+            "subject": {"reference": "Patient/p1"},
+            "category": [{"coding": [{"code": "vital-signs"}]}],
+            "code": {"coding": [{"system": "http://loinc.org", "code": code}]},
+            "effectiveDateTime": "2024-06-01T10:00:00+02:00",
+            "component": [{"code": {"coding": [{"code": c}]},
+                           **({"valueString": v} if isinstance(v, str) else {"valueQuantity": {"value": v}})}
+                          for c, v in components],
+        }
+        if value is not None:
+            resource["valueQuantity"] = {"value": value}
+        return {"resource": resource}
+
+    bundle = {"resourceType": "Bundle", "entry": [
+        {"resource": {"resourceType": "Patient", "id": "p1", "name": [{"given": ["Grace"], "family": "Hopper"}],
+                      "telecom": [{"system": "phone", "value": "555-0199"}]}},
+        observation("8867-4", 64),
+        observation("85354-9", components=[("8480-6", "128"), ("8462-4", 82)]),
+        observation("85354-9", components=[("8480-6", "high"), ("8462-4", 82)]),
+        {"resource": {"resourceType": "Condition", "subject": {"reference": "Patient/p1"},
+                      "code": {"text": "Hypertension"}}},
+    ]}
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(bundle))
+
+    stats = ingest_file(health_db, str(path))
+
+    assert stats["rows"] == 2 and stats["rejected"] == 1
+    history = health_db.get_patient_data_history("p1", "vital_signs")
+    assert history[0]["data"] == {"heart_rate": 64, "blood_pressure": "128/82"}
+    assert history[0]["recorded_at"] == "2024-06-01 08:00:00"
+    assert health_db.get_patient_data("p1", "conditions") == ["Hypertension"]
+    assert health_db.get_patient_info("p1")["name"] == "Grace Hopper"
+
+
+def test_split_fhir_export_backfills_demographics(health_db, tmp_path):
+    observations = tmp_path / "Observation.ndjson"
+    observations.write_text("\n".join(json.dumps(resource) for resource in [
+        {"resourceType": "Observation", "subject": {"reference": "Patient/p1"},
+         "code": {"coding": [{"code": "8867-4"}]}, "valueQuantity": {"value": 70},
+         "effectiveDateTime": "2024-06-01T10:00:00Z"},
+        {"resourceType": "Patient", "id": "p2", "name": [{"text": "Alan Turing"}]},
+        {"resourceType": "Observation", "subject": {"reference": "Patient/p2"},
+         "code": {"coding": [{"code": "8867-4"}]}, "valueQuantity": {"value": 58},
+         "effectiveDateTime": "2024-06-01T10:00:00Z"},
+    ]))
+    patients = tmp_path / "Patient.ndjson"
+    patients.write_text(json.dumps({"resourceType": "Patient", "id": "p1", "name": [{"text": "Grace Hopper"}],
+                                    "telecom": [{"system": "phone", "value": "555-0199"}]}))
+
+    assert ingest_file(health_db, str(observations))["rows"] == 2
+    assert health_db.get_patient_info("p1")["name"] is None
+    assert ingest_file(health_db, str(patients))["rejected"] == 0
+
+    assert health_db.get_patient_info("p1")["name"] == "Grace Hopper"
+    assert health_db.get_patient_info("p1")["phone"] == "555-0199"
+    assert health_db.get_patient_info("p2")["name"] == "Alan Turing"
+    assert health_db.get_patient_data("p1", "vital_signs") == {"heart_rate": 70}
+
+
+def test_cli_reports_json(tmp_path, capsys):
+    path = tmp_path / "rows.ndjson"
+    path.write_text(json.dumps({"patient_id": "PAT001", "data_type": "vital_signs", "data": {"heart_rate": 60}}))
+
+    assert main([str(path), "--db", str(tmp_path / "cli.db")]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["rows"] == 1 and report["rows_per_sec"] > 0
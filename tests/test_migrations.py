@@ -0,0 +1,172 @@
+import sqlite3
+
+import pytest
+
+from health_guardian_agent.database import HealthDatabase
+from health_guardian_agent.migrations import SCHEMA_VERSION, get_schema_version
+
+# The read paths used by HealthDatabase, tools.py and session_store.py.
+HOT_QUERIES = {
+    "get_patient_data_by_type": ("""
+        SELECT data_json
+        FROM latest_health_data
+        WHERE patient_id = ? AND data_type = ?
+    """, ("PAT001", "vital_signs")),
+    "get_patient_data": ("""
+        SELECT data_type, data_json
+        FROM latest_health_data
+        WHERE patient_id = ?
+    """, ("PAT001",)),
+    "get_patient_data_history_by_type": ("""
+        SELECT data_type, data_json, recorded_at
+        FROM health_data
+        WHERE patient_id = ? AND data_type = ?
+        ORDER BY recorded_at DESC, id DESC
+        LIMIT ?
+    """, ("PAT001", "vital_signs", -1)),
+    "get_patient_data_history": ("""
+        SELECT data_type, data_json, recorded_at
+        FROM health_data
+        WHERE patient_id = ?
+        ORDER BY recorded_at DESC, id DESC
+        LIMIT ?
+    """, ("PAT001", -1)),
+    "get_latest_assessment": ("""
+        SELECT content
+        FROM assessments
+        WHERE patient_id = ? AND assessment_type = ?
+        ORDER BY created_at DESC
+        LIMIT 1
+    """, ("PAT001", "care_plan")),
+    "get_cached_assessment": ("""
+        SELECT content
+        FROM assessments
+        WHERE patient_id = ? AND assessment_type = ? AND input_hash = ?
+        ORDER BY id DESC
+        LIMIT 1
+    """, ("PAT001", "care_plan", "0" * 64)),
+    "invalidate_cached_assessments": ("""
+        UPDATE assessments SET input_hash = NULL
+        WHERE patient_id = ? AND input_hash IS NOT NULL
+    """, ("PAT001",)),
+    "get_search_result": ("""
+        SELECT results_json FROM search_cache
+        WHERE query_key = ? AND created_at > ?
+    """, ("hypertension guideline", 0.0)),
+    "store_search_result_count": ("""
+        SELECT row_count FROM table_rows WHERE name = 'search_cache'
+    """, ()),
+    "get_observations_by_metric": ("""
+        SELECT metric, recorded_at, health_data_id, value, unit
+        FROM observations
+        WHERE patient_id = ? AND metric = ? AND recorded_at BETWEEN ? AND ?
+        ORDER BY recorded_at, health_data_id
+    """, ("PAT001", "glucose", "2024-01-01", "9999-12-31 23:59:59")),
+    "get_observations": ("""
+        SELECT metric, recorded_at, health_data_id, value, unit
+        FROM observations INDEXED BY idx_observations_patient_recorded
+        WHERE patient_id = ? AND recorded_at BETWEEN ? AND ?
+        ORDER BY recorded_at, health_data_id
+    """, ("PAT001", "2024-01-01", "9999-12-31 23:59:59")),
+    "get_conversation_history": ("""
+        SELECT message_type, message_content, timestamp
+        FROM conversations
+        WHERE patient_id = ? AND session_id = ?
+        ORDER BY timestamp ASC, id ASC
+    """, ("PAT001", "session")),
+    "get_conversation_page": ("""
+        SELECT id, message_type, message_content, timestamp
+        FROM conversations
+        WHERE patient_id = ? AND session_id = ?
+            AND (timestamp, id) < (?, ?)
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+    """, ("PAT001", "session", "2025-01-01 00:00:00", 100, 21)),
+    "list_sessions": ("""
+        SELECT DISTINCT session_id
+        FROM conversations
+        WHERE patient_id = ?
+    """, ("PAT001",)),
+    "find_patients_by_phone": ("""
+        SELECT patient_id, name, phone, phone_key, name_key FROM patients WHERE phone_key = ? LIMIT ?
+    """, ("+15551234567", 10)),
+    "find_patients_by_name": ("""
+        SELECT patient_id, name, phone, phone_key, name_key FROM patients WHERE name_key = ? LIMIT ?
+    """, ("doe jane", 10)),
+    "find_patients_by_phonetic_name": ("""
+        SELECT patient_id, name, phone, phone_key, name_key FROM patients WHERE name_phonetic = ? AND name_key != ? LIMIT ?
+    """, ("D000 J500", "doe jane", 40)),
+}
+
+# LRU eviction walks the last_used index from the oldest entry and stops at LIMIT.
+EVICTION_QUERY = ("""
+    DELETE FROM search_cache
+    WHERE query_key IN (
+        SELECT query_key FROM search_cache ORDER BY last_used LIMIT ?
+    )
+""", (1,))
+
+
+def _plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_queries_use_indexes(health_db, name):
+    sql, params = HOT_QUERIES[name]
+    plan = _plan(health_db.connection(), sql, params)
+    assert not any(step.startswith("SCAN") for step in plan), plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_search_cache_eviction_walks_the_last_used_index(health_db):
+    plan = _plan(health_db.connection(), *EVICTION_QUERY)
+    assert "SCAN search_cache USING COVERING INDEX idx_search_cache_last_used" in plan, plan
+    assert not any("TEMP B-TREE" in step for step in plan), plan
+
+
+def test_fresh_database_is_at_latest_version(health_db):
+    assert get_schema_version(health_db.connection()) == SCHEMA_VERSION
+
+
+def test_upgrades_legacy_database_in_place(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE patients (patient_id TEXT PRIMARY KEY, name TEXT, phone TEXT, "
+                     "created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("CREATE TABLE health_data (id INTEGER PRIMARY KEY AUTOINCREMENT, patient_id TEXT, "
+                     "data_type TEXT, data_json TEXT, recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)")
+        conn.execute("INSERT INTO patients (patient_id, name) VALUES ('PAT001', 'Jane Doe')")
+        conn.execute("INSERT INTO health_data (patient_id, data_type, data_json) "
+                     "VALUES ('PAT001', 'vital_signs', '{\"heart_rate\": 70}')")
+
+    database = HealthDatabase(db_path)
+    try:
+        conn = database.connection()
+        assert get_schema_version(conn) == SCHEMA_VERSION
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"conversations", "sessions", "assessments"} <= tables
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert not {"idx_patients_name", "idx_patients_phone"} & indexes
+        assert database.get_patient_data("PAT001", "vital_signs") == {"heart_rate": 70}
+        assert database.get_patient_info("PAT001")["name"] == "Jane Doe"
+        assert [row[0::3] for row in database.get_observations("PAT001")] == [("heart_rate", 70.0)]
+    finally:
+        database.close()
+
+
+def test_splits_legacy_session_blobs_into_keys(tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("CREATE TABLE sessions (app_name TEXT, user_id TEXT, id TEXT, state TEXT, "
+                     "create_time TIMESTAMP, update_time TIMESTAMP, PRIMARY KEY (app_name, user_id, id))")
+        conn.execute("""INSERT INTO sessions (app_name, user_id, id, state)
+                        VALUES ('app', 'PAT001', 's1', '{"care_plan": "plan", "score": 3}')""")
+
+    database = HealthDatabase(db_path)
+    try:
+        rows = database.connection().execute(
+            "SELECT key, value_json, version FROM session_state ORDER BY key").fetchall()
+        assert rows == [("care_plan", '"plan"', 1), ("score", "3", 1)]
+    finally:
+        database.close()
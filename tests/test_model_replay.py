@@ -0,0 +1,98 @@
+import time
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from health_guardian_agent import model_replay
+from health_guardian_agent.config import config
+from health_guardian_agent.model_replay import RecordReplayLlm, ReplayMissError, request_key, resolve_model
+
+
+class ToolCallingLlm(BaseLlm):
+    """Calls the lookup tool once, then answers; counts its calls."""
+
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        if llm_request.contents[-1].parts[0].function_response is None:
+            call = types.FunctionCall(name="lookup", args={"patient_id": "PAT001"})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+        else:
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text="BP is 120/80")]))
+
+
+def lookup(patient_id: str) -> dict:
+    """Looks up a patient."""
+    return {"patient_id": patient_id, "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+async def run(model):
+    agent = LlmAgent(name="worker", model=model, instruction="Summarize.", tools=[lookup])
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="PAT001")
+    message = types.Content(role="user", parts=[types.Part(text="How is my blood pressure?")])
+    texts = []
+    async for event in runner.run_async(user_id="PAT001", session_id=session.id, new_message=message):
+        if event.content and event.content.parts and event.content.parts[0].text:
+            texts.append(event.content.parts[0].text)
+    return texts
+
+
+def content(text=None, call_id=None):
+    if call_id:
+        part = types.Part(function_call=types.FunctionCall(id=call_id, name="lookup", args={"patient_id": "PAT001"}))
+    else:
+        part = types.Part(text=text)
+    return types.Content(role="model", parts=[part])
+
+
+def test_request_key_ignores_call_ids_and_timestamps():
+    key = request_key("gemini-2.5-flash", "Current date: 2025-01-31", [content(call_id="adk-1")])
+
+    assert key == request_key("gemini-2.5-flash", "Current date: 2025-02-01", [content(call_id="adk-2")])
+    assert key != request_key("gemini-2.5-pro", "Current date: 2025-01-31", [content(call_id="adk-1")])
+    assert key != request_key("gemini-2.5-flash", "Other instruction", [content(call_id="adk-1")])
+    assert request_key("m", "i", [content("a")]) != request_key("m", "i", [content("b")])
+
+
+@pytest.mark.asyncio
+async def test_recorded_conversation_replays_without_the_live_model(tmp_path):
+    store = str(tmp_path / "recordings.jsonl")
+    live = ToolCallingLlm(model="fake")
+
+    recorded = await run(RecordReplayLlm(model="fake", mode="record", store_path=store, live=live))
+    assert live.calls == 2
+    assert len(model_replay.recordings_for(store)) == 2
+
+    model_replay._recordings.clear()  # read the file back as a fresh process would
+    start = time.perf_counter()
+    replayed = await run(RecordReplayLlm(model="fake", mode="replay", store_path=store, latency_ms=50))
+
+    assert replayed == recorded == ["BP is 120/80"]
+    assert live.calls == 2
+    assert time.perf_counter() - start >= 0.1  # two replayed calls
+
+
+@pytest.mark.asyncio
+async def test_unrecorded_request_fails_in_replay(tmp_path):
+    with pytest.raises(ReplayMissError):
+        await run(RecordReplayLlm(model="fake", mode="replay", store_path=str(tmp_path / "empty.jsonl")))
+
+
+def test_backend_is_selected_by_configuration(monkeypatch, tmp_path):
+    assert resolve_model("gemini-2.5-flash") == "gemini-2.5-flash"
+
+    monkeypatch.setattr(config, "model_backend", "replay")
+    monkeypatch.setattr(config, "model_recordings_path", str(tmp_path / "recordings.jsonl"))
+    monkeypatch.setattr(config, "replay_latency_ms", 25.0)
+    model = resolve_model("gemini-2.5-flash")
+    assert isinstance(model, RecordReplayLlm)
+    assert (model.model, model.mode, model.latency_ms) == ("gemini-2.5-flash", "replay", 25.0)
+
+    monkeypatch.setattr(config, "model_backend", "cassette")
+    with pytest.raises(ValueError, match="cassette"):
+        resolve_model("gemini-2.5-flash")
@@ -0,0 +1,53 @@
+from health_guardian_agent import tools
+from health_guardian_agent.patient_matching import name_key, name_phonetic, phone_key, soundex
+
+
+def test_phone_keys_ignore_formatting():
+    assert phone_key("+1 (555) 123-4567") == phone_key("555.123.4567") == phone_key("5551234567 x12") == "+15551234567"
+    assert phone_key("0044 20 7946 0958") == phone_key("+44 20 7946 0958") == "+442079460958"
+    assert phone_key("12-34") is None
+
+
+def test_name_keys_ignore_case_accents_and_order():
+    assert name_key("Doe, Jane") == name_key("JANE  doe") == name_key("Jane Doé") == "doe jane"
+    assert [soundex(word) for word in ("robert", "rupert", "tymczak", "ashcraft")] == ["R163", "R163", "T522", "A261"]
+    assert name_phonetic("Jon Smyth") == name_phonetic("john smith")
+
+
+def test_find_patients_ranks_all_candidates(health_db):
+    health_db.store_patient_info("PAT001", name="John Smith", phone="+1 (555) 123-4567")
+    health_db.store_patient_info("PAT002", name="Jon Smyth", phone="555-987-6543")
+    health_db.store_patient_info("PAT003", name="Jane Doe", phone="5551234567")
+    health_db.store_patient_data_batch([("PAT004", "medications", '["Aspirin"]', None)],
+                                       {"PAT004": ("SMITH, John", None)})
+
+    candidates = health_db.find_patients(name="john smith", phone="555 123 4567")
+    assert [(c["patient_id"], c["matched"]) for c in candidates] == [
+        ("PAT001", ["phone", "name"]),
+        ("PAT003", ["phone"]),
+        ("PAT004", ["name"]),
+        ("PAT002", ["similar_name"]),
+    ]
+    assert candidates[0]["score"] == 1.0
+    assert candidates[1]["score"] == 0.6
+    assert candidates[-1]["score"] < candidates[-2]["score"]
+
+    assert [c["patient_id"] for c in health_db.find_patients(phone="(555) 987-6543")] == ["PAT002"]
+    assert health_db.find_patients(name="Nobody Here") == []
+
+    # Changing the phone moves the patient to the new key
+    health_db.store_patient_info("PAT003", phone="555-000-1111")
+    assert [c["patient_id"] for c in health_db.find_patients(phone="5551234567")] == ["PAT001"]
+
+
+def test_similar_names_are_candidates_not_matches(health_db, monkeypatch):
+    monkeypatch.setattr(tools, "db", health_db)
+    health_db.store_patient_info("PAT001", name="John Smith", phone="+1 555 123 4567")
+
+    result = tools._query_patient_by_name_or_phone("Jon Smyth", "5559990000")
+    assert not result["found"] and "patient_id" not in result
+    assert [(c["patient_id"], c["matched"]) for c in result["candidates"]] == [("PAT001", ["similar_name"])]
+
+    assert tools._query_patient_by_name_or_phone("Jon Smyth", "555 123 4567")["patient_id"] == "PAT001"
+    assert tools._query_patient_by_name_or_phone("smith, john", None)["patient_id"] == "PAT001"
+    assert not tools._query_patient_by_name_or_phone("Jon Smyth", None)["found"]
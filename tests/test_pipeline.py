@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import List
+
+import pytest
+from google.adk.agents import BaseAgent
+from google.adk.events import Event, EventActions
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from health_guardian_agent.pipeline import PIPELINE_SEQUENTIAL, PipelineScheduler
+
+STAGE_SECONDS = 0.1
+
+
+class FakeStage(BaseAgent):
+    """Sleeps like an LLM loop, then writes its output key."""
+
+    output_key: str
+    seen: List[str] = []
+
+    async def _run_async_impl(self, ctx):
+        self.seen = sorted(key for key in ctx.session.state if key != "pipeline_timings")
+        await asyncio.sleep(STAGE_SECONDS)
+        yield Event(
+            author=self.name,
+            invocation_id=ctx.invocation_id,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={self.output_key: f"{self.name} done"}),
+        )
+
+
+def build_pipeline(mode="parallel"):
+    return PipelineScheduler(
+        name="pipeline",
+        sub_agents=[
+            FakeStage(name="monitor", output_key="health_data_summary"),
+            FakeStage(name="risk", output_key="risk_assessment"),
+            FakeStage(name="education", output_key="education_content"),
+            FakeStage(name="planner", output_key="care_plan"),
+        ],
+        stage_inputs={
+            "risk": ["health_data_summary"],
+            "education": ["health_data_summary"],
+            "planner": ["health_data_summary", "risk_assessment", "education_content"],
+        },
+        stage_outputs={
+            "monitor": ["health_data_summary"],
+            "risk": ["risk_assessment"],
+            "education": ["education_content"],
+            "planner": ["care_plan"],
+        },
+        mode=mode,
+    )
+
+
+async def run(pipeline):
+    runner = InMemoryRunner(agent=pipeline, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="PAT001")
+    message = types.Content(role="user", parts=[types.Part(text="analyze")])
+    authors = [event.author async for event in runner.run_async(
+        user_id="PAT001", session_id=session.id, new_message=message)]
+    session = await runner.session_service.get_session(app_name="test", user_id="PAT001", session_id=session.id)
+    return authors, session.state
+
+
+def test_waves_follow_declared_dependencies():
+    waves = build_pipeline().waves()
+    assert [[stage.name for stage in wave] for wave in waves] == [["monitor"], ["risk", "education"], ["planner"]]
+
+
+def test_education_and_care_plan_share_a_wave():
+    from health_guardian_agent.agent import health_analysis_pipeline
+
+    waves = [[stage.name for stage in wave] for wave in health_analysis_pipeline.waves()]
+    assert waves == [
+        ["robust_vital_signs_monitor"],
+        ["robust_health_risk_analyzer"],
+        ["robust_health_education_specialist", "robust_treatment_planner"],
+    ]
+
+
+def test_cycles_are_rejected():
+    with pytest.raises(ValueError, match="cycle"):
+        PipelineScheduler(
+            name="pipeline",
+            sub_agents=[FakeStage(name="a", output_key="x"), FakeStage(name="b", output_key="y")],
+            stage_inputs={"a": ["y"], "b": ["x"]},
+            stage_outputs={"a": ["x"], "b": ["y"]},
+        )
+
+
+@pytest.mark.asyncio
+async def test_parallel_mode_overlaps_independent_stages():
+    pipeline = build_pipeline()
+    start = time.perf_counter()
+    authors, state = await run(pipeline)
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 3.7 * STAGE_SECONDS  # three waves, not four stages
+    assert state["care_plan"] == "planner done"
+    assert pipeline.sub_agents[3].seen == ["education_content", "health_data_summary", "risk_assessment"]
+    timings = state["pipeline_timings"]
+    assert set(timings["stages"]) == {"monitor", "risk", "education", "planner"}
+    assert abs(timings["stages"]["risk"]["start_seconds"] - timings["stages"]["education"]["start_seconds"]) < 0.05
+    assert authors[-1] == "pipeline"
+
+
+@pytest.mark.asyncio
+async def test_sequential_mode_runs_in_declaration_order():
+    authors, state = await run(build_pipeline(PIPELINE_SEQUENTIAL))
+    assert authors == ["monitor", "risk", "education", "planner", "pipeline"]
+    assert state["pipeline_timings"]["total_seconds"] >= 4 * STAGE_SECONDS
+    assert state["pipeline_timings"]["waves"] == [["monitor"], ["risk"], ["education"], ["planner"]]
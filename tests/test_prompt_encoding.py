@@ -0,0 +1,48 @@
+import json
+
+from health_guardian_agent.prompt_encoding import compact_value, encode_compact, encode_health_data, estimate_tokens
+
+
+def test_compact_value_prunes_empties_and_abbreviates_units():
+    assert compact_value({
+        "heart_rate": "72 beats per minute",
+        "blood_pressure": "130/85  mm Hg",
+        "glucose": "110 milligrams per deciliter",
+        "medications": ["Metformin 500 milligrams twice a day", ""],
+        "respiratory_rate": None,
+        "notes": {"extra": []},
+    }) == {
+        "heart_rate": "72 bpm",
+        "blood_pressure": "130/85 mmHg",
+        "glucose": "110 mg/dL",
+        "medications": ["Metformin 500 mg BID"],
+    }
+    assert encode_compact({"b": 1, "a": [1.5, None]}) == '{"a":[1.5],"b":1}'
+
+
+def test_estimate_counts_indentation_and_long_numbers():
+    record = {"vital_signs": {"blood_pressure": "131/84", "heart_rate": 74}}
+    assert estimate_tokens(json.dumps(record, indent=2)) > estimate_tokens(encode_compact(record))
+    assert estimate_tokens("123456") == estimate_tokens("123") + 1
+    assert estimate_tokens("x" * 400) == 101
+
+
+def test_history_is_truncated_to_the_token_budget():
+    history = [
+        {"data_type": "vital_signs", "data": {"heart_rate": 60 + day}, "recorded_at": f"2024-03-{30 - day:02d} 08:00:00"}
+        for day in range(30)
+    ]
+    latest = {"vital_signs": history[0]["data"], "conditions": ["Hypertension"]}
+
+    full = json.loads(encode_health_data("PAT001", latest, history))
+    assert full["vital_signs"] == {"heart_rate": 60}
+    assert len(full["history"]["vital_signs"]) == 29  # the latest reading is not repeated
+    assert full["history"]["vital_signs"][0] == ["2024-03-29 08:00", {"heart_rate": 61}]
+
+    encoded = encode_health_data("PAT001", latest, history, token_budget=120)
+    truncated = json.loads(encoded)
+    assert estimate_tokens(encoded) <= 120
+    kept = len(truncated["history"]["vital_signs"])
+    assert 0 < kept < 29
+    assert truncated["history_omitted"] == 29 - kept
+    assert truncated["history"]["vital_signs"] == full["history"]["vital_signs"][:kept]
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from health_guardian_agent.reports import ReportTemplate, generate_reports, render_report
+
+
+@pytest.fixture
+def health_db(health_db):
+    for i in range(1, 6):
+        patient_id = f"PAT{i:03d}"
+        health_db.store_patient_info(patient_id, name=f"Patient {i}")
+        health_db.store_patient_data(patient_id, "vital_signs", {"blood_pressure": "120/80", "heart_rate": 60 + i})
+        health_db.store_patient_data(patient_id, "medications", ["Metformin 500mg"])
+    health_db.store_assessment("PAT001", "care_plan", "Walk 30 minutes daily.")
+    return health_db
+
+
+def test_template_streams_fields_in_order():
+    template = ReportTemplate("# {title}\n{items}\n")
+    assert template.fields == {"title", "items"}
+    assert list(template.stream({"title": "Report", "items": iter(["- a", "\n- b"])})) == [
+        "# ", "Report", "\n", "- a", "\n- b", "\n",
+    ]
+
+
+def test_report_includes_stored_data(health_db):
+    report = render_report(health_db, "PAT001", report_date="2025-01-31")
+
+    assert report.startswith("# Health Report for Patient PAT001\n")
+    assert "- **Name**: Patient 1" in report
+    assert "- **Report Date**: 2025-01-31" in report
+    assert "- **Heart Rate**: 61 bpm" in report
+    assert "- **Glucose**: N/A" in report
+    assert "### Medications\n- Metformin 500mg\n" in report
+    assert "### Medical Conditions\n- None recorded\n" in report
+    assert "## Care Plan\nWalk 30 minutes daily.\n" in report
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_batch_writes_every_report_and_a_manifest(health_db, tmp_path, workers):
+    out_dir = tmp_path / f"reports_{workers}"
+
+    stats = generate_reports(health_db.db_path, str(out_dir), workers=workers, chunk_size=2,
+                             report_date="2025-01-31")
+
+    assert (stats["reports"], stats["failed"]) == (5, 0)
+    manifest = [json.loads(line) for line in (out_dir / "manifest.jsonl").read_text().splitlines()]
+    assert sorted(entry["patient_id"] for entry in manifest) == [f"PAT{i:03d}" for i in range(1, 6)]
+    for entry in manifest:
+        report = (out_dir / entry["file"]).read_text(encoding="utf-8")
+        assert len(report.encode("utf-8")) == entry["bytes"]
+        assert report == render_report(health_db, entry["patient_id"], report_date="2025-01-31")
+    assert not list(out_dir.glob("*.partial"))
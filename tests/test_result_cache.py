@@ -0,0 +1,76 @@
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from health_guardian_agent.async_database import AsyncHealthDatabase
+from health_guardian_agent.database import HealthDatabase
+from health_guardian_agent.result_cache import SubAgentResultCache
+
+
+class CountingLlm(BaseLlm):
+    calls: int = 0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        self.calls += 1
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=f"assessment #{self.calls}")]))
+
+
+async def run_once(agent, summary, patient_id="PAT001", fingerprint="a1"):
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    state = {"health_data_summary": summary, "health_data_fingerprint": fingerprint}
+    if patient_id:
+        state["patient_id"] = patient_id
+    session = await runner.session_service.create_session(app_name="test", user_id="PAT001", state=state)
+    message = types.Content(role="user", parts=[types.Part(text="assess")])
+    async for _ in runner.run_async(user_id="PAT001", session_id=session.id, new_message=message):
+        pass
+    session = await runner.session_service.get_session(app_name="test", user_id="PAT001", session_id=session.id)
+    return session.state["risk_assessment"]
+
+
+def risk_agent(health_db, llm):
+    cache = SubAgentResultCache(AsyncHealthDatabase(health_db))
+    agent = cache.attach(
+        LlmAgent(name="risk", model=llm, instruction="Assess risk.", output_key="risk_assessment"),
+        inputs=["health_data_summary"],
+    )
+    return cache, agent
+
+
+@pytest.mark.asyncio
+async def test_unchanged_inputs_are_served_from_the_assessments_table(health_db):
+    llm = CountingLlm(model="fake-model")
+    cache, agent = risk_agent(health_db, llm)
+
+    assert await run_once(agent, "BP 150/95") == "assessment #1"
+    assert await run_once(agent, "BP 150/95") == "assessment #1"
+    assert llm.calls == 1
+
+    # Different inputs miss
+    assert await run_once(agent, "BP 120/80") == "assessment #2"
+
+    # New health data invalidates every cached result for the patient
+    health_db.store_patient_data("PAT001", "vital_signs", {"blood_pressure": "150/95"})
+    assert await run_once(agent, "BP 150/95") == "assessment #3"
+    assert health_db.get_latest_assessment("PAT001", "risk_assessment") == "assessment #3"
+
+    assert cache.stats() == {"hits": 1, "misses": 3, "stores": 3, "hit_rate": 0.25}
+
+
+@pytest.mark.asyncio
+async def test_key_follows_the_fetched_patient_and_health_data(health_db):
+    llm = CountingLlm(model="fake-model")
+    cache, agent = risk_agent(health_db, llm)
+
+    assert await run_once(agent, "BP 150/95") == "assessment #1"
+    # Another patient, or the same patient's changed data, never sees that answer
+    assert await run_once(agent, "BP 150/95", patient_id="PAT002") == "assessment #2"
+    assert await run_once(agent, "BP 150/95", fingerprint="b2") == "assessment #3"
+    # Nothing is cached until a tool has resolved the patient
+    assert await run_once(agent, "BP 150/95", patient_id=None) == "assessment #4"
+    assert await run_once(agent, "BP 150/95", patient_id=None) == "assessment #5"
+
+    assert cache.stats()["hits"] == 0
+    assert health_db.get_latest_assessment("PAT002", "risk_assessment") == "assessment #2"
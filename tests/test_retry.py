@@ -0,0 +1,156 @@
+import asyncio
+import random
+
+import pytest
+from google.adk.agents import LlmAgent, SequentialAgent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import errors, types
+
+from health_guardian_agent.retry import RetryController, RetryLoopAgent, is_transient
+from health_guardian_agent.tracing import Tracer
+from health_guardian_agent.validation_checkers import HealthDataValidationChecker, RiskAssessmentValidationChecker
+
+
+class ScriptedLlm(BaseLlm):
+    """Plays back a script of answers; exceptions in the script are raised."""
+
+    script: list = []
+    calls: int = 0
+    delay: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        step = self.script[min(self.calls, len(self.script) - 1)]
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if isinstance(step, Exception):
+            raise step
+        yield LlmResponse(content=types.Content(role="model", parts=[types.Part(text=step)]))
+
+
+def server_error(code=503):
+    return errors.ServerError(code, {"error": {"code": code, "message": "unavailable", "status": "UNAVAILABLE"}})
+
+
+def stage(name, llm, output_key, validator, controller, **kwargs):
+    worker = LlmAgent(name=f"{name}_worker", model=llm, instruction="Answer.", output_key=output_key)
+    return RetryLoopAgent(name=name, sub_agents=[worker, validator], controller=controller, **kwargs)
+
+
+def controller(**kwargs):
+    options = {"deadline_seconds": 30.0, "max_model_calls": 10, "base_delay": 0.01, "max_delay": 0.05,
+               "rng": random.Random(0)}
+    options.update(kwargs)
+    return RetryController(**options)
+
+
+async def run(agent):
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="PAT001")
+    message = types.Content(role="user", parts=[types.Part(text="go")])
+    async for _ in runner.run_async(user_id="PAT001", session_id=session.id, new_message=message):
+        pass
+    session = await runner.session_service.get_session(app_name="test", user_id="PAT001", session_id=session.id)
+    return session.state
+
+
+def test_transient_errors_are_classified():
+    assert is_transient(server_error(503))
+    assert is_transient(errors.ClientError(429, {"error": {"code": 429, "message": "slow down"}}))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(errors.ClientError(400, {"error": {"code": 400, "message": "bad request"}}))
+    assert not is_transient(ValueError("bad output"))
+
+
+def test_backoff_is_jittered_and_capped():
+    retries = RetryController(30.0, 10, base_delay=1.0, max_delay=4.0, rng=random.Random(0))
+    delays = [retries.backoff(failures) for failures in (1, 2, 3, 4, 5) for _ in range(50)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert max(delays[:50]) <= 1.0 and len(set(delays)) == len(delays)
+
+
+@pytest.mark.asyncio
+async def test_transport_error_is_retried_after_backoff():
+    llm = ScriptedLlm(model="fake", script=[server_error(), "BP is 120/80"])
+    retries = controller()
+    agent = stage("monitor", llm, "health_data_summary",
+                  HealthDataValidationChecker(name="checker"), retries)
+
+    state = await run(agent)
+
+    assert state["health_data_summary"] == "BP is 120/80"
+    report = state["monitor_retries"]
+    assert (report["attempts"], report["transport_errors"], report["outcome"]) == (2, 1, "ok")
+    assert 0 < report["backoff_seconds"] <= 0.01
+    assert retries.stats()["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_model_call_spans_are_finished_as_errors():
+    llm = ScriptedLlm(model="fake", script=[server_error(), "BP is 120/80"])
+    tracer = Tracer()
+    agent = tracer.instrument(stage("monitor", llm, "health_data_summary",
+                                    HealthDataValidationChecker(name="checker"), controller(), tracer=tracer))
+
+    await run(agent)
+
+    metrics = tracer.render_prometheus()
+    assert 'health_guardian_spans_total{kind="model",name="monitor_worker",status="error"} 1' in metrics
+    assert 'health_guardian_spans_total{kind="model",name="monitor_worker",status="ok"} 1' in metrics
+    assert 'health_guardian_spans_total{kind="agent",name="monitor_worker",status="error"} 1' in metrics
+    assert not tracer._open
+
+
+@pytest.mark.asyncio
+async def test_validation_failures_stop_after_their_retries():
+    llm = ScriptedLlm(model="fake", script=[""])
+    agent = stage("monitor", llm, "health_data_summary",
+                  HealthDataValidationChecker(name="checker"), controller(), validation_retries=1)
+
+    state = await run(agent)
+
+    assert llm.calls == 2
+    report = state["monitor_retries"]
+    assert (report["attempts"], report["validation_failures"], report["outcome"]) == (2, 2, "validation_failed")
+    assert report["backoff_seconds"] == 0
+
+
+@pytest.mark.asyncio
+async def test_other_errors_propagate():
+    llm = ScriptedLlm(model="fake", script=[errors.ClientError(400, {"error": {"code": 400, "message": "bad"}})])
+    agent = stage("monitor", llm, "health_data_summary", HealthDataValidationChecker(name="checker"), controller())
+
+    with pytest.raises(errors.ClientError):
+        await run(agent)
+    assert llm.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_call_budget_is_shared_across_stages():
+    retries = controller(max_model_calls=2)
+    first = ScriptedLlm(model="fake", script=["", "summary"])
+    second = ScriptedLlm(model="fake", script=["risk"])
+    pipeline = SequentialAgent(name="pipeline", sub_agents=[
+        stage("monitor", first, "health_data_summary", HealthDataValidationChecker(name="c1"), retries),
+        stage("risk", second, "risk_assessment", RiskAssessmentValidationChecker(name="c2"), retries),
+    ])
+
+    state = await run(pipeline)
+
+    assert (first.calls, second.calls) == (2, 0)
+    assert state["monitor_retries"]["outcome"] == "ok"
+    assert state["risk_retries"] == {"attempts": 0, "validation_failures": 0, "transport_errors": 0,
+                                     "backoff_seconds": 0.0, "outcome": "call_budget"}
+    assert retries.stats()["outcomes"] == {"ok": 1, "call_budget": 1}
+
+
+@pytest.mark.asyncio
+async def test_deadline_bounds_retries():
+    llm = ScriptedLlm(model="fake", script=[""], delay=0.1)
+    agent = stage("monitor", llm, "health_data_summary", HealthDataValidationChecker(name="checker"),
+                  controller(deadline_seconds=0.15), validation_retries=10)
+
+    state = await run(agent)
+
+    assert llm.calls == 2  # the second call starts before the deadline; no third one does
+    assert state["monitor_retries"]["outcome"] == "deadline"
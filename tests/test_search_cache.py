@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from health_guardian_agent.async_database import AsyncHealthDatabase
+from health_guardian_agent.database import HealthDatabase
+from health_guardian_agent.search_cache import LocalSearchBackend, SearchCache, normalize_query
+
+
+def test_reworded_queries_share_a_key():
+    assert normalize_query("Hypertension guidelines 2024?") == normalize_query("2024 guidelines for HYPERTENSION")
+
+
+@pytest.mark.asyncio
+async def test_repeated_searches_skip_the_backend(health_db):
+    backend = LocalSearchBackend()
+    cache = SearchCache(AsyncHealthDatabase(health_db), backend)
+
+    first = await cache.search("hypertension guidelines", invocation_id="report-1")
+    assert first["sources"][0]["title"] == "ACC/AHA High Blood Pressure Guideline"
+    assert await cache.search("Guidelines for hypertension", invocation_id="report-1") == first
+    await asyncio.gather(*(cache.search("statin therapy ldl", invocation_id="report-1") for _ in range(3)))
+
+    assert backend.calls == 2
+    assert cache.report("report-1") == {"searches": 5, "network_round_trips": 2, "round_trips_saved": 3}
+
+    # Persisted: a fresh cache over the same file still hits
+    restarted = SearchCache(AsyncHealthDatabase(health_db), backend)
+    await restarted.search("hypertension guidelines", invocation_id="report-2")
+    assert backend.calls == 2
+    assert restarted.report("report-2")["round_trips_saved"] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_and_evicted_entries_are_refetched(health_db):
+    backend = LocalSearchBackend()
+    cache = SearchCache(AsyncHealthDatabase(health_db), backend, max_entries=2)
+    for query in ("asthma inhaler", "copd", "asthma inhaler", "heart failure"):
+        await cache.search(query)
+    assert backend.calls == 3  # "copd" was least recently used and got evicted
+    await cache.search("copd")
+    assert backend.calls == 4
+
+    cache.ttl_seconds = 0
+    await cache.search("copd")
+    assert backend.calls == 5
+    assert cache.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hits_are_reads_and_usage_is_written_in_batches(health_db):
+    cache = SearchCache(AsyncHealthDatabase(health_db), LocalSearchBackend())
+    await cache.search("asthma inhaler")
+    health_db.pool.reset_stats()
+    for _ in range(3):
+        await cache.search("asthma inhaler")
+    assert health_db.pool.stats()["transactions"] == 0
+
+    await cache.search("copd")
+    hits = health_db.connection().execute("SELECT hits FROM search_cache WHERE query = 'asthma inhaler'")
+    assert hits.fetchone()[0] == 3
+
+
+def test_bound_holds_across_databases_sharing_a_file(tmp_path):
+    path = str(tmp_path / "shared.db")
+    first, second = HealthDatabase(path), HealthDatabase(path)
+    try:
+        for i in range(6):
+            (first if i % 2 else second).store_search_result(f"q{i}", f"q{i}", [], max_entries=3)
+        keys = [row[0] for row in first.connection().execute("SELECT query_key FROM search_cache ORDER BY query_key")]
+        assert keys == ["q3", "q4", "q5"]
+    finally:
+        first.close()
+        second.close()
@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+from google.adk.agents import LlmAgent, LoopAgent
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from health_guardian_agent.tracing import Tracer
+
+
+class ToolCallingLlm(BaseLlm):
+    """Calls the lookup tool once, then answers with token usage."""
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if llm_request.contents[-1].parts[0].function_response is None:
+            call = types.FunctionCall(name="lookup", args={"patient_id": "PAT001"})
+            yield LlmResponse(content=types.Content(role="model", parts=[types.Part(function_call=call)]))
+        else:
+            yield LlmResponse(
+                content=types.Content(role="model", parts=[types.Part(text="summary")]),
+                usage_metadata=types.GenerateContentResponseUsageMetadata(
+                    prompt_token_count=120, candidates_token_count=8),
+            )
+
+
+def lookup(patient_id: str) -> dict:
+    """Looks up a patient."""
+    return {"patient_id": patient_id}
+
+
+def cached_answer(callback_context, llm_request):
+    if callback_context.state.get("cached"):
+        return LlmResponse(content=types.Content(role="model", parts=[types.Part(text="from cache")]))
+    return None
+
+
+async def run(agent, state):
+    runner = InMemoryRunner(agent=agent, app_name="test")
+    session = await runner.session_service.create_session(app_name="test", user_id="PAT001", state=state)
+    message = types.Content(role="user", parts=[types.Part(text="go")])
+    async for _ in runner.run_async(user_id="PAT001", session_id=session.id, new_message=message):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_spans_cover_agents_models_and_tools(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(str(path))
+    worker = LlmAgent(name="worker", model=ToolCallingLlm(model="fake"), instruction="Summarize.",
+                      tools=[lookup], before_model_callback=cached_answer)
+    loop = tracer.instrument(LoopAgent(name="loop", sub_agents=[worker], max_iterations=2))
+
+    await run(loop, {})
+    await run(loop, {"cached": True})
+    tracer.close()
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    kinds = [(span["kind"], span["name"], span["status"]) for span in spans]
+    assert kinds.count(("model", "worker", "ok")) == 4  # tool call + answer, per iteration
+    assert kinds.count(("tool", "lookup", "ok")) == 2
+    assert kinds.count(("model", "worker", "cache_hit")) == 2
+    assert [span["iteration"] for span in spans if span["kind"] == "agent" and span["name"] == "worker"] == [1, 2, 1, 2]
+    assert spans[-1]["name"] == "loop" and spans[-1]["duration_ms"] >= 0
+    assert len({span["trace_id"] for span in spans}) == 2
+
+    metrics = tracer.render_prometheus()
+    assert 'health_guardian_spans_total{kind="tool",name="lookup",status="ok"} 2' in metrics
+    assert 'health_guardian_span_duration_seconds_count{kind="model",name="worker"} 6' in metrics
+    assert 'health_guardian_model_tokens_total{name="worker",direction="prompt"} 240' in metrics
+
+
+@pytest.mark.asyncio
+async def test_trace_file_is_flushed_in_the_background(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(str(path), flush_interval=0.01)
+    await run(tracer.instrument(LlmAgent(name="worker", model=ToolCallingLlm(model="fake"), tools=[lookup])), {})
+
+    time.sleep(0.1)
+    assert len(path.read_text().splitlines()) == 4  # agent, two model calls and a tool call
+    tracer.close()
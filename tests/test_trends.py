@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from health_guardian_agent.observations import extract_observations
+from health_guardian_agent.trends import (
+    analyze_patient_trends, load_observation_arrays, series_from_arrays, summarize_series,
+)
+
+
+def extract_metrics(data):
+    return {metric: value for metric, value, _ in extract_observations(data)}
+
+
+def build_series(records):
+    """Reference (times, names, values) series built row by row from history records."""
+    stamps, rows = [], []
+    for record in records:
+        metrics = extract_metrics(record["data"])
+        if metrics:
+            stamps.append(record["recorded_at"])
+            rows.append(metrics)
+    names = sorted({name for row in rows for name in row})
+    values = np.array([[row.get(name, np.nan) for name in names] for row in rows]).reshape(len(rows), len(names))
+    times = np.array(stamps, dtype="datetime64[s]")
+    order = np.argsort(times, kind="stable")
+    return times[order], names, values[order]
+
+
+def test_extract_metrics_parses_blood_pressure_and_units():
+    assert extract_metrics({
+        "blood_pressure": "142/91", "Heart Rate": 80, "temperature": "98.6 F", "notes": "fine", "fasting": True,
+    }) == {"systolic": 142.0, "diastolic": 91.0, "heart_rate": 80.0, "temperature": 98.6}
+
+
+def test_summary_matches_per_metric_reference():
+    records = [
+        {"data": {"glucose": 100 + 10 * day, "heart_rate": 70}, "recorded_at": f"2024-01-{day + 1:02d} 08:00:00"}
+        for day in range(10)
+    ]
+    records.append({"data": {"heart_rate": 120}, "recorded_at": "2024-01-11 08:00:00"})
+    times, names, values = build_series(reversed(records))  # history arrives newest first
+    summary = summarize_series(times, names, values, window=3)
+
+    glucose = summary["glucose"]
+    assert glucose["n"] == 10
+    assert glucose["latest"] == 190
+    assert glucose["slope_per_30d"] == pytest.approx(300)
+    assert glucose["rolling_mean"] == 180
+    assert glucose["previous_rolling_mean"] == 150
+    assert glucose["above_range"] == 5
+    assert glucose["trend"] == "rising"
+    assert glucose["std"] == pytest.approx(round(float(np.std(100 + 10 * np.arange(10))), 2))
+
+    heart_rate = summary["heart_rate"]
+    assert heart_rate["n"] == 11
+    assert heart_rate["latest"] == 120
+    assert heart_rate["above_range"] == 1
+    assert heart_rate["below_range"] == 0
+
+
+def test_analyze_patient_trends_reads_full_history(health_db):
+    health_db.store_patient_data_batch([
+        ("PAT001", "vital_signs", f'{{"blood_pressure": "{systolic}/80"}}', f"2024-02-{week * 7 + 1:02d} 09:00:00")
+        for week, systolic in enumerate([128, 134, 139, 145, 150])
+    ], {"PAT001": (None, None)})
+    health_db.store_patient_data("PAT001", "medications", ["Lisinopril 10mg daily"])
+
+    trends = analyze_patient_trends(health_db, "PAT001")
+    assert trends["readings"] == 5
+    assert trends["first_recorded"] == "2024-02-01 09:00:00"
+    assert trends["metrics"]["systolic"]["trend"] == "rising"
+    assert trends["metrics"]["systolic"]["above_range"] == 4
+    assert "systolic out of range in 4 of 5 readings" in trends["flags"]
+    assert analyze_patient_trends(health_db, "PAT999") == {
+        "patient_id": "PAT999", "readings": 0, "metrics": {}, "flags": [],
+    }
+
+
+def test_observation_arrays_read_only_the_window(health_db):
+    health_db.store_patient_data_batch([
+        ("PAT001", "lab_results", '{"glucose": "%d mg/dL", "hba1c": 6.1}' % (100 + day), f"2024-03-{day:02d} 08:00:00")
+        for day in range(1, 11)
+    ], {"PAT001": (None, None)})
+    health_db.store_patient_data("PAT001", "vital_signs", {"heart_rate": 72, "blood_pressure": "120/80"})
+
+    arrays = load_observation_arrays(health_db, "PAT001", ["glucose"], since="2024-03-08", until="2024-03-31")
+    assert list(arrays) == ["glucose"]
+    assert arrays["glucose"]["values"].tolist() == [108.0, 109.0, 110.0]
+    assert str(arrays["glucose"]["times"][0]) == "2024-03-08T08:00:00"
+    assert health_db.get_observations("PAT001", ["systolic"])[0][3:] == (120.0, "mmHg")
+
+    # Metrics from one record share a row, matching build_series over the raw history
+    times, names, values = series_from_arrays(load_observation_arrays(health_db, "PAT001"))
+    expected = build_series(health_db.get_patient_data_history("PAT001"))
+    assert names == expected[1]
+    np.testing.assert_array_equal(times, expected[0])
+    np.testing.assert_array_equal(values, expected[2])